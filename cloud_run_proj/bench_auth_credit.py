@@ -0,0 +1,410 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+인증 + 크레딧 핫패스 벤치마크 (실제 Supabase 프로젝트 없이 실행)
+
+구성
+----
+- 로컬 대체 서버(uvicorn, 별도 스레드)가 다음을 흉내냄
+  * GET  /auth/v1/.well-known/jwks.json       → 벤치마크용 ES256 공개키
+  * /rest/v1/users_credits, /rest/v1/credit_holds, /rest/v1/rpc/*  → 메모리 기반 PostgREST
+  * 모든 PostgREST 응답에 --latency-ms 만큼 지연을 추가 (네트워크 + DB 시간 가정)
+- SUPABASE_URL 을 대체 서버로 지정한 뒤 main:app 을 lifespan 포함으로 띄우고
+  httpx ASGITransport 로 직접 요청
+- OpenAI 호출은 메모리 대체 클라이언트(--llm-latency-ms 만큼 지연 후 검증을 통과하는 4편 반환)로 바꿔
+  /poems/generate 의 LLM 앞뒤 경로만 측정
+- 측정 대상
+  * POST /auth/register           (요청마다 새 토큰으로 서명 → 검증 캐시 미적중 경로)
+  * reserve → commit              (예약 RPC + 원장 확정 RPC, 생성 성공 경로의 크레딧 처리)
+  * reserve → release             (예약 RPC + 예약 삭제, 생성 실패 경로의 크레딧 처리)
+  * cold validate + reserve       (잔액 캐시를 비운 뒤 reject_by_cached_credit + 예약, 캐시 미적중 경로)
+  * POST /poems/generate          (대체 LLM, 요청마다 다른 키워드로 결과 캐시/합치기를 피해 예약 → 생성 → 확정 전체)
+- 동시성 단계별 p50/p95/p99 지연과 초당 처리량(RPS) 출력
+
+실행
+----
+uv run python bench_auth_credit.py --concurrency 1,10,50,200 --requests 500 --latency-ms 20 --llm-latency-ms 0
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import statistics
+import threading
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import httpx
+import jwt
+import uvicorn
+from cryptography.hazmat.primitives.asymmetric import ec
+from fastapi import FastAPI, Request, Response
+from jwt.algorithms import ECAlgorithm
+from types import SimpleNamespace
+
+KID = "bench-key"
+SERVICE_ROLE_KEY = jwt.encode({"role": "service_role"}, "bench-secret", algorithm="HS256")
+
+
+# ======================
+# 로컬 Supabase 대체 서버
+# ======================
+def create_fake_supabase(public_jwk: Dict[str, Any], latency_ms: float) -> FastAPI:
+    fake = FastAPI()
+    users: Dict[str, Dict[str, Any]] = {}
+    holds: Dict[str, str] = {}
+    committed: set = set()
+    ledger: Dict[str, Dict[str, Any]] = {}
+    delay = latency_ms / 1000
+
+    def user_id_from(request: Request) -> Optional[str]:
+        value = request.query_params.get("user_id") or request.query_params.get("hold_id")
+        return value[3:] if value and value.startswith("eq.") else value
+
+    def rows(*items: Optional[Dict[str, Any]]) -> Response:
+        return Response(
+            json.dumps([i for i in items if i is not None]),
+            media_type="application/json",
+        )
+
+    def take_credit(user: Dict[str, Any], amount: int = 1) -> None:
+        from_free = min(user["free_credits"], amount)
+        user["free_credits"] -= from_free
+        user["paid_credits"] -= amount - from_free
+
+    @fake.get("/auth/v1/.well-known/jwks.json")
+    async def jwks():
+        return {"keys": [public_jwk]}
+
+    @fake.get("/rest/v1/users_credits")
+    async def select_user(request: Request):
+        await asyncio.sleep(delay)
+        return rows(users.get(user_id_from(request)))
+
+    @fake.post("/rest/v1/users_credits")
+    async def insert_user(request: Request):
+        await asyncio.sleep(delay)
+        body = await request.json()
+        users[body["user_id"]] = {**body, "deleted_at": None}
+        return rows(users[body["user_id"]])
+
+    @fake.patch("/rest/v1/users_credits")
+    async def update_user(request: Request):
+        await asyncio.sleep(delay)
+        user = users.get(user_id_from(request))
+        if user:
+            user.update(await request.json())
+        return rows(user)
+
+    @fake.delete("/rest/v1/credit_holds")
+    async def delete_hold(request: Request):
+        await asyncio.sleep(delay)
+        holds.pop(user_id_from(request), None)
+        return rows()
+
+    @fake.post("/rest/v1/rpc/reserve_user_credit")
+    async def rpc_reserve(request: Request):
+        await asyncio.sleep(delay)
+        user_id = (await request.json())["p_user_id"]
+        user = users.get(user_id)
+        if not user:
+            return rows({"status": "not_found", "hold_id": None, "available_credits": 0})
+        balance = {
+            "free_credits": user["free_credits"],
+            "paid_credits": user["paid_credits"],
+            "deleted_at": user.get("deleted_at"),
+        }
+        if user.get("deleted_at"):
+            return rows({"status": "deleted", "hold_id": None, "available_credits": 0, **balance})
+        available = user["free_credits"] + user["paid_credits"] - sum(1 for u in holds.values() if u == user_id)
+        if available <= 0:
+            return rows({"status": "insufficient", "hold_id": None, "available_credits": available, **balance})
+        hold_id = str(uuid.uuid4())
+        holds[hold_id] = user_id
+        return rows({"status": "ok", "hold_id": hold_id, "available_credits": available - 1, **balance})
+
+    @fake.post("/rest/v1/rpc/commit_credit_hold")
+    async def rpc_commit_hold(request: Request):
+        await asyncio.sleep(delay)
+        body = await request.json()
+        holds[body["p_hold_id"]] = body["p_user_id"]
+        committed.add(body["p_hold_id"])
+        return Response("null", media_type="application/json")
+
+    @fake.post("/rest/v1/rpc/settle_credit_holds")
+    async def rpc_settle_holds(request: Request):
+        await asyncio.sleep(delay)
+        limit = (await request.json())["p_limit"]
+        touched: Dict[str, int] = {}
+        for hold_id in list(committed)[:limit]:
+            committed.discard(hold_id)
+            user_id = holds.pop(hold_id, None)
+            if hold_id in ledger or user_id not in users:
+                continue
+            ledger[hold_id] = {"user_id": user_id, "amount": 1}
+            take_credit(users[user_id])
+            touched[user_id] = touched.get(user_id, 0) + 1
+        return rows(*[
+            {
+                "user_id": uid,
+                "free_credits": users[uid]["free_credits"],
+                "paid_credits": users[uid]["paid_credits"],
+                "settled": settled,
+            }
+            for uid, settled in touched.items()
+        ])
+
+    return fake
+
+
+# ======================
+# OpenAI 대체 클라이언트
+# ======================
+class StubAsyncOpenAI:
+    """Responses / Chat Completions 비스트림 호출에 지연 후 검증을 통과하는 시 4편을 돌려주는 대체 클라이언트"""
+
+    POEM = "봄바람 불어오는 언덕에\n그리운 이름 하나 적어 두고\n햇살 아래 천천히 걸으며\n오래된 노래를 흥얼거린다"
+
+    def __init__(self, latency_ms: float):
+        self.delay = latency_ms / 1000
+        self.text = json.dumps({f"poem{i}": f"제목 {i}\n\n{self.POEM}" for i in range(1, 5)}, ensure_ascii=False)
+        self.responses = SimpleNamespace(create=self._responses_create)
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._chat_create))
+
+    async def _responses_create(self, **kwargs: Any) -> Any:
+        await asyncio.sleep(self.delay)
+        usage = SimpleNamespace(
+            input_tokens=1200, output_tokens=400,
+            input_tokens_details=SimpleNamespace(cached_tokens=0),
+            output_tokens_details=SimpleNamespace(reasoning_tokens=0),
+        )
+        return SimpleNamespace(output_text=self.text, usage=usage, incomplete_details=None)
+
+    async def _chat_create(self, **kwargs: Any) -> Any:
+        await asyncio.sleep(self.delay)
+        usage = SimpleNamespace(
+            prompt_tokens=1200, completion_tokens=400,
+            prompt_tokens_details=SimpleNamespace(cached_tokens=0),
+            completion_tokens_details=SimpleNamespace(reasoning_tokens=0),
+        )
+        message = SimpleNamespace(content=self.text)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message, finish_reason="stop")], usage=usage)
+
+    async def close(self) -> None:
+        pass
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_fake_supabase(app: FastAPI, port: int) -> uvicorn.Server:
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="error"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+
+# ======================
+# 측정 유틸
+# ======================
+def percentile(samples: List[float], pct: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+async def run_level(
+    name: str,
+    concurrency: int,
+    total: int,
+    op: Callable[[int], Awaitable[Any]],
+) -> Dict[str, Any]:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    errors = 0
+
+    async def one(i: int) -> None:
+        nonlocal errors
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                await op(i)
+            except Exception:
+                errors += 1
+            latencies.append(time.perf_counter() - start)
+
+    wall_start = time.perf_counter()
+    await asyncio.gather(*[one(i) for i in range(total)])
+    wall = time.perf_counter() - wall_start
+    return {
+        "endpoint": name,
+        "concurrency": concurrency,
+        "requests": total,
+        "errors": errors,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "mean_ms": statistics.fmean(latencies) * 1000,
+        "rps": total / wall if wall else 0.0,
+    }
+
+
+def print_report(results: List[Dict[str, Any]]) -> None:
+    print("\n" + "=" * 92)
+    print(f"{'endpoint':<24}{'conc':>6}{'reqs':>7}{'err':>5}{'p50(ms)':>10}{'p95(ms)':>10}{'p99(ms)':>10}{'mean(ms)':>10}{'rps':>10}")
+    print("-" * 92)
+    for r in results:
+        print(
+            f"{r['endpoint']:<24}{r['concurrency']:>6}{r['requests']:>7}{r['errors']:>5}"
+            f"{r['p50_ms']:>10.1f}{r['p95_ms']:>10.1f}{r['p99_ms']:>10.1f}{r['mean_ms']:>10.1f}{r['rps']:>10.1f}"
+        )
+    print("=" * 92)
+
+
+# ======================
+# 벤치마크 본체
+# ======================
+async def run_benchmark(args: argparse.Namespace) -> List[Dict[str, Any]]:
+    private_key = ec.generate_private_key(ec.SECP256R1())
+    public_jwk = json.loads(ECAlgorithm.to_jwk(private_key.public_key()))
+    public_jwk.update({"kid": KID, "alg": "ES256", "use": "sig"})
+
+    port = _free_port()
+    supabase_url = f"http://127.0.0.1:{port}"
+    fake_server = start_fake_supabase(create_fake_supabase(public_jwk, args.latency_ms), port)
+
+    # main 을 임포트하기 전에 대체 서버를 가리키도록 설정
+    os.environ["SUPABASE_URL"] = supabase_url
+    os.environ["SUPABASE_SERVICE_ROLE_KEY"] = SERVICE_ROLE_KEY
+    os.environ.setdefault("SUPABASE_HTTP2", "false")
+    os.environ.setdefault("OPENAI_API_KEY", "bench")
+    os.environ.setdefault("LLM_HEDGE_ENABLED", "false")
+    import main
+
+    # 어댑터가 만들어지기 전에 레지스트리의 비동기 클라이언트를 대체 클라이언트로 바꿈
+    main.llm_registry._async_client = StubAsyncOpenAI(args.llm_latency_ms)
+
+    def sign_token(sub: str) -> str:
+        now = int(time.time())
+        return jwt.encode(
+            {
+                "sub": sub,
+                "iss": f"{supabase_url}/auth/v1",
+                "aud": "authenticated",
+                "role": "authenticated",
+                "iat": now,
+                "exp": now + 3600,
+            },
+            private_key,
+            algorithm="ES256",
+            headers={"kid": KID},
+        )
+
+    results: List[Dict[str, Any]] = []
+    async with main.lifespan(main.app):
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            # 측정 대상 사용자 등록 (충분한 크레딧)
+            user_ids = [str(uuid.uuid4()) for _ in range(args.users)]
+            for user_id in user_ids:
+                resp = await client.post("/auth/register", json={"access_token": sign_token(user_id)})
+                resp.raise_for_status()
+                await main.credit_repo.client.table("users_credits").update(
+                    {"free_credits": 10 ** 6}
+                ).eq("user_id", user_id).execute()
+
+            for concurrency in args.concurrency:
+                # 측정 구간 밖에서 해제할 예약 (cold validate + reserve)
+                open_holds: List[str] = []
+
+                async def register(i: int) -> None:
+                    resp = await client.post(
+                        "/auth/register",
+                        json={"access_token": sign_token(str(uuid.uuid4()))},
+                    )
+                    resp.raise_for_status()
+
+                async def reserve_commit(i: int) -> None:
+                    user_id = user_ids[i % len(user_ids)]
+                    hold = await main.reserve_user_credit(user_id)
+                    await main.commit_credit_hold(user_id, hold)
+
+                async def reserve_release(i: int) -> None:
+                    hold = await main.reserve_user_credit(user_ids[i % len(user_ids)])
+                    await main.release_credit_hold(hold["hold_id"])
+
+                async def cold_validate(i: int) -> None:
+                    user_id = user_ids[i % len(user_ids)]
+                    main.credit_repo.balance_cache.invalidate(user_id)
+                    main.reject_by_cached_credit(user_id)
+                    hold = await main.reserve_user_credit(user_id)
+                    open_holds.append(hold["hold_id"])
+
+                async def generate(i: int) -> None:
+                    # 키워드를 요청마다 바꿔 결과 캐시/같은 조건 합치기 없이 전체 경로를 지나게 함
+                    resp = await client.post("/poems/generate", json={
+                        "user_id": user_ids[i % len(user_ids)],
+                        "style": "서정적",
+                        "author_style": "김소월",
+                        "keywords": ["봄", uuid.uuid4().hex[:8]],
+                        "length": "4행",
+                    })
+                    resp.raise_for_status()
+                    if not resp.json().get("success"):
+                        raise RuntimeError(resp.json().get("error_code"))
+
+                for name, op in (
+                    ("POST /auth/register", register),
+                    ("reserve → commit", reserve_commit),
+                    ("reserve → release", reserve_release),
+                    ("cold validate+reserve", cold_validate),
+                    ("POST /poems/generate", generate),
+                ):
+                    result = await run_level(name, concurrency, args.requests, op)
+                    results.append(result)
+                    print(f"  ✔ {name} @ {concurrency}: p50 {result['p50_ms']:.1f}ms, {result['rps']:.0f} rps")
+                    for hold_id in open_holds:
+                        await main.release_credit_hold(hold_id)
+                    open_holds.clear()
+
+            # 확정된 예약이 원장으로 정산되는지 확인
+            await main.credit_ledger.flush()
+
+            metrics = (await client.get("/metrics")).json()
+
+    fake_server.should_exit = True
+    print_report(results)
+    print("\n📊 /metrics 요약")
+    print(json.dumps(metrics, ensure_ascii=False, indent=2))
+    return results
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="인증 + 크레딧 핫패스 벤치마크")
+    parser.add_argument("--concurrency", default="1,10,50,200",
+                        type=lambda v: [int(x) for x in v.split(",") if x],
+                        help="쉼표로 구분한 동시성 단계 (기본: 1,10,50,200)")
+    parser.add_argument("--requests", type=int, default=500, help="단계·엔드포인트별 요청 수")
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="대체 PostgREST 응답 지연(ms)")
+    parser.add_argument("--llm-latency-ms", type=float, default=0.0, help="대체 OpenAI 응답 지연(ms)")
+    parser.add_argument("--users", type=int, default=50, help="예약/생성 대상 사용자 수")
+    parser.add_argument("--json", dest="json_path", help="결과를 JSON 파일로 저장")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    results = asyncio.run(run_benchmark(args))
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"💾 결과 저장: {args.json_path}")
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+프롬프트 배치별 첫 토큰 지연(TTFT) / 프롬프트 캐시 적중 벤치마크 (실제 OpenAI API 호출)
+
+구성
+----
+- 배치(layout)마다 전용 LLMClientRegistry와 생성기(PoemGenerator / QuoteGenerator)를 만들어
+  같은 조건 목록으로 스트리밍 생성을 요청
+  * static_first   : 고정 지침/출력 형식 → 조건 (기본 배치)
+  * variable_first : 조건 → 고정 지침/출력 형식 (이전 배치)
+- 요청마다 성향·작가·키워드·길이 조합을 바꿔 실제 트래픽처럼 조건 부분만 달라지게 함
+- 배치마다 --warmup 개 요청을 먼저 보내 캐시를 채운 뒤 측정 (헤징은 끔)
+- 측정 대상
+  * TTFT: 요청 시작 → 첫 텍스트 조각 도착
+  * 전체 시간: 요청 시작 → 스트림 종료
+  * 입력 토큰 중 캐시에서 읽은 비율 (어댑터의 prompt_cache 집계, 스트림을 끝까지 읽어 사용량 이벤트까지 받음)
+- 주의: OpenAI 프롬프트 캐시는 앞부분이 같은 1024토큰 이상 프롬프트에만 적용되므로,
+  고정 앞부분이 그보다 짧으면 두 배치 모두 cached 비율이 0으로 나옴 (입력 토큰 수를 함께 출력)
+
+실행
+----
+OPENAI_API_KEY=... uv run python bench_prompt_cache.py --kind poem --requests 20 --concurrency 4
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import statistics
+import time
+from typing import Any, Dict, List
+
+import poem_generator_modern
+import quote_generator_modern
+from llm_adapters import GenOptions, ModelAdapterFactory
+from llm_client_registry import LLMClientRegistry
+
+STYLES = ["서정적", "희망적", "쓸쓸한", "따뜻한", "초현실적"]
+AUTHORS = ["김소월", "윤동주", "백석", "나태주", "정호승"]
+KEYWORD_SETS = [["봄", "바람"], ["바다", "그리움"], ["별", "밤"], ["눈", "첫사랑"], ["길", "어머니"]]
+LENGTHS = {"poem": ["4행", "8행", "12행"], "quote": ["짧게 1-2문장", "보통 2-3문장"]}
+
+
+# ======================
+# 측정 유틸
+# ======================
+def percentile(samples: List[float], pct: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def build_options(model: str, reasoning_effort: str, max_tokens: int) -> GenOptions:
+    if model.lower().startswith("gpt-5"):
+        return GenOptions(model=model, reasoning_effort=reasoning_effort, max_output_tokens=max_tokens)
+    return GenOptions(model=model, temperature=0.9, max_tokens=max_tokens)
+
+
+def request_conditions(kind: str, total: int) -> List[Dict[str, Any]]:
+    combos = itertools.cycle(itertools.product(STYLES, AUTHORS, KEYWORD_SETS, LENGTHS[kind]))
+    return [
+        {"style": style, "author_style": author, "keywords": keywords, "length": length}
+        for style, author, keywords, length in itertools.islice(combos, total)
+    ]
+
+
+async def run_layout(layout: str, args: argparse.Namespace) -> Dict[str, Any]:
+    registry = LLMClientRegistry(api_key=os.getenv("OPENAI_API_KEY"), hedging=False)
+    if args.kind == "poem":
+        generator = poem_generator_modern.PoemGenerator(registry=registry, structured_output=args.structured, prompt_layout=layout)
+        stream = generator.astream_poems
+    else:
+        generator = quote_generator_modern.QuoteGenerator(registry=registry, structured_output=args.structured, prompt_layout=layout)
+        stream = generator.astream_quotes
+    opt = build_options(args.model, args.reasoning_effort, args.max_tokens)
+    semaphore = asyncio.Semaphore(args.concurrency)
+    ttfts: List[float] = []
+    totals: List[float] = []
+    errors = 0
+
+    async def one(conditions: Dict[str, Any], measure: bool) -> None:
+        nonlocal errors
+        async with semaphore:
+            start = time.perf_counter()
+            first = None
+            try:
+                async for _ in stream(**conditions, opt=opt):
+                    if first is None:
+                        first = time.perf_counter() - start
+            except Exception as e:
+                if measure:
+                    errors += 1
+                print(f"  ⚠️ {layout} 요청 실패: {e}")
+                return
+            if measure and first is not None:
+                ttfts.append(first)
+                totals.append(time.perf_counter() - start)
+
+    conditions = request_conditions(args.kind, args.warmup + args.requests)
+    for warmup in conditions[:args.warmup]:
+        await one(warmup, measure=False)
+    adapter = registry.adapter(opt.model, ModelAdapterFactory.create)
+    warm_cache = adapter.prompt_cache.stats()
+
+    wall_start = time.perf_counter()
+    await asyncio.gather(*(one(c, measure=True) for c in conditions[args.warmup:]))
+    wall = time.perf_counter() - wall_start
+
+    cache = adapter.prompt_cache.stats()
+    calls = cache["calls"] - warm_cache["calls"]
+    input_tokens = cache["input_tokens"] - warm_cache["input_tokens"]
+    cached_tokens = cache["cached_tokens"] - warm_cache["cached_tokens"]
+    await registry.aclose()
+    return {
+        "layout": layout,
+        "kind": args.kind,
+        "model": args.model,
+        "structured": args.structured,
+        "requests": args.requests,
+        "errors": errors,
+        "ttft_p50_ms": percentile(ttfts, 50) * 1000 if ttfts else None,
+        "ttft_p95_ms": percentile(ttfts, 95) * 1000 if ttfts else None,
+        "ttft_mean_ms": statistics.fmean(ttfts) * 1000 if ttfts else None,
+        "total_p50_ms": percentile(totals, 50) * 1000 if totals else None,
+        "input_tokens_mean": input_tokens / calls if calls else None,
+        "cached_ratio": cached_tokens / input_tokens if input_tokens else 0.0,
+        "hit_calls": cache["hit_calls"] - warm_cache["hit_calls"],
+        "wall_seconds": wall,
+    }
+
+
+def print_report(results: List[Dict[str, Any]]) -> None:
+    def ms(value: Any) -> str:
+        return f"{value:>10.0f}" if value is not None else f"{'-':>10}"
+
+    print("\n" + "=" * 96)
+    print(f"{'layout':<16}{'reqs':>6}{'err':>5}{'ttft p50':>10}{'ttft p95':>10}{'ttft avg':>10}"
+          f"{'total p50':>11}{'in tok':>8}{'cached%':>9}{'hits':>6}")
+    print("-" * 96)
+    for r in results:
+        in_tok = f"{r['input_tokens_mean']:>8.0f}" if r["input_tokens_mean"] is not None else f"{'-':>8}"
+        print(
+            f"{r['layout']:<16}{r['requests']:>6}{r['errors']:>5}"
+            f"{ms(r['ttft_p50_ms'])}{ms(r['ttft_p95_ms'])}{ms(r['ttft_mean_ms'])} {ms(r['total_p50_ms'])}"
+            f"{in_tok}{r['cached_ratio'] * 100:>8.1f}%{r['hit_calls']:>6}"
+        )
+    print("=" * 96)
+
+
+# ======================
+# 벤치마크 본체
+# ======================
+async def run_benchmark(args: argparse.Namespace) -> List[Dict[str, Any]]:
+    results: List[Dict[str, Any]] = []
+    for layout in args.layouts:
+        print(f"▶ {layout}: {args.kind} {args.requests}건 (동시 {args.concurrency}, 워밍업 {args.warmup}건)")
+        result = await run_layout(layout, args)
+        results.append(result)
+        print(f"  ✔ {layout}: TTFT p50 {result['ttft_p50_ms'] or 0:.0f}ms, cached {result['cached_ratio'] * 100:.1f}%")
+    print_report(results)
+    return results
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="프롬프트 배치별 TTFT / 프롬프트 캐시 벤치마크")
+    parser.add_argument("--kind", choices=("poem", "quote"), default="poem", help="생성 종류")
+    parser.add_argument("--layouts", default="static_first,variable_first",
+                        type=lambda v: [x for x in v.split(",") if x],
+                        help="쉼표로 구분한 비교할 배치 (기본: static_first,variable_first)")
+    parser.add_argument("--model", default=os.getenv("OPENAI_MODEL", "gpt-5-mini-2025-08-07"), help="모델")
+    parser.add_argument("--reasoning-effort", default="low", help="GPT-5 reasoning effort")
+    parser.add_argument("--max-tokens", type=int, default=2048, help="출력 토큰 상한")
+    parser.add_argument("--requests", type=int, default=20, help="배치별 측정 요청 수")
+    parser.add_argument("--warmup", type=int, default=2, help="배치별 측정 전 캐시를 채우는 요청 수")
+    parser.add_argument("--concurrency", type=int, default=4, help="동시 요청 수")
+    parser.add_argument("--structured", action=argparse.BooleanOptionalAction,
+                        default=os.getenv("STRUCTURED_OUTPUT", "false").lower() == "true",
+                        help="구조화 출력(JSON schema) 사용 여부 (기본: STRUCTURED_OUTPUT)")
+    parser.add_argument("--json", dest="json_path", help="결과를 JSON 파일로 저장")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    results = asyncio.run(run_benchmark(args))
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"💾 결과 저장: {args.json_path}")
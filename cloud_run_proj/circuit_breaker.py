@@ -0,0 +1,117 @@
+# circuit_breaker.py
+from __future__ import annotations
+from collections import deque
+from typing import Optional, Dict, Any, Tuple
+import os
+import time
+
+
+# ======================
+# 모델별 차단기 (circuit breaker)
+# ======================
+class CircuitBreaker:
+    """
+    한 모델의 최근 호출 결과를 보고 트래픽을 끊었다가 되살리는 차단기
+    - closed: 최근 window_size번 중 min_calls번 이상 쌓였을 때 실패율이 failure_rate 이상이거나
+      p95 지연이 p95_seconds를 넘으면 open
+    - open: open_seconds 동안 호출을 막음 (호출한 쪽은 대체 모델로 전환)
+    - half_open: 시험 호출을 half_open_probes개까지만 허용, 성공(지연 기준 이내)하면 closed, 실패하면 다시 open
+      (시험 호출이 결과 없이 사라져도 open_seconds가 지나면 새 시험 호출을 허용)
+    - 시도 단위(재시도, 헤징 복제 포함)로 기록하며, 입장 제어 대기처럼 모델과 무관한 실패는 기록하지 않음
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        failure_rate: float = 0.5,
+        p95_seconds: float = 60.0,
+        window_size: int = 20,
+        min_calls: int = 10,
+        open_seconds: float = 30.0,
+        half_open_probes: int = 1,
+    ):
+        self.failure_rate = failure_rate
+        self.p95_seconds = p95_seconds
+        self.min_calls = min_calls
+        self.open_seconds = open_seconds
+        self.half_open_probes = half_open_probes
+
+        self.state = self.CLOSED
+        self._window: deque[Tuple[bool, float]] = deque(maxlen=window_size)  # (성공 여부, 지연)
+        self._opened_at = 0.0
+        self._probes = 0
+        self._probe_started_at = 0.0
+        self._stats = {"opened": 0, "rejected": 0, "probes": 0}
+
+    @classmethod
+    def from_env(cls) -> "CircuitBreaker":
+        return cls(
+            failure_rate=float(os.getenv("LLM_BREAKER_FAILURE_RATE", "0.5")),
+            p95_seconds=float(os.getenv("LLM_BREAKER_P95_SECONDS", "60")),
+            window_size=int(os.getenv("LLM_BREAKER_WINDOW_SIZE", "20")),
+            min_calls=int(os.getenv("LLM_BREAKER_MIN_CALLS", "10")),
+            open_seconds=float(os.getenv("LLM_BREAKER_OPEN_SECONDS", "30")),
+            half_open_probes=int(os.getenv("LLM_BREAKER_HALF_OPEN_PROBES", "1")),
+        )
+
+    def allow(self) -> bool:
+        """이 모델로 요청을 보내도 되는지 (half_open이면 시험 호출 자리를 하나 차지)"""
+        now = time.monotonic()
+        if self.state == self.OPEN and now - self._opened_at >= self.open_seconds:
+            self.state = self.HALF_OPEN
+            self._probes = 0
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.HALF_OPEN and (
+            self._probes < self.half_open_probes or now - self._probe_started_at >= self.open_seconds
+        ):
+            self._probes += 1
+            self._probe_started_at = now
+            self._stats["probes"] += 1
+            return True
+        self._stats["rejected"] += 1
+        return False
+
+    def record(self, ok: bool, latency: float) -> None:
+        if self.state == self.HALF_OPEN:
+            if ok and latency <= self.p95_seconds:
+                self.state = self.CLOSED
+                self._window.clear()
+            else:
+                self._open()
+            return
+        if self.state == self.OPEN:
+            # 차단 전에 시작된 호출의 늦은 결과는 무시
+            return
+
+        self._window.append((ok, latency))
+        if len(self._window) < self.min_calls:
+            return
+        failures = sum(1 for success, _ in self._window if not success)
+        if failures / len(self._window) >= self.failure_rate or self._p95() > self.p95_seconds:
+            self._open()
+
+    def stats(self) -> Dict[str, Any]:
+        failures = sum(1 for success, _ in self._window if not success)
+        return {
+            "state": self.state,
+            "calls_in_window": len(self._window),
+            "failure_rate": failures / len(self._window) if self._window else 0.0,
+            "p95_seconds": self._p95() if self._window else None,
+            **self._stats,
+        }
+
+    # ---------- 내부 ----------
+    def _open(self) -> None:
+        self.state = self.OPEN
+        self._opened_at = time.monotonic()
+        self._probes = 0
+        self._window.clear()
+        self._stats["opened"] += 1
+
+    def _p95(self) -> float:
+        ordered = sorted(latency for _, latency in self._window)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
@@ -0,0 +1,123 @@
+# credit_ledger.py
+from __future__ import annotations
+from typing import Optional, Dict, Any
+import asyncio
+import os
+import time
+
+from credit_repository import CreditRepository
+
+
+# ======================
+# 확정된 예약을 묶음으로 정산하는 크레딧 원장
+# ======================
+class CreditLedger:
+    """
+    생성 성공 시의 차감을 DB에 먼저 확정하고, 잔액 반영은 묶음으로 처리하는 원장
+    - commit: RPC `commit_credit_hold` 한 번으로 예약(credit_holds)에 committed_at을 기록
+      → 확정된 예약은 만료되지 않으므로 인스턴스가 죽어도 차감이 잔액으로 되돌아가지 않음
+      (로컬 파일에 의존하지 않으므로 Cloud Run 인스턴스 교체/메모리 파일시스템에도 안전)
+    - flush: RPC `settle_credit_holds` 한 번으로 확정된 예약을 credit_ledger에 기록하고
+      같은 트랜잭션에서 users_credits 잔액을 갱신, 해당 예약을 삭제
+    - 주기(flush_interval_seconds) 또는 건수(batch_size) 도달 시 flush, 기동/종료 시에도 flush
+    - 정산은 이 인스턴스가 확정한 예약에 한정되지 않으므로, 죽은 인스턴스가 남긴 확정 예약도
+      다른 인스턴스의 flush(또는 pg_cron)가 정산함. CPU 제한으로 주기 작업이 늦어져도
+      정산 전까지는 확정 예약이 reserve_user_credit의 잔액 판단에 포함되므로 잔액은 정확함
+    """
+
+    def __init__(
+        self,
+        repo: CreditRepository,
+        flush_interval_seconds: float = 2.0,
+        batch_size: int = 200,
+    ):
+        self.repo = repo
+        self.flush_interval_seconds = flush_interval_seconds
+        self.batch_size = batch_size
+
+        self._unsettled = 0
+        self._flush_lock = asyncio.Lock()
+        self._flush_task: Optional[asyncio.Task] = None
+        self._timer_task: Optional[asyncio.Task] = None
+        self._stats = {
+            "committed": 0,
+            "commit_failures": 0,
+            "settled": 0,
+            "flushes": 0,
+            "flush_failures": 0,
+            "last_flush_seconds": None,
+        }
+
+    @classmethod
+    def from_env(cls, repo: CreditRepository) -> "CreditLedger":
+        return cls(
+            repo=repo,
+            flush_interval_seconds=float(os.getenv("CREDIT_LEDGER_FLUSH_INTERVAL_SECONDS", "2")),
+            batch_size=int(os.getenv("CREDIT_LEDGER_BATCH_SIZE", "200")),
+        )
+
+    # ---------- 수명주기 ----------
+    async def start(self) -> None:
+        """이전 인스턴스가 남긴 확정 예약을 정산하고 주기적 flush를 시작"""
+        await self.flush()
+        self._timer_task = asyncio.create_task(self._flush_periodically())
+
+    async def aclose(self) -> None:
+        """주기 작업을 멈추고 남은 확정 예약을 정산 (실패해도 확정은 DB에 남아 있음)"""
+        if self._timer_task:
+            self._timer_task.cancel()
+            try:
+                await self._timer_task
+            except asyncio.CancelledError:
+                pass
+        if self._flush_task:
+            await asyncio.gather(self._flush_task, return_exceptions=True)
+        await self.flush()
+
+    # ---------- 기록 ----------
+    async def commit(self, user_id: str, hold_id: str) -> None:
+        """예약을 DB에 확정 (응답 전에 끝나야 차감이 유실되지 않음, 실패 시 예외)"""
+        try:
+            await self.repo.commit_hold(hold_id, user_id)
+        except Exception:
+            self._stats["commit_failures"] += 1
+            raise
+        self._unsettled += 1
+        self._stats["committed"] += 1
+        self.repo.balance_cache.debit(user_id, 1)
+
+        if self._unsettled >= self.batch_size and (self._flush_task is None or self._flush_task.done()):
+            self._flush_task = asyncio.create_task(self.flush())
+
+    async def flush(self) -> int:
+        """확정된 예약을 한 번의 RPC로 정산하고 정산된 건수를 반환 (실패 시 다음 주기에 재시도)"""
+        async with self._flush_lock:
+            start = time.perf_counter()
+            try:
+                settled = await self.repo.settle_holds(max(self.batch_size, self._unsettled))
+            except Exception as e:
+                self._stats["flush_failures"] += 1
+                print(f"⚠️ 크레딧 정산 실패 (확정 예약은 DB에 남아 다음 주기에 재시도): {e}")
+                return 0
+
+            self._unsettled = max(0, self._unsettled - settled)
+            self._stats["settled"] += settled
+            self._stats["flushes"] += 1
+            self._stats["last_flush_seconds"] = time.perf_counter() - start
+            return settled
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "unsettled": self._unsettled,
+            "batch_size": self.batch_size,
+            "flush_interval_seconds": self.flush_interval_seconds,
+            **self._stats,
+        }
+
+    # ---------- 내부 ----------
+    async def _flush_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval_seconds)
+            # 한가할 때는 DB를 두드리지 않음 (남은 확정 예약은 다음 정산이나 pg_cron이 처리)
+            if self._unsettled:
+                await self.flush()
@@ -0,0 +1,248 @@
+# credit_repository.py
+from __future__ import annotations
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional, Dict, Any
+from datetime import datetime
+from supabase import acreate_client, AsyncClient, AsyncClientOptions
+import os
+import time
+import httpx
+
+from http_transport import TransportSettings, TransportMetrics, create_pooled_client, pool_stats
+
+
+# ======================
+# 잔액 캐시 (read-through / write-through)
+# ======================
+@dataclass(frozen=True)
+class CreditBalance:
+    free_credits: int
+    paid_credits: int
+    deleted_at: Optional[str] = None
+
+    @property
+    def total(self) -> int:
+        return self.free_credits + self.paid_credits
+
+    @classmethod
+    def from_row(cls, row: Dict[str, Any], deleted_at: Optional[str] = None) -> "CreditBalance":
+        return cls(
+            free_credits=row.get("free_credits", 0),
+            paid_credits=row.get("paid_credits", 0),
+            deleted_at=row.get("deleted_at", deleted_at),
+        )
+
+
+class CreditBalanceCache:
+    """
+    사용자별 (free_credits, paid_credits, deleted_at) 인프로세스 캐시
+    - 잔액은 이 서비스가 쓸 때만 바뀌므로, 우리 쪽 쓰기는 캐시를 직접 갱신(write-through)
+    - 다른 인스턴스/크론 작업의 변경은 짧은 TTL로 흡수
+    - 크기 상한을 넘으면 가장 오래 사용되지 않은 항목부터 제거(LRU)
+    """
+
+    def __init__(self, ttl_seconds: float, max_size: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_size = max_size
+        self._entries: OrderedDict[str, tuple[float, CreditBalance]] = OrderedDict()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def get(self, user_id: str) -> Optional[CreditBalance]:
+        entry = self._entries.get(user_id)
+        if entry is None or entry[0] <= time.monotonic():
+            if entry is not None:
+                del self._entries[user_id]
+            self._stats["misses"] += 1
+            return None
+        self._entries.move_to_end(user_id)
+        self._stats["hits"] += 1
+        return entry[1]
+
+    def put(self, user_id: str, balance: CreditBalance) -> None:
+        if self.max_size <= 0:
+            return
+        self._entries[user_id] = (time.monotonic() + self.ttl_seconds, balance)
+        self._entries.move_to_end(user_id)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self._stats["evictions"] += 1
+
+    def peek(self, user_id: str) -> Optional[CreditBalance]:
+        """통계/LRU 순서에 영향 없이 현재 항목 확인 (쓰기 경로 전용)"""
+        entry = self._entries.get(user_id)
+        return entry[1] if entry else None
+
+    def debit(self, user_id: str, amount: int) -> None:
+        """아직 DB에 반영되지 않은 차감을 캐시에 먼저 적용 (free_credits 우선)"""
+        entry = self._entries.get(user_id)
+        if entry is None:
+            return
+        expires_at, balance = entry
+        from_free = min(balance.free_credits, amount)
+        self._entries[user_id] = (expires_at, CreditBalance(
+            free_credits=balance.free_credits - from_free,
+            paid_credits=balance.paid_credits - (amount - from_free),
+            deleted_at=balance.deleted_at,
+        ))
+
+    def invalidate(self, user_id: str) -> None:
+        self._entries.pop(user_id, None)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self._stats["hits"] + self._stats["misses"]
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl_seconds,
+            **self._stats,
+            "hit_rate": self._stats["hits"] / lookups if lookups else 0.0,
+        }
+
+
+# ======================
+# users_credits / credit_holds 데이터 접근 계층
+# ======================
+class CreditRepository:
+    """
+    Supabase 비동기 클라이언트 위에서 크레딧 관련 쿼리를 담당하는 저장소
+    - 모든 호출은 await 가능하므로 엔드포인트 실행 중 이벤트 루프를 막지 않음
+    - 하나의 AsyncClient(=하나의 PostgREST 커넥션 풀)를 프로세스 전체가 공유
+    - HTTP 오류 응답 변환은 호출하는 쪽(main.py)의 책임
+    """
+
+    TABLE = "users_credits"
+    HOLDS_TABLE = "credit_holds"
+
+    def __init__(
+        self,
+        client: AsyncClient,
+        balance_cache: Optional[CreditBalanceCache] = None,
+        http_client: Optional[httpx.AsyncClient] = None,
+        transport_settings: Optional[TransportSettings] = None,
+        transport_metrics: Optional[TransportMetrics] = None,
+    ):
+        self.client = client
+        self.balance_cache = balance_cache or CreditBalanceCache(
+            ttl_seconds=float(os.getenv("CREDIT_CACHE_TTL_SECONDS", "30")),
+            max_size=int(os.getenv("CREDIT_CACHE_MAX_SIZE", "10000")),
+        )
+        self.http_client = http_client
+        self.transport_settings = transport_settings
+        self.transport_metrics = transport_metrics
+
+    @classmethod
+    async def create(
+        cls,
+        supabase_url: str,
+        supabase_key: str,
+        transport_settings: Optional[TransportSettings] = None,
+    ) -> "CreditRepository":
+        """풀 설정을 명시한 httpx.AsyncClient를 만들어 Supabase 클라이언트에 주입"""
+        settings = transport_settings or TransportSettings.from_env()
+        metrics = TransportMetrics()
+        http_client = create_pooled_client(settings, metrics)
+        client = await acreate_client(
+            supabase_url,
+            supabase_key,
+            options=AsyncClientOptions(httpx_client=http_client),
+        )
+        return cls(
+            client,
+            http_client=http_client,
+            transport_settings=settings,
+            transport_metrics=metrics,
+        )
+
+    async def aclose(self) -> None:
+        await self.client.postgrest.aclose()
+        if self.http_client is not None and not self.http_client.is_closed:
+            await self.http_client.aclose()
+
+    def transport_stats(self) -> Optional[Dict[str, Any]]:
+        """PostgREST 커넥션 풀 상태 (활성/유휴 연결, 핸드셰이크 수)"""
+        if self.http_client is None:
+            return None
+        return pool_stats(self.http_client, self.transport_settings, self.transport_metrics)
+
+    # ---------- 사용자 ----------
+    async def get_user(self, user_id: str) -> Optional[Dict[str, Any]]:
+        result = await self.client.table(self.TABLE).select("*").eq("user_id", user_id).execute()
+        user = result.data[0] if result.data else None
+        if user:
+            self.balance_cache.put(user_id, CreditBalance.from_row(user))
+        return user
+
+    def cached_balance(self, user_id: str) -> Optional[CreditBalance]:
+        """캐시된 잔액만 확인 (미스여도 DB를 조회하지 않음, 최종 판단은 reserve RPC)"""
+        return self.balance_cache.get(user_id)
+
+    async def insert_user(self, user_id: str, free_credits: int) -> Optional[Dict[str, Any]]:
+        result = await self.client.table(self.TABLE).insert({
+            "user_id": user_id,
+            "free_credits": free_credits,
+            "paid_credits": 0,
+            "updated_at": datetime.now().isoformat()
+        }).execute()
+        user = result.data[0] if result.data else None
+        if user:
+            self.balance_cache.put(user_id, CreditBalance.from_row(user))
+        return user
+
+    async def mark_deleted(self, user_id: str, deleted_at: str) -> Optional[Dict[str, Any]]:
+        result = await self.client.table(self.TABLE).update({
+            "deleted_at": deleted_at,
+            "updated_at": deleted_at
+        }).eq("user_id", user_id).execute()
+        user = result.data[0] if result.data else None
+        if user:
+            self.balance_cache.put(user_id, CreditBalance.from_row(user, deleted_at=deleted_at))
+        return user
+
+    # ---------- 크레딧 ----------
+    async def reserve(self, user_id: str, ttl_seconds: int) -> Dict[str, Any]:
+        """크레딧 1 예약 (RPC reserve_user_credit). status/hold_id/available_credits 반환
+
+        탈퇴 여부와 잔액 확인도 RPC 안에서 처리하므로 예약 전에 따로 조회하지 않음.
+        RPC가 돌려준 잔액(free/paid, deleted_at)으로 캐시를 갱신해 다음 요청의 사전 거절에 사용.
+        """
+        result = await self.client.rpc("reserve_user_credit", {
+            "p_user_id": user_id,
+            "p_ttl_seconds": ttl_seconds
+        }).execute()
+        hold = result.data[0] if result.data else {}
+        if hold.get("status") in ("ok", "insufficient", "deleted") and "free_credits" in hold:
+            self.balance_cache.put(user_id, CreditBalance.from_row(hold))
+        else:
+            self.balance_cache.invalidate(user_id)
+        return hold
+
+    async def commit_hold(self, hold_id: str, user_id: str) -> None:
+        """예약 확정 (RPC commit_credit_hold). 확정된 예약은 만료되지 않고 정산 때까지 잔액에서 제외됨"""
+        await self.client.rpc("commit_credit_hold", {
+            "p_hold_id": hold_id,
+            "p_user_id": user_id
+        }).execute()
+
+    async def settle_holds(self, limit: int) -> int:
+        """확정된 예약을 원장에 기록하고 잔액 반영 (RPC settle_credit_holds). 정산된 예약 수 반환"""
+        result = await self.client.rpc("settle_credit_holds", {"p_limit": limit}).execute()
+        rows = result.data or []
+        for row in rows:
+            self._apply_balance(row["user_id"], row)
+        return sum(row.get("settled", 0) for row in rows)
+
+    async def release_hold(self, hold_id: str) -> None:
+        await self.client.table(self.HOLDS_TABLE).delete().eq("hold_id", hold_id).execute()
+
+    def _apply_balance(self, user_id: str, row: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """정산 RPC 결과(free/paid)를 캐시에 반영. 결과가 없으면 캐시를 비워 다음에 다시 조회"""
+        if row is None:
+            self.balance_cache.invalidate(user_id)
+            return None
+        cached = self.balance_cache.peek(user_id)
+        self.balance_cache.put(
+            user_id,
+            CreditBalance.from_row(row, deleted_at=cached.deleted_at if cached else None),
+        )
+        return row
@@ -21,6 +21,21 @@ done
 
 # 선택적 환경변수 기본값 설정
 OPENAI_MODEL=${OPENAI_MODEL:-gpt-4o-mini}
+POEM_INVENTORY_ENABLED=${POEM_INVENTORY_ENABLED:-false}
+
+# 시 재고는 요청 밖의 백그라운드 작업으로 보충하므로, 켜면 CPU 항상 할당 + 최소 인스턴스 1개 이상으로 배포
+# (CPU 제한 모드에서는 응답 후 보충 작업이 멈추고, 인스턴스가 0개로 줄면 재고가 사라짐)
+if [ "$POEM_INVENTORY_ENABLED" = "true" ]; then
+    CPU_THROTTLING_FLAG="--no-cpu-throttling"
+    MIN_INSTANCES=${MIN_INSTANCES:-1}
+    if [ "$MIN_INSTANCES" -lt 1 ]; then
+        echo "⚠️ 시 재고를 켜면 최소 인스턴스는 1개 이상이어야 합니다. MIN_INSTANCES=1로 배포합니다."
+        MIN_INSTANCES=1
+    fi
+else
+    CPU_THROTTLING_FLAG="--cpu-throttling"
+    MIN_INSTANCES=${MIN_INSTANCES:-0}
+fi
 
 # 설정 변수
 PROJECT_ID="clever-lemon"  # GCP 프로젝트 ID로 변경하세요
@@ -52,9 +67,10 @@ gcloud run deploy $SERVICE_NAME \
     --timeout=60 \
     --concurrency=1000 \
     --max-instances=10 \
-    --min-instances=0 \
+    --min-instances=$MIN_INSTANCES \
+    $CPU_THROTTLING_FLAG \
     --clear-base-image \
-    --set-env-vars="SUPABASE_URL=${SUPABASE_URL},SUPABASE_SERVICE_ROLE_KEY=${SUPABASE_SERVICE_ROLE_KEY},OPENAI_API_KEY=${OPENAI_API_KEY},OPENAI_MODEL=${OPENAI_MODEL}"
+    --set-env-vars="SUPABASE_URL=${SUPABASE_URL},SUPABASE_SERVICE_ROLE_KEY=${SUPABASE_SERVICE_ROLE_KEY},OPENAI_API_KEY=${OPENAI_API_KEY},OPENAI_MODEL=${OPENAI_MODEL},POEM_INVENTORY_ENABLED=${POEM_INVENTORY_ENABLED}"
 
 # 4. 서비스 URL 가져오기
 SERVICE_URL=$(gcloud run services describe $SERVICE_NAME --region=$REGION --format='value(status.url)')
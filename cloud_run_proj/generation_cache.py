@@ -0,0 +1,136 @@
+# generation_cache.py
+from __future__ import annotations
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Optional, Dict, Any, List, Iterable, Tuple
+import os
+import time
+import unicodedata
+
+
+def _normalize_text(value: Optional[str]) -> str:
+    """NFC 정규화 + 앞뒤 공백 제거 + 연속 공백을 하나로"""
+    return " ".join(unicodedata.normalize("NFC", value or "").split())
+
+
+# ======================
+# 정규화된 생성 키
+# ======================
+@dataclass(frozen=True)
+class GenerationKey:
+    kind: str  # "poem" | "quote"
+    style: str
+    author_style: str
+    keywords: Tuple[str, ...]
+    length: str
+    model: str
+    reasoning_effort: Optional[str] = None
+
+    @classmethod
+    def normalize(
+        cls,
+        kind: str,
+        style: str,
+        author_style: str,
+        keywords: Iterable[str],
+        length: str,
+        model: str,
+        reasoning_effort: Optional[str] = None,
+    ) -> "GenerationKey":
+        """앱 프리셋에서 온 같은 조건이 표기 차이(조합형 한글, 공백, 키워드 순서/중복)와 무관하게 같은 키가 되도록 정규화"""
+        normalized_keywords = {_normalize_text(k) for k in keywords}
+        normalized_keywords.discard("")
+        return cls(
+            kind=kind,
+            style=_normalize_text(style),
+            author_style=_normalize_text(author_style),
+            keywords=tuple(sorted(normalized_keywords)),
+            length=_normalize_text(length),
+            model=model,
+            reasoning_effort=reasoning_effort,
+        )
+
+
+@dataclass
+class _CacheEntry:
+    variants: List[Tuple[float, List[str]]] = field(default_factory=list)  # (만료 시각, 결과 묶음)
+    cursor: int = 0  # 다음에 내줄 결과 묶음 위치 (순환)
+
+
+# ======================
+# 생성 결과 캐시
+# ======================
+class GenerationResultCache:
+    """
+    정규화된 키마다 검증을 통과한 생성 결과(4편/4개 묶음)를 여러 벌 보관하는 캐시
+    - 키마다 variants벌이 모일 때까지는 미스로 처리해 실제 생성 결과를 쌓음
+    - 다 모인 뒤에는 보관된 묶음을 돌아가며 내줘 같은 프리셋을 반복 요청해도 다른 결과를 받음
+    - 결과 묶음은 ttl_seconds가 지나면 개별적으로 만료되고, 빈자리는 다시 실제 생성으로 채움
+    - 키 수가 max_keys를 넘으면 가장 오래 사용되지 않은 키부터 제거(LRU)
+    """
+
+    def __init__(self, ttl_seconds: float, max_keys: int, variants: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_keys = max_keys
+        self.variants = variants
+        self._entries: OrderedDict[GenerationKey, _CacheEntry] = OrderedDict()
+        self._stats = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0, "expirations": 0}
+
+    @classmethod
+    def from_env(cls) -> "GenerationResultCache":
+        return cls(
+            ttl_seconds=float(os.getenv("RESULT_CACHE_TTL_SECONDS", "21600")),
+            max_keys=int(os.getenv("RESULT_CACHE_MAX_KEYS", "2000")),
+            variants=int(os.getenv("RESULT_CACHE_VARIANTS", "5")),
+        )
+
+    def get(self, key: GenerationKey) -> Optional[List[str]]:
+        """보관된 결과 묶음이 variants벌 모두 있으면 하나를 순환하며 반환, 아니면 None(미스)"""
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._expire(entry)
+        if entry is None or self.max_keys <= 0 or len(entry.variants) < self.variants:
+            self._stats["misses"] += 1
+            return None
+
+        self._entries.move_to_end(key)
+        _, items = entry.variants[entry.cursor % len(entry.variants)]
+        entry.cursor += 1
+        self._stats["hits"] += 1
+        return list(items)
+
+    def put(self, key: GenerationKey, items: List[str]) -> None:
+        """새로 생성된 결과 묶음을 보관 (이미 variants벌이면 가장 오래된 묶음을 교체)"""
+        if self.max_keys <= 0 or self.variants <= 0:
+            return
+        entry = self._entries.get(key)
+        if entry is None:
+            entry = self._entries[key] = _CacheEntry()
+        self._expire(entry)
+        entry.variants.append((time.monotonic() + self.ttl_seconds, list(items)))
+        del entry.variants[:-self.variants]
+        self._entries.move_to_end(key)
+        self._stats["stores"] += 1
+
+        while len(self._entries) > self.max_keys:
+            self._entries.popitem(last=False)
+            self._stats["evictions"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self._stats["hits"] + self._stats["misses"]
+        return {
+            "keys": len(self._entries),
+            "result_sets": sum(len(e.variants) for e in self._entries.values()),
+            "max_keys": self.max_keys,
+            "variants_per_key": self.variants,
+            "ttl_seconds": self.ttl_seconds,
+            **self._stats,
+            "hit_rate": self._stats["hits"] / lookups if lookups else 0.0,
+        }
+
+    # ---------- 내부 ----------
+    def _expire(self, entry: _CacheEntry) -> None:
+        now = time.monotonic()
+        alive = [v for v in entry.variants if v[0] > now]
+        self._stats["expirations"] += len(entry.variants) - len(alive)
+        entry.variants = alive
@@ -0,0 +1,144 @@
+# hedging.py
+from __future__ import annotations
+from collections import deque
+from typing import Optional, Dict, Any, Callable, Awaitable, TypeVar, Set
+import asyncio
+import os
+
+T = TypeVar("T")
+
+
+# ======================
+# 요청 헤징 정책 (tail latency 완화)
+# ======================
+class HedgePolicy:
+    """
+    느린 LLM 호출을 같은 요청의 복제본으로 추월하는 헤징 정책
+    - 최근 성공 호출의 OpenAI 호출 시간(observe로 전달, 입장 제어 대기 제외)을 window_size개까지 보관하고,
+      percentile 백분위를 헤징 대기 시간으로 사용
+    - 원 호출이 OpenAI 호출을 시작한 뒤 그 시간 안에 끝나지 않으면 같은 호출을 한 번 더 보내고
+      먼저 성공한 결과를 사용, 나머지는 취소
+    - 복제 호출 예산은 토큰 버킷: 호출마다 budget_ratio개씩 쌓이고(최대 budget_burst개) 복제 한 번에 1개 사용
+      → 기동 이후 누적 호출 수가 아니라 최근 호출 수에 비례하므로, 한가한 시간에 쌓인 여유로 장애 시 복제가 몰리지 않음
+    - 표본이 min_samples개 미만이면 헤징하지 않음 (기동 직후 오판 방지)
+    - 지연 분포는 모델/프롬프트 종류마다 다르므로 어댑터가 프롬프트 종류(cache_key)별로 정책을 따로 둠
+    """
+
+    def __init__(
+        self,
+        percentile: float = 95.0,
+        budget_ratio: float = 0.05,
+        min_samples: int = 20,
+        window_size: int = 200,
+        min_delay_seconds: float = 1.0,
+        budget_burst: float = 10.0,
+    ):
+        self.percentile = percentile
+        self.budget_ratio = budget_ratio
+        self.min_samples = min_samples
+        self.min_delay_seconds = min_delay_seconds
+        self.budget_burst = budget_burst
+        self._budget_tokens = 0.0
+        self._latencies: deque[float] = deque(maxlen=window_size)
+        self._stats = {
+            "calls": 0,
+            "hedges_fired": 0,
+            "hedges_won": 0,
+            "hedges_skipped_budget": 0,
+        }
+
+    @classmethod
+    def from_env(cls) -> "HedgePolicy":
+        return cls(
+            percentile=float(os.getenv("LLM_HEDGE_PERCENTILE", "95")),
+            budget_ratio=float(os.getenv("LLM_HEDGE_BUDGET_RATIO", "0.05")),
+            min_samples=int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20")),
+            window_size=int(os.getenv("LLM_HEDGE_WINDOW_SIZE", "200")),
+            min_delay_seconds=float(os.getenv("LLM_HEDGE_MIN_DELAY_SECONDS", "1")),
+            budget_burst=float(os.getenv("LLM_HEDGE_BUDGET_BURST", "10")),
+        )
+
+    def hedge_delay(self) -> Optional[float]:
+        """복제 호출을 보내기 전에 기다릴 시간 (표본 부족 시 None)"""
+        if len(self._latencies) < self.min_samples:
+            return None
+        return max(self.min_delay_seconds, self._latency_percentile(self.percentile))
+
+    def observe(self, latency: float) -> None:
+        """성공한 OpenAI 호출 한 번의 시간을 기록 (입장 제어 대기/재시도 백오프는 포함하지 않음)"""
+        self._latencies.append(latency)
+
+    async def run(self, call: Callable[[asyncio.Event], Awaitable[T]]) -> T:
+        """
+        call(started)를 실행하고, 헤징 대기 시간을 넘기면 복제 호출과 경쟁시켜 먼저 성공한 결과를 반환
+        - call은 입장 제어를 통과해 OpenAI 호출을 시작할 때 started를 set (대기열에서 기다린 시간으로 복제하지 않음)
+        """
+        self._stats["calls"] += 1
+        self._budget_tokens = min(self.budget_burst, self._budget_tokens + self.budget_ratio)
+        started = asyncio.Event()
+        primary = asyncio.ensure_future(call(started))
+        tasks: Set[asyncio.Future] = {primary}
+        try:
+            delay = self.hedge_delay()
+            if delay is not None:
+                await self._wait_started(primary, started)
+                done, _ = await asyncio.wait(tasks, timeout=delay)
+                if not done:
+                    if self._budget_allows():
+                        self._budget_tokens -= 1
+                        self._stats["hedges_fired"] += 1
+                        hedge = asyncio.ensure_future(call(asyncio.Event()))
+                        tasks.add(hedge)
+                        result, winner = await self._first_success(tasks)
+                        if winner is hedge:
+                            self._stats["hedges_won"] += 1
+                        return result
+                    self._stats["hedges_skipped_budget"] += 1
+
+            return await primary
+        finally:
+            # 진 쪽(또는 호출자 취소 시 남은 호출)은 취소해 연결과 토큰 낭비를 줄임
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self._stats,
+            "hedge_rate": self._stats["hedges_fired"] / self._stats["calls"] if self._stats["calls"] else 0.0,
+            "samples": len(self._latencies),
+            "budget_tokens": self._budget_tokens,
+            "p50_seconds": self._latency_percentile(50) if self._latencies else None,
+            "hedge_delay_seconds": self.hedge_delay(),
+        }
+
+    # ---------- 내부 ----------
+    def _budget_allows(self) -> bool:
+        return self._budget_tokens >= 1
+
+    @staticmethod
+    async def _wait_started(primary: asyncio.Future, started: asyncio.Event) -> None:
+        """원 호출이 OpenAI 호출을 시작하거나 (대기 중 실패 등으로) 끝날 때까지 기다림"""
+        waiter = asyncio.ensure_future(started.wait())
+        try:
+            await asyncio.wait({primary, waiter}, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            waiter.cancel()
+
+    def _latency_percentile(self, pct: float) -> float:
+        ordered = sorted(self._latencies)
+        index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+        return ordered[index]
+
+    @staticmethod
+    async def _first_success(tasks: Set[asyncio.Future]) -> tuple[Any, asyncio.Future]:
+        """먼저 성공한 호출의 결과를 반환 (하나가 실패하면 나머지를 계속 기다리고, 모두 실패하면 마지막 예외)"""
+        pending = set(tasks)
+        error: Optional[BaseException] = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    return task.result(), task
+                error = task.exception()
+        raise error
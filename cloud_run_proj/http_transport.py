@@ -0,0 +1,141 @@
+# http_transport.py
+from __future__ import annotations
+from dataclasses import dataclass, asdict
+from typing import Dict, Any, Optional
+import os
+import httpx
+
+
+# ======================
+# 커넥션 풀 설정
+# ======================
+@dataclass(frozen=True)
+class TransportSettings:
+    """
+    Supabase(PostgREST) 연결에 쓰는 httpx 커넥션 풀 설정
+    - Cloud Run --concurrency 와 인스턴스당 동시 크레딧 조회 수를 기준으로 크기를 정함
+    - keep-alive 로 연결을 재사용해 요청마다 TLS 핸드셰이크가 발생하지 않도록 함
+    """
+
+    max_connections: int = 100
+    max_keepalive_connections: int = 20
+    keepalive_expiry: float = 30.0  # 유휴 연결 유지 시간(초)
+    http2: bool = True  # 하나의 연결에서 여러 요청을 다중화
+    connect_timeout: float = 5.0
+    read_timeout: float = 10.0
+    write_timeout: float = 10.0
+    pool_timeout: float = 5.0  # 풀에서 빈 연결을 기다리는 최대 시간
+
+    @classmethod
+    def from_env(cls, prefix: str = "SUPABASE", default: Optional["TransportSettings"] = None) -> "TransportSettings":
+        """`{prefix}_POOL_MAX_CONNECTIONS` 형태의 환경변수로 기본값을 덮어씀 (다른 업스트림도 같은 규칙 사용)"""
+        default = default or cls()
+        return cls(
+            max_connections=int(os.getenv(f"{prefix}_POOL_MAX_CONNECTIONS", default.max_connections)),
+            max_keepalive_connections=int(os.getenv(f"{prefix}_POOL_MAX_KEEPALIVE", default.max_keepalive_connections)),
+            keepalive_expiry=float(os.getenv(f"{prefix}_POOL_KEEPALIVE_EXPIRY", default.keepalive_expiry)),
+            http2=os.getenv(f"{prefix}_HTTP2", str(default.http2)).lower() == "true",
+            connect_timeout=float(os.getenv(f"{prefix}_CONNECT_TIMEOUT", default.connect_timeout)),
+            read_timeout=float(os.getenv(f"{prefix}_READ_TIMEOUT", default.read_timeout)),
+            write_timeout=float(os.getenv(f"{prefix}_WRITE_TIMEOUT", default.write_timeout)),
+            pool_timeout=float(os.getenv(f"{prefix}_POOL_TIMEOUT", default.pool_timeout)),
+        )
+
+
+# ======================
+# 연결 지표 수집
+# ======================
+class TransportMetrics:
+    """httpcore trace 확장으로 TCP 연결/TLS 핸드셰이크/요청 수를 센다"""
+
+    def __init__(self):
+        self.counters = {
+            "requests": 0,
+            "tcp_connects": 0,
+            "tls_handshakes": 0,
+            "connect_failures": 0,
+        }
+
+    async def trace(self, event_name: str, info: Dict[str, Any]) -> None:
+        if event_name == "connection.connect_tcp.complete":
+            self.counters["tcp_connects"] += 1
+        elif event_name == "connection.start_tls.complete":
+            self.counters["tls_handshakes"] += 1
+        elif event_name in ("connection.connect_tcp.failed", "connection.start_tls.failed"):
+            self.counters["connect_failures"] += 1
+
+    async def on_request(self, request: httpx.Request) -> None:
+        self.counters["requests"] += 1
+        request.extensions["trace"] = self.trace
+
+
+# ======================
+# 풀링된 클라이언트 생성 / 상태 조회
+# ======================
+def _limits(settings: TransportSettings) -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=settings.max_connections,
+        max_keepalive_connections=settings.max_keepalive_connections,
+        keepalive_expiry=settings.keepalive_expiry,
+    )
+
+
+def _timeout(settings: TransportSettings) -> httpx.Timeout:
+    return httpx.Timeout(
+        connect=settings.connect_timeout,
+        read=settings.read_timeout,
+        write=settings.write_timeout,
+        pool=settings.pool_timeout,
+    )
+
+
+def create_pooled_client(settings: TransportSettings, metrics: TransportMetrics) -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        http2=settings.http2,
+        limits=_limits(settings),
+        timeout=_timeout(settings),
+        event_hooks={"request": [metrics.on_request]},
+    )
+
+
+def create_pooled_sync_client(settings: TransportSettings) -> httpx.Client:
+    """동기 경로용 (trace 콜백이 비동기 함수라 지표는 수집하지 않음)"""
+    return httpx.Client(http2=settings.http2, limits=_limits(settings), timeout=_timeout(settings))
+
+
+def _pool_connections(client: httpx.AsyncClient) -> Optional[list]:
+    """httpcore 풀의 연결 목록 (httpx가 공개 API로 노출하지 않으므로 내부 구조가 다르면 None)"""
+    pool = getattr(getattr(client, "_transport", None), "_pool", None)
+    connections = getattr(pool, "connections", None)
+    if connections is None:
+        return None
+    try:
+        return list(connections)
+    except TypeError:
+        return None
+
+
+def pool_stats(client: httpx.AsyncClient, settings: TransportSettings, metrics: TransportMetrics) -> Dict[str, Any]:
+    """현재 풀의 활성/유휴 연결 수와 누적 연결 지표 (풀 내부를 읽을 수 없으면 연결 수 항목은 None)"""
+    connections = _pool_connections(client)
+    if connections is None:
+        idle = active = http2_connections = None
+    else:
+        try:
+            idle = sum(1 for c in connections if c.is_idle())
+            http2_connections = sum(1 for c in connections if "HTTP/2" in c.info())
+            active = len(connections) - idle
+        except (AttributeError, TypeError):
+            idle = active = http2_connections = None
+    return {
+        "settings": asdict(settings),
+        "connections": len(connections) if connections is not None else None,
+        "active": active,
+        "idle": idle,
+        "http2_connections": http2_connections,
+        **metrics.counters,
+        "connection_reuse_ratio": (
+            1 - metrics.counters["tcp_connects"] / metrics.counters["requests"]
+            if metrics.counters["requests"] else 0.0
+        ),
+    }
@@ -0,0 +1,209 @@
+# incremental_json.py
+from __future__ import annotations
+from dataclasses import dataclass
+from typing import Optional, Dict, Any, List, Callable, Sequence
+import json
+import re
+
+
+# 문자열 밖에서 의미 있는 문자 / 문자열 안에서 의미 있는 문자
+_STRUCTURAL = re.compile(r'["{}\[\]:,]')
+_STRING_SPECIAL = re.compile(r'["\\]')
+
+
+# ======================
+# 완성된 항목 DTO
+# ======================
+@dataclass(frozen=True)
+class CompletedItem:
+    key: str
+    index: int  # keys 안에서의 순서 (1부터)
+    text: str
+    valid: bool
+
+
+# ======================
+# 푸시 방식 증분 파서
+# ======================
+class IncrementalItemParser:
+    """
+    {"poem1": "...", ..., "poem4": "..."} 형태의 응답을 조각(delta) 단위로 받아
+    지정한 키의 문자열 값이 닫히는 즉시 돌려주는 파서
+    - feed(delta)는 이번 조각으로 새로 완성된 항목만 반환 (이미 본 텍스트는 다시 읽지 않음)
+    - 이스케이프(\\n, \\", \\uXXXX 서러게이트 쌍 등)가 조각 경계에서 잘려도 올바르게 처리
+    - 최상위 객체 밖의 텍스트(```json 코드 펜스, 앞뒤 설명)는 무시
+    - validate가 주어지면 각 값이 닫힐 때 검사해 valid에 기록 → 첫 항목부터 거절 가능
+    """
+
+    def __init__(self, keys: Sequence[str], validate: Optional[Callable[[str], bool]] = None):
+        self.keys = tuple(keys)
+        self.validate = validate
+        self.items: Dict[str, str] = {}
+        self.rejected: Optional[CompletedItem] = None
+        self.rejected_keys: List[str] = []  # 검증에 실패한 모든 키 (부분 복구 시 다시 생성할 대상)
+
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._chunks: List[str] = []  # 현재 문자열의 원문 (이스케이프 포함)
+        self._expect_value = False  # ':' 다음이면 값, 그 외에는 키
+        self._string_is_value = False
+        self._key: Optional[str] = None
+
+    @property
+    def done(self) -> bool:
+        return len(self.items) == len(self.keys)
+
+    def valid_items(self) -> Dict[str, str]:
+        """완성되고 검증도 통과한 항목만"""
+        return {key: text for key, text in self.items.items() if key not in self.rejected_keys}
+
+    def values(self) -> List[str]:
+        """keys 순서대로 값 목록 (아직 없는 키는 빈 문자열)"""
+        return [self.items.get(key, "") for key in self.keys]
+
+    def feed(self, delta: str) -> List[CompletedItem]:
+        completed: List[CompletedItem] = []
+        pos, end = 0, len(delta)
+
+        while pos < end:
+            if self._in_string:
+                if self._escaped:
+                    # 이전 조각이 역슬래시로 끝난 경우: 다음 한 글자는 이스케이프 대상
+                    self._chunks.append(delta[pos])
+                    self._escaped = False
+                    pos += 1
+                    continue
+                match = _STRING_SPECIAL.search(delta, pos)
+                if match is None:
+                    self._chunks.append(delta[pos:])
+                    break
+                self._chunks.append(delta[pos:match.start()])
+                pos = match.end()
+                if match.group() == "\\":
+                    self._chunks.append("\\")
+                    self._escaped = True
+                    continue
+                item = self._close_string()
+                if item is not None:
+                    completed.append(item)
+                continue
+
+            match = _STRUCTURAL.search(delta, pos)
+            if match is None:
+                break
+            pos = match.end()
+            self._on_structural(match.group())
+
+        return completed
+
+    # ---------- 내부 ----------
+    def _on_structural(self, char: str) -> None:
+        if char == '"':
+            # 최상위 객체 안의 문자열만 추적 (코드 펜스 앞 설명문 등은 depth 0)
+            if self._depth >= 1:
+                self._in_string = True
+                self._string_is_value = self._expect_value
+                self._chunks = []
+        elif char in "{[":
+            self._depth += 1
+            self._expect_value = False
+        elif char in "}]":
+            self._depth = max(0, self._depth - 1)
+            self._expect_value = False
+        elif char == ":":
+            self._expect_value = True
+        elif char == ",":
+            self._expect_value = False
+
+    def _close_string(self) -> Optional[CompletedItem]:
+        self._in_string = False
+        raw = "".join(self._chunks)
+        self._chunks = []
+        is_value = self._string_is_value
+        self._expect_value = False
+
+        try:
+            # 원문 그대로 JSON 문자열 규칙으로 해석 (모델이 넣은 날 개행 등 제어 문자 허용)
+            text = json.loads(f'"{raw}"', strict=False)
+        except json.JSONDecodeError:
+            text = raw
+
+        if not is_value:
+            self._key = text if self._depth == 1 else None
+            return None
+
+        key, self._key = self._key, None
+        if key not in self.keys or key in self.items:
+            return None
+
+        self.items[key] = text
+        valid = self.validate(text) if self.validate else True
+        item = CompletedItem(key=key, index=self.keys.index(key) + 1, text=text, valid=valid)
+        if not valid:
+            self.rejected_keys.append(key)
+            if self.rejected is None:
+                self.rejected = item
+        return item
+
+
+# ======================
+# 구조화 출력 스키마
+# ======================
+def items_json_schema(name: str, keys: Sequence[str], description: str) -> Dict[str, Any]:
+    """
+    keys의 문자열 값만 갖는 객체를 강제하는 JSON schema (strict 모드: 모든 키 필수, 추가 키 금지)
+    - Chat Completions의 response_format.json_schema / Responses API의 text.format에 그대로 사용
+    - description은 각 값의 형식 안내 (프롬프트의 JSON 예시를 대신함)
+    """
+    return {
+        "name": name,
+        "strict": True,
+        "schema": {
+            "type": "object",
+            "properties": {key: {"type": "string", "description": description} for key in keys},
+            "required": list(keys),
+            "additionalProperties": False,
+        },
+    }
+
+
+# ======================
+# 출력 모드별 파싱 결과 집계
+# ======================
+class ParseStats:
+    """
+    출력 모드(json_schema: 구조화 출력, json_example: 프롬프트의 JSON 예시)별 파싱 결과 집계
+    - 파싱 실패(PARSING_FAILED)와 부적절한 내용(INAPPROPRIATE_RESPONSE)을 나눠 셈
+    - 응답 종류(kind)별로 따로 셈: primary(요청당 한 번 받은 4개 항목 응답, 스트림 포함),
+      slot(fan-out/부분 복구의 한 편짜리 호출, 시도마다), repair(글귀 부분 복구 호출, 시도마다)
+      → 재시도·복구 호출이 요청당 여러 번 기록돼 출력 모드별 실패율이 부풀지 않도록 primary만 비교에 씀
+    """
+
+    _OUTCOMES = {
+        None: "parsed",
+        "PARSING_FAILED": "parsing_failed",
+        "INAPPROPRIATE_RESPONSE": "inappropriate",
+    }
+
+    KINDS = ("primary", "slot", "repair")
+
+    def __init__(self):
+        self._counts: Dict[str, Dict[str, Dict[str, int]]] = {kind: {} for kind in self.KINDS}
+
+    def record(self, mode: str, error_code: Optional[str], kind: str = "primary") -> None:
+        """한 응답의 파싱 결과 (성공이면 error_code=None)"""
+        counts = self._counts[kind].setdefault(mode, {outcome: 0 for outcome in self._OUTCOMES.values()})
+        counts[self._OUTCOMES.get(error_code, "parsing_failed")] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            kind: {
+                mode: {
+                    **counts,
+                    "parse_failure_rate": counts["parsing_failed"] / total if (total := sum(counts.values())) else 0.0,
+                }
+                for mode, counts in by_mode.items()
+            }
+            for kind, by_mode in self._counts.items()
+        }
@@ -0,0 +1,452 @@
+# llm_adapters.py
+from __future__ import annotations
+from dataclasses import dataclass
+from abc import ABC, abstractmethod
+from typing import Optional, Dict, Any, AsyncIterator, Callable
+from openai import OpenAI, AsyncOpenAI
+import asyncio
+import contextlib
+import time
+
+import openai
+
+from hedging import HedgePolicy
+from llm_admission import AdaptiveLimiter, LLMDeadlineExceededError, is_transient_error, remaining_seconds
+from circuit_breaker import CircuitBreaker
+
+
+# ======================
+# 공통 DTO (시/글귀 생성기가 함께 사용)
+# ======================
+@dataclass(frozen=True)
+class Prompt:
+    system_prompt: str
+    user_prompt: str
+    # 설정되면 구조화 출력(JSON schema)으로 응답 형식을 강제 (items_json_schema 형태)
+    schema: Optional[Dict[str, Any]] = None
+    # OpenAI prompt_cache_key: 같은 고정 앞부분을 쓰는 요청을 같은 캐시로 모음
+    cache_key: Optional[str] = None
+
+
+@dataclass(frozen=True)
+class GenOptions:
+    # 공통
+    model: str
+
+    # GPT-4o 전용
+    temperature: Optional[float] = None
+    max_tokens: Optional[int] = None
+
+    # GPT-5 전용
+    reasoning_effort: Optional[str] = None  # "low" | "medium" | "high"
+    max_output_tokens: Optional[int] = None  # Responses API 상한
+
+    def for_model(self, model: str) -> "GenOptions":
+        """대체 모델로 보낼 때 옵션을 그 모델 계열(GPT-5: Responses, GPT-4o: Chat) 형식으로 변환"""
+        if model == self.model:
+            return self
+        limit = self.max_output_tokens or self.max_tokens
+        if model.lower().startswith("gpt-5"):
+            return GenOptions(model=model, reasoning_effort=self.reasoning_effort or "low", max_output_tokens=limit)
+        return GenOptions(model=model, temperature=self.temperature, max_tokens=limit)
+
+
+@dataclass(frozen=True)
+class Completion:
+    text: str
+    output_tokens: Optional[int] = None  # reasoning 토큰 포함
+    reasoning_tokens: Optional[int] = None
+    truncated: bool = False  # 출력 토큰 상한에 걸려 잘림
+    model: Optional[str] = None  # 실제로 응답한 모델 (대체 모델로 전환됐을 수 있음)
+    input_tokens: Optional[int] = None
+    cached_input_tokens: Optional[int] = None  # 입력 토큰 중 프롬프트 캐시에서 읽은 토큰
+
+
+class IncompleteResponseError(RuntimeError):
+    """스트림이 완료되지 않은 채 끝남 (출력 토큰 상한 등). 비스트림 경로의 Completion.truncated에 해당"""
+
+    def __init__(self, model: str, reason: Optional[str], output_tokens: Optional[int] = None):
+        self.model = model
+        self.reason = reason
+        self.output_tokens = output_tokens
+        super().__init__(f"{model} 응답이 완료되지 않았습니다 (reason={reason or 'unknown'})")
+
+    @property
+    def truncated(self) -> bool:
+        """출력 토큰 상한에 걸려 잘렸는지 여부"""
+        return self.reason in ("max_output_tokens", "length")
+
+
+class StreamFailedError(RuntimeError):
+    """서버가 스트림 도중 실패 이벤트(response.failed / error)를 보냄 (5xx와 같이 일시적 오류로 취급)"""
+
+    transient = True
+
+
+# ======================
+# 프롬프트 캐시 사용량
+# ======================
+class PromptCacheStats:
+    """
+    입력 토큰 중 OpenAI 프롬프트 캐시에서 읽은 토큰(cached)과 새로 처리한 토큰(uncached) 집계
+    - 캐시는 앞부분이 바이트 단위로 같은 1024토큰 이상 프롬프트에만 적용되므로 프롬프트 배치가 바뀌면 cached_ratio로 확인
+    - 사용량이 없는 응답은 세지 않음 (스트리밍은 마지막 사용량 이벤트까지 읽은 경우에만 기록됨)
+    """
+
+    def __init__(self):
+        self.calls = 0
+        self.hit_calls = 0  # cached 토큰이 1 이상인 호출 수
+        self.input_tokens = 0
+        self.cached_tokens = 0
+
+    def record(self, input_tokens: Optional[int], cached_tokens: Optional[int]) -> None:
+        if input_tokens is None:
+            return
+        self.calls += 1
+        self.input_tokens += input_tokens
+        self.cached_tokens += cached_tokens or 0
+        if cached_tokens:
+            self.hit_calls += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "hit_calls": self.hit_calls,
+            "input_tokens": self.input_tokens,
+            "cached_tokens": self.cached_tokens,
+            "uncached_tokens": self.input_tokens - self.cached_tokens,
+            "cached_ratio": self.cached_tokens / self.input_tokens if self.input_tokens else 0.0,
+        }
+
+
+# ======================
+# 어댑터 인터페이스
+# ======================
+class BaseModelAdapter(ABC):
+    def __init__(self, client: OpenAI, model: str, async_client: Optional[AsyncOpenAI] = None):
+        self.client = client
+        self.async_client = async_client
+        self.model = model
+        # 설정되면 느린 호출을 복제 호출로 추월 (LLMClientRegistry가 주입, 프롬프트 종류별로 정책을 만듦)
+        self.hedge_factory: Optional[Callable[[], HedgePolicy]] = None
+        self.hedges: Dict[str, HedgePolicy] = {}
+        # 설정되면 모든 호출(헤징 복제 포함)이 입장 제어를 거침 (LLMClientRegistry가 주입)
+        self.limiter: Optional[AdaptiveLimiter] = None
+        # 설정되면 시도마다 성공/실패와 지연을 모델 차단기에 기록 (LLMClientRegistry가 주입)
+        self.breaker: Optional[CircuitBreaker] = None
+        # 응답마다 입력 토큰 중 캐시 적중(cached)/미적중 토큰을 집계 (스트리밍 포함)
+        self.prompt_cache = PromptCacheStats()
+
+    @abstractmethod
+    def generate(self, prompt: Prompt, opt: GenOptions) -> str: ...
+
+    @abstractmethod
+    async def _acomplete_once(self, prompt: Prompt, opt: GenOptions) -> Completion: ...
+
+    async def acomplete(self, prompt: Prompt, opt: GenOptions) -> Completion:
+        """응답 텍스트와 토큰 사용량/잘림 여부"""
+        hedge = self.hedge_for(prompt)
+
+        async def call(started: Optional[asyncio.Event] = None) -> Completion:
+            if self.limiter is None:
+                return await self._acomplete_recorded(prompt, opt, hedge, started)
+            # 동시 호출 상한/대기열, 429 Retry-After 백오프
+            return await self.limiter.run(
+                lambda: self._acomplete_recorded(prompt, opt, hedge, started),
+                workload=f"{self.model}:{prompt.cache_key or 'default'}",
+            )
+
+        if hedge is None:
+            return await call()
+        # 최근 지연의 상위 백분위를 넘기면 같은 요청을 한 번 더 보내 먼저 끝난 쪽을 사용
+        return await hedge.run(call)
+
+    def hedge_for(self, prompt: Prompt) -> Optional[HedgePolicy]:
+        """프롬프트 종류(cache_key: poem, poem-slot, quote, quote-repair)별 헤징 정책 (헤징이 꺼져 있으면 None)"""
+        if self.hedge_factory is None:
+            return None
+        kind = prompt.cache_key or "default"
+        hedge = self.hedges.get(kind)
+        if hedge is None:
+            hedge = self.hedges[kind] = self.hedge_factory()
+        return hedge
+
+    async def agenerate(self, prompt: Prompt, opt: GenOptions) -> str:
+        return (await self.acomplete(prompt, opt)).text
+
+    async def _acomplete_recorded(
+        self,
+        prompt: Prompt,
+        opt: GenOptions,
+        hedge: Optional[HedgePolicy] = None,
+        started: Optional[asyncio.Event] = None,
+    ) -> Completion:
+        """시도 한 번의 성공/실패와 지연을 모델 차단기에, 입력 토큰 캐시 적중을 prompt_cache에 기록 (취소된 헤징 복제 등은 기록하지 않음)
+
+        400 같은 요청 오류는 모델 상태와 무관하므로 차단기에 실패로 기록하지 않음.
+        헤징 정책에는 입장 제어를 통과한 뒤의 OpenAI 호출 시간만 기록하고, 호출 시작을 started로 알림.
+        """
+        if started is not None:
+            started.set()
+        start = time.monotonic()
+        try:
+            completion = await self._acomplete_once(prompt, opt)
+        except Exception as e:
+            if self.breaker is not None and is_transient_error(e):
+                self.breaker.record(False, time.monotonic() - start)
+            raise
+        latency = time.monotonic() - start
+        if self.breaker is not None:
+            self.breaker.record(True, latency)
+        if hedge is not None:
+            hedge.observe(latency)
+        self.prompt_cache.record(completion.input_tokens, completion.cached_input_tokens)
+        return completion
+
+    @abstractmethod
+    def astream(
+        self,
+        prompt: Prompt,
+        opt: GenOptions,
+        on_completion: Optional[Callable[[Completion], None]] = None,
+    ) -> AsyncIterator[str]:
+        """
+        응답 텍스트 조각(delta)을 도착하는 대로 내보냄
+        - 끝까지 받았거나 출력 상한에서 잘렸으면 on_completion에 최종 토큰 사용량(text는 비움)을 전달
+        """
+
+    async def astream_recorded(
+        self,
+        prompt: Prompt,
+        opt: GenOptions,
+        on_completion: Optional[Callable[[Completion], None]] = None,
+    ) -> AsyncIterator[str]:
+        """
+        astream을 acomplete와 같은 규칙으로 감쌈
+        - 스트림이 끝날 때까지 입장 제어의 동시 호출 한 자리를 차지 (대기열이 차 있으면 LLMOverloadedError)
+        - 끝까지 받았거나, 조각을 받은 뒤 호출한 쪽이 먼저 닫으면(필요한 항목을 다 받음) 성공으로 기록
+        - 일시적 오류는 차단기에 실패로, 429는 입장 제어에 기록 (400 등 요청 오류와 연결 종료로 인한 취소는 기록하지 않음)
+        - 출력 상한에서 잘린 응답(IncompleteResponseError)은 모델이 정상 응답한 것이므로 성공으로 기록
+        - 요청 마감(request_deadline)이 있으면 다음 조각을 남은 시간까지만 기다리고 LLMDeadlineExceededError
+        """
+        workload = f"{self.model}:{prompt.cache_key or 'default'}:stream"
+        slot = self.limiter.slot() if self.limiter is not None else contextlib.nullcontext()
+        async with slot:
+            start = time.monotonic()
+            received = False
+            try:
+                async with contextlib.aclosing(self.astream(prompt, opt, on_completion)) as stream:
+                    while True:
+                        # 제너레이터의 yield를 가로지르지 않도록 조각 하나를 기다리는 동안에만 마감을 적용
+                        try:
+                            async with asyncio.timeout(remaining_seconds()) as timeout:
+                                delta = await anext(stream)
+                        except StopAsyncIteration:
+                            break
+                        except TimeoutError:
+                            if timeout.expired():
+                                raise LLMDeadlineExceededError(
+                                    "요청 처리 시간 안에 LLM 응답을 받지 못했습니다.", retry_after=1.0
+                                ) from None
+                            raise
+                        received = True
+                        yield delta
+            except IncompleteResponseError:
+                self._record_stream(start, workload)
+                raise
+            except GeneratorExit:
+                if received:
+                    self._record_stream(start, workload)
+                raise
+            except Exception as e:
+                if self.breaker is not None and is_transient_error(e):
+                    self.breaker.record(False, time.monotonic() - start)
+                if self.limiter is not None and isinstance(e, openai.RateLimitError):
+                    self.limiter.record_rate_limited()
+                raise
+            self._record_stream(start, workload)
+
+    def _record_stream(self, start: float, workload: str) -> None:
+        latency = time.monotonic() - start
+        if self.breaker is not None:
+            self.breaker.record(True, latency)
+        if self.limiter is not None:
+            self.limiter.record_success(latency, workload)
+
+    def _require_async_client(self) -> AsyncOpenAI:
+        if self.async_client is None:
+            raise RuntimeError("비동기 호출에는 AsyncOpenAI 클라이언트가 필요합니다.")
+        return self.async_client
+
+
+# ======================
+# GPT-4o 어댑터 (Chat Completions)
+# ======================
+class GPT4oAdapter(BaseModelAdapter):
+    def _build_kwargs(self, prompt: Prompt, opt: GenOptions) -> Dict[str, Any]:
+        kwargs: Dict[str, Any] = {
+            "model": self.model,
+            "messages": [
+                {"role": "system", "content": prompt.system_prompt},
+                {"role": "user", "content": prompt.user_prompt},
+            ],
+        }
+        if opt.temperature is not None:
+            kwargs["temperature"] = opt.temperature
+        if opt.max_tokens is not None:
+            kwargs["max_tokens"] = opt.max_tokens
+        if prompt.schema is not None:
+            kwargs["response_format"] = {"type": "json_schema", "json_schema": prompt.schema}
+        if prompt.cache_key:
+            kwargs["prompt_cache_key"] = prompt.cache_key
+        return kwargs
+
+    def generate(self, prompt: Prompt, opt: GenOptions) -> str:
+        resp = self.client.chat.completions.create(**self._build_kwargs(prompt, opt))
+        return resp.choices[0].message.content or ""
+
+    async def _acomplete_once(self, prompt: Prompt, opt: GenOptions) -> Completion:
+        resp = await self._require_async_client().chat.completions.create(**self._build_kwargs(prompt, opt))
+        usage = getattr(resp, "usage", None)
+        details = getattr(usage, "completion_tokens_details", None)
+        return Completion(
+            text=resp.choices[0].message.content or "",
+            output_tokens=getattr(usage, "completion_tokens", None),
+            reasoning_tokens=getattr(details, "reasoning_tokens", None),
+            truncated=resp.choices[0].finish_reason == "length",
+            model=self.model,
+            input_tokens=getattr(usage, "prompt_tokens", None),
+            cached_input_tokens=getattr(getattr(usage, "prompt_tokens_details", None), "cached_tokens", None),
+        )
+
+    async def astream(
+        self,
+        prompt: Prompt,
+        opt: GenOptions,
+        on_completion: Optional[Callable[[Completion], None]] = None,
+    ) -> AsyncIterator[str]:
+        stream = await self._require_async_client().chat.completions.create(
+            **self._build_kwargs(prompt, opt), stream=True, stream_options={"include_usage": True}
+        )
+        finish_reason: Optional[str] = None
+        output_tokens: Optional[int] = None
+        reasoning_tokens: Optional[int] = None
+        async with stream:
+            async for chunk in stream:
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                if delta:
+                    yield delta
+                if chunk.choices and chunk.choices[0].finish_reason:
+                    finish_reason = chunk.choices[0].finish_reason
+                # 사용량은 choices가 빈 마지막 조각에 실려 옴
+                usage = getattr(chunk, "usage", None)
+                if usage is not None:
+                    output_tokens = getattr(usage, "completion_tokens", None)
+                    reasoning_tokens = getattr(getattr(usage, "completion_tokens_details", None), "reasoning_tokens", None)
+                    self.prompt_cache.record(
+                        usage.prompt_tokens, getattr(usage.prompt_tokens_details, "cached_tokens", None)
+                    )
+        if on_completion is not None and finish_reason in ("stop", "length"):
+            on_completion(Completion(
+                text="",
+                output_tokens=output_tokens,
+                reasoning_tokens=reasoning_tokens,
+                truncated=finish_reason == "length",
+                model=self.model,
+            ))
+        # 비스트림 경로의 finish_reason == "length"(truncated)와 같은 상황을 호출자에게 알림
+        if finish_reason == "length":
+            raise IncompleteResponseError(self.model, finish_reason, output_tokens)
+
+
+# ======================
+# GPT-5 어댑터 (Responses API)
+# ======================
+class GPT5Adapter(BaseModelAdapter):
+    def _build_kwargs(self, prompt: Prompt, opt: GenOptions) -> Dict[str, Any]:
+        kwargs: Dict[str, Any] = {
+            "model": self.model,
+            # Responses API 권장 필드 매핑:
+            # - system 성격 → instructions
+            # - user 성격  → input
+            "instructions": prompt.system_prompt,
+            "input": prompt.user_prompt,
+        }
+        if opt.reasoning_effort:
+            kwargs["reasoning"] = {"effort": opt.reasoning_effort}
+        if opt.max_output_tokens is not None:
+            kwargs["max_output_tokens"] = opt.max_output_tokens
+        if prompt.schema is not None:
+            kwargs["text"] = {"format": {"type": "json_schema", **prompt.schema}}
+        if prompt.cache_key:
+            kwargs["prompt_cache_key"] = prompt.cache_key
+        return kwargs
+
+    def generate(self, prompt: Prompt, opt: GenOptions) -> str:
+        resp = self.client.responses.create(**self._build_kwargs(prompt, opt))
+        # Python SDK: output_text가 있으면 가장 깔끔
+        return getattr(resp, "output_text", None) or ""
+
+    async def _acomplete_once(self, prompt: Prompt, opt: GenOptions) -> Completion:
+        resp = await self._require_async_client().responses.create(**self._build_kwargs(prompt, opt))
+        usage = getattr(resp, "usage", None)
+        details = getattr(usage, "output_tokens_details", None)
+        incomplete = getattr(resp, "incomplete_details", None)
+        return Completion(
+            text=getattr(resp, "output_text", None) or "",
+            output_tokens=getattr(usage, "output_tokens", None),
+            reasoning_tokens=getattr(details, "reasoning_tokens", None),
+            truncated=getattr(incomplete, "reason", None) == "max_output_tokens",
+            model=self.model,
+            input_tokens=getattr(usage, "input_tokens", None),
+            cached_input_tokens=getattr(getattr(usage, "input_tokens_details", None), "cached_tokens", None),
+        )
+
+    async def astream(
+        self,
+        prompt: Prompt,
+        opt: GenOptions,
+        on_completion: Optional[Callable[[Completion], None]] = None,
+    ) -> AsyncIterator[str]:
+        stream = await self._require_async_client().responses.create(**self._build_kwargs(prompt, opt), stream=True)
+        async with stream:
+            async for event in stream:
+                # 텍스트 조각만 전달 (reasoning/메타 이벤트는 무시)
+                if event.type == "response.output_text.delta":
+                    yield event.delta
+                elif event.type in ("response.completed", "response.incomplete"):
+                    usage = event.response.usage
+                    if usage is not None:
+                        self.prompt_cache.record(
+                            usage.input_tokens, getattr(usage.input_tokens_details, "cached_tokens", None)
+                        )
+                    reason = getattr(event.response.incomplete_details, "reason", None)
+                    # 끝까지 받았거나 출력 상한에서 잘린 경우만 사용량을 알림 (다른 이유의 미완료는 예산과 무관)
+                    if on_completion is not None and (event.type == "response.completed" or reason == "max_output_tokens"):
+                        on_completion(Completion(
+                            text="",
+                            output_tokens=getattr(usage, "output_tokens", None),
+                            reasoning_tokens=getattr(getattr(usage, "output_tokens_details", None), "reasoning_tokens", None),
+                            truncated=reason == "max_output_tokens",
+                            model=self.model,
+                        ))
+                    if event.type == "response.incomplete":
+                        # 비스트림 경로의 incomplete_details(truncated)와 같은 상황 → 잘린 응답을 완료로 취급하지 않음
+                        raise IncompleteResponseError(self.model, reason, getattr(usage, "output_tokens", None))
+                elif event.type in ("response.failed", "error"):
+                    raise StreamFailedError(f"응답 스트림 실패: {event.type}")
+
+
+# ======================
+# 어댑터 팩토리 (OCP)
+# ======================
+class ModelAdapterFactory:
+    @staticmethod
+    def create(client: OpenAI, model: str, async_client: Optional[AsyncOpenAI] = None) -> BaseModelAdapter:
+        name = model.lower()
+        if name.startswith("gpt-5"):
+            return GPT5Adapter(client, model, async_client)
+        if name.startswith("gpt-4o"):
+            return GPT4oAdapter(client, model, async_client)
+        raise ValueError(f"Unsupported model family: {model}")
+
@@ -0,0 +1,310 @@
+# llm_admission.py
+from __future__ import annotations
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from email.utils import parsedate_to_datetime
+from typing import Optional, Dict, Any, Callable, Awaitable, AsyncIterator, Iterator, TypeVar
+import asyncio
+import os
+import random
+import time
+
+import openai
+
+T = TypeVar("T")
+
+
+class LLMOverloadedError(Exception):
+    """대기열이 가득 찼거나 대기 시간 상한을 넘겨 LLM 호출을 시작하지 못함 (엔드포인트에서 503으로 응답)"""
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class LLMDeadlineExceededError(LLMOverloadedError):
+    """요청의 LLM 작업 마감 시각(request_deadline)을 넘김: 대기열 대기·재시도·대체 모델·보정 호출을 더 하지 않고 포기"""
+
+
+# 요청 하나의 LLM 작업 마감 시각 (time.monotonic 기준, None이면 제한 없음)
+# 컨텍스트 변수라 헤징 복제/fan-out 태스크에도 그대로 전달됨
+_request_deadline: ContextVar[Optional[float]] = ContextVar("llm_request_deadline", default=None)
+
+
+@contextmanager
+def request_deadline(seconds: Optional[float]) -> Iterator[None]:
+    """이 블록 안의 LLM 호출 전체(입장 대기, 재시도 백오프, 대체 모델, 보정 호출)가 지금부터 seconds 안에 끝나도록 제한"""
+    token = _request_deadline.set(time.monotonic() + seconds if seconds else None)
+    try:
+        yield
+    finally:
+        _request_deadline.reset(token)
+
+
+def remaining_seconds() -> Optional[float]:
+    """현재 요청의 마감까지 남은 시간 (마감이 없으면 None, 지났으면 0 이하)"""
+    deadline = _request_deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def _retry_after_seconds(error: Exception) -> Optional[float]:
+    """응답의 retry-after-ms / retry-after 헤더(초 또는 HTTP 날짜)를 초 단위로"""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        value = headers.get("retry-after")
+        if not value:
+            return None
+        try:
+            return float(value)
+        except ValueError:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def is_transient_error(error: BaseException) -> bool:
+    """시간이 지나거나 다른 모델로 보내면 나아질 수 있는 오류인지 (타임아웃, 연결 오류, 429, 5xx)
+
+    잘못된 요청(400), 인증 오류 등은 대체 모델로 넘겨도 같은 결과이므로 False.
+    서버 쪽 스트림 실패처럼 SDK 예외가 아닌 오류는 transient = True 속성으로 표시.
+    """
+    if getattr(error, "transient", False):
+        return True
+    if isinstance(error, (openai.APIConnectionError, openai.RateLimitError, asyncio.TimeoutError, TimeoutError)):
+        return True
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code == 429 or error.status_code >= 500
+    return False
+
+
+# ======================
+# LLM 호출 입장 제어 (적응형 동시성 + 대기열)
+# ======================
+class AdaptiveLimiter:
+    """
+    OpenAI 호출 앞에 두는 입장 제어기
+    - 동시 호출 수 상한(limit)을 AIMD로 조정: 정상 응답마다 조금씩(+1/limit) 늘리고,
+      429를 받거나 최근 지연이 평소(중앙값)의 latency_tolerance배를 넘으면 decrease_factor배로 줄임
+      (감소는 cooldown_seconds에 한 번까지, min_limit~max_limit 범위)
+    - 상한을 넘는 호출은 대기열에서 최대 max_queue_wait_seconds까지 기다리고, 대기열이 max_queue만큼 차 있거나
+      시간을 넘기면 LLMOverloadedError
+    - run()은 429/연결 오류/5xx를 최대 max_retries번 다시 시도: Retry-After가 있으면 그 이상 기다리고,
+      없으면 지수 백오프에 지터를 더함 (기다리는 동안은 자리를 비워 둠, Retry-After가 backoff_max_seconds보다 길면 바로 실패)
+    - 지연 기준(중앙값)과 최근 지연은 작업 종류(workload: 모델·프롬프트 종류·스트림 여부)마다 따로 보관
+      → 시 4편 생성과 슬롯 한 편, 스트림처럼 길이가 다른 호출이 섞여도 비율 변화를 혼잡으로 오판하지 않음
+    - request_deadline으로 정한 요청 마감이 있으면 대기열 대기, 호출, 재시도 백오프를 모두 남은 시간 안으로 줄이고,
+      시간이 다 되면 LLMDeadlineExceededError
+    """
+
+    def __init__(
+        self,
+        max_limit: int = 64,
+        min_limit: int = 4,
+        initial_limit: Optional[int] = None,
+        decrease_factor: float = 0.7,
+        latency_tolerance: float = 2.0,
+        cooldown_seconds: float = 5.0,
+        max_queue: int = 256,
+        max_queue_wait_seconds: float = 10.0,
+        max_retries: int = 2,
+        backoff_base_seconds: float = 0.5,
+        backoff_max_seconds: float = 20.0,
+        min_samples: int = 20,
+    ):
+        self.max_limit = max_limit
+        self.min_limit = min(min_limit, max_limit)
+        self.decrease_factor = decrease_factor
+        self.latency_tolerance = latency_tolerance
+        self.cooldown_seconds = cooldown_seconds
+        self.max_queue = max_queue
+        self.max_queue_wait_seconds = max_queue_wait_seconds
+        self.max_retries = max_retries
+        self.backoff_base_seconds = backoff_base_seconds
+        self.backoff_max_seconds = backoff_max_seconds
+        self.min_samples = min_samples
+
+        self._limit = float(initial_limit or max_limit)
+        self._in_flight = 0
+        self._waiting = 0
+        self._cond = asyncio.Condition()
+        self._last_decrease = 0.0
+        self._latencies: Dict[str, deque[float]] = {}  # 작업 종류별 평소 지연 (중앙값 기준)
+        self._recent: Dict[str, deque[float]] = {}  # 작업 종류별 최근 지연 (혼잡 판단)
+        self._waits: deque[float] = deque(maxlen=200)
+        self._stats = {
+            "admitted": 0,
+            "rejected_queue_full": 0,
+            "rejected_wait_timeout": 0,
+            "rate_limited": 0,
+            "retries": 0,
+            "decreases": 0,
+            "deadline_exceeded": 0,
+        }
+
+    @classmethod
+    def from_env(cls) -> "AdaptiveLimiter":
+        initial = os.getenv("LLM_INITIAL_CONCURRENCY")
+        return cls(
+            max_limit=int(os.getenv("LLM_MAX_CONCURRENCY", "64")),
+            min_limit=int(os.getenv("LLM_MIN_CONCURRENCY", "4")),
+            initial_limit=int(initial) if initial else None,
+            decrease_factor=float(os.getenv("LLM_LIMIT_DECREASE_FACTOR", "0.7")),
+            latency_tolerance=float(os.getenv("LLM_LATENCY_TOLERANCE", "2")),
+            cooldown_seconds=float(os.getenv("LLM_LIMIT_COOLDOWN_SECONDS", "5")),
+            max_queue=int(os.getenv("LLM_MAX_QUEUE", "256")),
+            max_queue_wait_seconds=float(os.getenv("LLM_MAX_QUEUE_WAIT_SECONDS", "10")),
+            max_retries=int(os.getenv("LLM_MAX_RETRIES", "2")),
+            backoff_base_seconds=float(os.getenv("LLM_BACKOFF_BASE_SECONDS", "0.5")),
+            backoff_max_seconds=float(os.getenv("LLM_BACKOFF_MAX_SECONDS", "20")),
+        )
+
+    @property
+    def limit(self) -> int:
+        return max(self.min_limit, int(self._limit))
+
+    # ---------- 입장 ----------
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        """동시 호출 자리 하나를 차지 (스트리밍처럼 호출 시간을 직접 재지 않는 경로용)"""
+        if self._waiting >= self.max_queue:
+            self._stats["rejected_queue_full"] += 1
+            raise LLMOverloadedError("LLM 호출 대기열이 가득 찼습니다.", retry_after=self.max_queue_wait_seconds)
+
+        # 요청 마감이 대기 상한보다 먼저 오면 마감까지만 기다림
+        remaining = remaining_seconds()
+        max_wait = self.max_queue_wait_seconds if remaining is None else min(self.max_queue_wait_seconds, remaining)
+        if max_wait <= 0:
+            raise self._deadline_exceeded()
+
+        start = time.monotonic()
+        async with self._cond:
+            self._waiting += 1
+            try:
+                await asyncio.wait_for(
+                    self._cond.wait_for(lambda: self._in_flight < self.limit),
+                    timeout=max_wait,
+                )
+            except asyncio.TimeoutError:
+                if max_wait < self.max_queue_wait_seconds:
+                    raise self._deadline_exceeded() from None
+                self._stats["rejected_wait_timeout"] += 1
+                raise LLMOverloadedError(
+                    "LLM 호출 대기 시간이 초과되었습니다.", retry_after=self.max_queue_wait_seconds
+                ) from None
+            finally:
+                self._waiting -= 1
+            self._in_flight += 1
+        self._waits.append(time.monotonic() - start)
+        self._stats["admitted"] += 1
+
+        try:
+            yield
+        finally:
+            async with self._cond:
+                self._in_flight -= 1
+                self._cond.notify_all()
+
+    async def run(self, call: Callable[[], Awaitable[T]], workload: str = "default") -> T:
+        """
+        자리를 얻어 call()을 실행하고 지연(workload별 기준과 비교)/429를 상한 조정에 반영, 일시적 오류는 백오프 후 재시도
+        요청 마감이 있으면 호출도 남은 시간 안에서만 기다리고, 백오프가 마감을 넘기면 재시도하지 않음
+        """
+        attempt = 0
+        while True:
+            async with self.slot():
+                start = time.monotonic()
+                try:
+                    async with asyncio.timeout(remaining_seconds()) as timeout:
+                        result = await call()
+                except TimeoutError:
+                    if timeout.expired():
+                        raise self._deadline_exceeded() from None
+                    raise
+                except openai.RateLimitError as e:
+                    self.record_rate_limited()
+                    error, retry_after = e, _retry_after_seconds(e)
+                except (openai.APIConnectionError, openai.InternalServerError) as e:
+                    error, retry_after = e, _retry_after_seconds(e)
+                else:
+                    self.record_success(time.monotonic() - start, workload)
+                    return result
+
+            if attempt >= self.max_retries or (retry_after or 0) > self.backoff_max_seconds:
+                # 재시도 소진, 또는 서버가 요구한 대기 시간이 너무 길면 바로 실패 처리
+                raise error
+            delay = self._backoff(attempt + 1, retry_after)
+            remaining = remaining_seconds()
+            if remaining is not None and delay >= remaining:
+                # 기다리는 사이 요청 마감이 지나므로 재시도하지 않고 원래 오류로 실패 (대체 모델 경로도 마감에 막힘)
+                raise error
+            attempt += 1
+            self._stats["retries"] += 1
+            await asyncio.sleep(delay)
+
+    # ---------- 결과 반영 (run()을 거치지 않는 스트리밍 경로도 사용) ----------
+    def record_success(self, latency: float, workload: str = "default") -> None:
+        """정상 응답의 지연을 같은 작업 종류의 평소 지연과 비교해 상한 조정에 반영"""
+        self._on_success(latency, workload)
+
+    def record_rate_limited(self) -> None:
+        """429 응답 → 상한을 줄임"""
+        self._stats["rate_limited"] += 1
+        self._decrease()
+
+    def stats(self) -> Dict[str, Any]:
+        waits = sorted(self._waits)
+        return {
+            "limit": self.limit,
+            "max_limit": self.max_limit,
+            "in_flight": self._in_flight,
+            "queue_depth": self._waiting,
+            "max_queue": self.max_queue,
+            "queue_wait_p50_seconds": waits[len(waits) // 2] if waits else None,
+            "queue_wait_p95_seconds": waits[min(len(waits) - 1, int(len(waits) * 0.95))] if waits else None,
+            "latency_p50_seconds": {
+                workload: sorted(latencies)[len(latencies) // 2]
+                for workload, latencies in self._latencies.items() if latencies
+            },
+            **self._stats,
+        }
+
+    # ---------- 내부 ----------
+    def _on_success(self, latency: float, workload: str) -> None:
+        latencies = self._latencies.get(workload)
+        if latencies is None:
+            latencies = self._latencies[workload] = deque(maxlen=200)
+            self._recent[workload] = deque(maxlen=10)
+        recent = self._recent[workload]
+        recent.append(latency)
+        if len(latencies) >= self.min_samples and len(recent) == recent.maxlen:
+            baseline = sorted(latencies)[len(latencies) // 2]
+            if sum(recent) / len(recent) > baseline * self.latency_tolerance:
+                # 지연이 같은 종류의 평소보다 크게 늘면 혼잡으로 보고 상한을 줄임 (혼잡 중 지연은 기준에 넣지 않음)
+                self._decrease()
+                return
+        latencies.append(latency)
+        # 늘어난 상한은 자리를 반납할 때(notify_all) 대기 중인 호출에 반영됨
+        self._limit = min(float(self.max_limit), self._limit + 1 / self._limit)
+
+    def _decrease(self) -> None:
+        now = time.monotonic()
+        if now - self._last_decrease < self.cooldown_seconds:
+            return
+        self._last_decrease = now
+        self._limit = max(float(self.min_limit), self._limit * self.decrease_factor)
+        for recent in self._recent.values():
+            recent.clear()
+        self._stats["decreases"] += 1
+
+    def _deadline_exceeded(self) -> LLMDeadlineExceededError:
+        self._stats["deadline_exceeded"] += 1
+        return LLMDeadlineExceededError("요청 처리 시간 안에 LLM 응답을 받지 못했습니다.", retry_after=1.0)
+
+    def _backoff(self, attempt: int, retry_after: Optional[float]) -> float:
+        """지수 백오프(상한 backoff_max_seconds) 범위의 무작위 지터, Retry-After가 있으면 그 이후로"""
+        jitter = random.uniform(0, min(self.backoff_max_seconds, self.backoff_base_seconds * 2 ** attempt))
+        return (retry_after or 0.0) + jitter
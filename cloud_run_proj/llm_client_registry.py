@@ -0,0 +1,305 @@
+# llm_client_registry.py
+from __future__ import annotations
+from typing import Optional, Dict, Any, Callable, Tuple, List, Awaitable, AsyncIterator, TypeVar
+from openai import OpenAI, AsyncOpenAI
+import os
+import httpx
+
+from http_transport import (
+    TransportSettings,
+    TransportMetrics,
+    create_pooled_client,
+    create_pooled_sync_client,
+    pool_stats,
+)
+from hedging import HedgePolicy
+from llm_admission import AdaptiveLimiter, LLMOverloadedError, is_transient_error
+from circuit_breaker import CircuitBreaker
+
+T = TypeVar("T")
+
+
+# 클라이언트가 고를 수 있는 모델 기본 목록 (OPENAI_MODEL과 대체 모델은 자동으로 포함)
+DEFAULT_SUPPORTED_MODELS = (
+    "gpt-5-mini-2025-08-07",
+    "gpt-5-nano-2025-08-07",
+    "gpt-5-2025-08-07",
+    "gpt-4o-mini",
+    "gpt-4o",
+)
+
+
+class UnsupportedModelError(ValueError):
+    """지원 목록에 없는 모델 (엔드포인트에서 크레딧 예약 전에 400으로 응답)"""
+
+
+# OpenAI 호출용 기본 풀 설정
+# - 생성 요청은 응답까지 수십 초가 걸리므로 읽기 타임아웃을 길게 잡음
+# - LLM_MAX_CONCURRENCY(기본 64)만큼 동시에 호출해도 풀 대기가 생기지 않는 크기
+OPENAI_TRANSPORT_DEFAULTS = TransportSettings(
+    max_connections=100,
+    max_keepalive_connections=64,
+    keepalive_expiry=60.0,
+    http2=True,
+    connect_timeout=10.0,
+    read_timeout=180.0,
+    write_timeout=30.0,
+    pool_timeout=30.0,
+)
+
+
+# ======================
+# OpenAI 클라이언트 / 어댑터 레지스트리
+# ======================
+class LLMClientRegistry:
+    """
+    프로세스 전체가 공유하는 OpenAI 클라이언트와 모델별 어댑터 보관소
+    - 시/글귀 생성이 같은 커넥션 풀을 쓰므로 api.openai.com 연결(TLS 완료된 소켓)을 서로 재사용
+    - 어댑터는 모델 이름마다 한 번만 만들고 이후 호출에서 재사용
+    - 클라이언트는 처음 사용할 때 만들고, aclose 이후 다시 사용하면 새로 만듦
+    - hedging이 켜져 있으면 어댑터가 프롬프트 종류마다 HedgePolicy를 만들어 느린 호출을 복제 호출로 추월
+    - 모든 어댑터가 하나의 AdaptiveLimiter를 공유해 프로세스 전체의 OpenAI 동시 호출 수를 조정
+      (429 재시도는 limiter가 맡으므로 비동기 클라이언트의 SDK 자체 재시도는 끔)
+    - 모델마다 CircuitBreaker를 두고, acomplete/astream은 요청 모델 → fallback_models 순서로 차단되지 않은 모델에 요청
+      (타임아웃/연결 오류/429/5xx에만 대체 모델로 넘어가고, 400 등 요청 자체의 오류는 그대로 올림)
+    - 어댑터와 차단기는 supported_models에 있는 모델에만 만듦 (클라이언트가 보낸 임의 모델 문자열로 늘어나지 않음)
+    """
+
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        settings: Optional[TransportSettings] = None,
+        client: Optional[OpenAI] = None,
+        async_client: Optional[AsyncOpenAI] = None,
+        hedging: Optional[bool] = None,
+        limiter: Optional[AdaptiveLimiter] = None,
+        fallback_models: Optional[List[str]] = None,
+        supported_models: Optional[List[str]] = None,
+    ):
+        if client is None and async_client is None:
+            api_key = api_key or os.getenv("OPENAI_API_KEY")
+            if not api_key:
+                raise ValueError("OPENAI_API_KEY가 설정되지 않았습니다.")
+        self.api_key = api_key or (client or async_client).api_key
+        self.settings = settings or TransportSettings.from_env("OPENAI", OPENAI_TRANSPORT_DEFAULTS)
+        self.metrics = TransportMetrics()
+        if hedging is None:
+            hedging = os.getenv("LLM_HEDGE_ENABLED", "true").lower() == "true"
+        self.hedging = hedging
+        self.limiter = limiter or AdaptiveLimiter.from_env()
+        if fallback_models is None:
+            fallback_models = [m.strip() for m in os.getenv("LLM_FALLBACK_MODELS", "gpt-4o-mini").split(",") if m.strip()]
+        self.fallback_models = fallback_models
+        if supported_models is None:
+            supported_models = [
+                m.strip() for m in os.getenv("LLM_SUPPORTED_MODELS", ",".join(DEFAULT_SUPPORTED_MODELS)).split(",")
+                if m.strip()
+            ]
+            default_model = os.getenv("OPENAI_MODEL")
+            if default_model:
+                supported_models.append(default_model)
+        self.supported_models = frozenset(supported_models) | frozenset(fallback_models)
+        self._breakers: Dict[str, CircuitBreaker] = {}
+
+        self._client = client
+        self._async_client = async_client
+        self._async_http_client: Optional[httpx.AsyncClient] = None
+        self._adapters: Dict[Tuple[Callable, str], Any] = {}
+
+    @classmethod
+    def from_env(cls) -> "LLMClientRegistry":
+        return cls(api_key=os.getenv("OPENAI_API_KEY"))
+
+    # ---------- 클라이언트 ----------
+    @property
+    def client(self) -> OpenAI:
+        """동기 경로(스크립트 실행 등)용 클라이언트"""
+        if self._client is None:
+            self._client = OpenAI(api_key=self.api_key, http_client=create_pooled_sync_client(self.settings))
+        return self._client
+
+    @property
+    def async_client(self) -> AsyncOpenAI:
+        """엔드포인트에서 await 하는 클라이언트 (연결 지표 수집)"""
+        if self._async_client is None:
+            self._async_http_client = create_pooled_client(self.settings, self.metrics)
+            self._async_client = AsyncOpenAI(
+                api_key=self.api_key,
+                http_client=self._async_http_client,
+                max_retries=0,
+            )
+        return self._async_client
+
+    # ---------- 어댑터 ----------
+    def adapter(self, model: str, factory: Callable[..., Any]) -> Any:
+        """factory(client, model, async_client)로 만든 어댑터를 모델별로 캐시해 반환"""
+        key = (factory, model)
+        adapter = self._adapters.get(key)
+        if adapter is None:
+            adapter = factory(self.client, model, self.async_client)
+            adapter.limiter = self.limiter
+            adapter.breaker = self.breaker(model)
+            if self.hedging:
+                # 지연 분포는 모델/프롬프트 종류(시·시 슬롯·글귀·글귀 보정)마다 다르므로 어댑터가 종류별로 만듦
+                adapter.hedge_factory = HedgePolicy.from_env
+            self._adapters[key] = adapter
+        return adapter
+
+    # ---------- 모델 차단기 / 대체 경로 ----------
+    def validate_model(self, model: str) -> str:
+        """지원 목록에 있는 모델이면 그대로 반환, 아니면 UnsupportedModelError"""
+        if model not in self.supported_models:
+            raise UnsupportedModelError(f"지원하지 않는 모델입니다: {model}")
+        return model
+
+    def breaker(self, model: str) -> CircuitBreaker:
+        """모델별 차단기 (시/글귀 어댑터가 같은 모델이면 공유, 지원 목록에 있는 모델에만 생성)"""
+        breaker = self._breakers.get(model)
+        if breaker is None:
+            self.validate_model(model)
+            breaker = self._breakers[model] = CircuitBreaker.from_env()
+        return breaker
+
+    def model_chain(self, model: str) -> List[str]:
+        """요청 모델 다음에 대체 모델들 (중복 제외)"""
+        return [self.validate_model(model)] + [m for m in self.fallback_models if m != model]
+
+    def astream(
+        self,
+        opt: Any,
+        factory: Callable[..., Any],
+        open_stream: Callable[[Any, Any], AsyncIterator[str]],
+    ) -> "ModelStream":
+        """
+        스트리밍용 acomplete: opt.model부터 대체 순서대로 open_stream(adapter, opt)의 조각을 내보내는 ModelStream
+        - 첫 조각을 받기 전의 일시적 오류면 다음 모델로 넘어감 (조각을 보낸 뒤에는 모델을 바꿀 수 없으므로 그대로 올림)
+        - 요청 모델과 어댑터는 여기서 미리 확인/생성하므로, 지원하지 않는 모델이면 크레딧 예약 전에 UnsupportedModelError
+        """
+        self.adapter(self.validate_model(opt.model), factory)
+        return ModelStream(self, opt, factory, open_stream)
+
+
+    async def acomplete(
+        self,
+        opt: Any,
+        factory: Callable[..., Any],
+        invoke: Callable[[Any, Any], Awaitable[T]],
+    ) -> T:
+        """
+        opt.model부터 대체 순서대로 차단기가 허용하는 모델의 어댑터로 invoke(adapter, opt) 실행
+        - 옵션은 opt.for_model(model)로 대상 모델 계열 형식에 맞춤
+        - 일시적 오류(타임아웃/연결 오류/429/5xx)면 다음 모델로 넘어가고, 모두 실패하면 마지막 예외를 다시 던짐
+        - 요청 자체가 잘못된 오류(400 등)는 다른 모델로도 같으므로 바로 다시 던짐
+        - 모든 모델의 차단기가 열려 있으면 LLMOverloadedError (엔드포인트에서 503)
+        - 지원 목록에 없는 모델이면 호출 없이 UnsupportedModelError
+        """
+        last_error: Optional[Exception] = None
+        for model in self.model_chain(opt.model):
+            if not self.breaker(model).allow():
+                continue
+            try:
+                return await invoke(self.adapter(model, factory), opt.for_model(model))
+            except LLMOverloadedError:
+                # 인스턴스 자체의 대기열 포화는 모델을 바꿔도 해결되지 않음
+                raise
+            except Exception as e:
+                if not is_transient_error(e):
+                    raise
+                print(f"⚠️ {model} 호출 실패, 다음 모델로 전환: {e}")
+                last_error = e
+        if last_error is not None:
+            raise last_error
+        raise LLMOverloadedError(
+            "모든 모델의 호출이 일시적으로 차단되었습니다.",
+            retry_after=min(self.breaker(m).open_seconds for m in self.model_chain(opt.model)),
+        )
+
+    # ---------- 수명주기 / 지표 ----------
+    async def aclose(self) -> None:
+        if self._async_client is not None:
+            await self._async_client.close()
+        if self._client is not None:
+            self._client.close()
+        self._client = None
+        self._async_client = None
+        self._async_http_client = None
+        self._adapters.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """공유 커넥션 풀 상태, 캐시된 어댑터 목록, 모델·프롬프트 종류별 헤징 / 모델별 프롬프트 캐시 지표, 입장 제어(동시성/대기열) 지표, 모델별 차단기 상태"""
+        return {
+            "adapters": sorted({model for _, model in self._adapters}),
+            "admission": self.limiter.stats(),
+            "fallback_models": self.fallback_models,
+            "supported_models": sorted(self.supported_models),
+            "breakers": {model: breaker.stats() for model, breaker in self._breakers.items()},
+            "hedging": {
+                f"{model}:{kind}": hedge.stats()
+                for (_, model), adapter in self._adapters.items()
+                for kind, hedge in getattr(adapter, "hedges", {}).items()
+            },
+            "prompt_cache": {
+                model: adapter.prompt_cache.stats()
+                for (_, model), adapter in self._adapters.items()
+                if getattr(adapter, "prompt_cache", None) is not None
+            },
+            "transport": (
+                pool_stats(self._async_http_client, self.settings, self.metrics)
+                if self._async_http_client is not None else None
+            ),
+        }
+
+
+class ModelStream:
+    """
+    LLMClientRegistry.astream이 돌려주는 스트림 (async for로 조각을 받고 aclose로 정리)
+    - model: 지금 응답 중인(끝난 뒤에는 실제로 응답한) 모델
+    """
+
+    def __init__(
+        self,
+        registry: LLMClientRegistry,
+        opt: Any,
+        factory: Callable[..., Any],
+        open_stream: Callable[[Any, Any], AsyncIterator[str]],
+    ):
+        self.registry = registry
+        self.model: str = opt.model
+        self._opt = opt
+        self._factory = factory
+        self._open_stream = open_stream
+        self._deltas = self._run()
+
+    def __aiter__(self) -> AsyncIterator[str]:
+        return self._deltas
+
+    async def aclose(self) -> None:
+        await self._deltas.aclose()
+
+    async def _run(self) -> AsyncIterator[str]:
+        registry = self.registry
+        last_error: Optional[Exception] = None
+        for model in registry.model_chain(self._opt.model):
+            if not registry.breaker(model).allow():
+                continue
+            self.model = model
+            received = False
+            try:
+                adapter = registry.adapter(model, self._factory)
+                async for delta in self._open_stream(adapter, self._opt.for_model(model)):
+                    received = True
+                    yield delta
+                return
+            except LLMOverloadedError:
+                raise
+            except Exception as e:
+                if received or not is_transient_error(e):
+                    raise
+                print(f"⚠️ {model} 스트림 시작 실패, 다음 모델로 전환: {e}")
+                last_error = e
+        if last_error is not None:
+            raise last_error
+        raise LLMOverloadedError(
+            "모든 모델의 호출이 일시적으로 차단되었습니다.",
+            retry_after=min(registry.breaker(m).open_seconds for m in registry.model_chain(self._opt.model)),
+        )
@@ -1,30 +1,61 @@
 from fastapi import FastAPI, HTTPException
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import List, Optional, AsyncIterator, Callable, Awaitable, Tuple
+from contextlib import asynccontextmanager, aclosing
+from dataclasses import replace
 import asyncio
+import json
 from datetime import datetime
 import os
 from dotenv import load_dotenv
-from supabase import create_client, Client
-from verify_token import verify_and_decode_supabase_jwt
-from poem_generator_modern import PoemGenerator, GenOptions
-from quote_generator_modern import QuoteGenerator
 
+# 아래 모듈들이 import 시점에 환경변수(SUPABASE_URL 등)를 읽으므로 .env를 먼저 로드
 load_dotenv()
 
+from credit_repository import CreditRepository
+from credit_ledger import CreditLedger
+from verify_token import (
+    averify_and_decode_supabase_jwt,
+    claims_cache_stats,
+    prefetch_jwks,
+    aclose_jwks_client,
+)
+from poem_generator_modern import PoemGenerator
+from quote_generator_modern import QuoteGenerator
+from llm_client_registry import LLMClientRegistry, ModelStream, UnsupportedModelError
+from llm_adapters import GenOptions, Completion, IncompleteResponseError
+from llm_admission import LLMOverloadedError, request_deadline
+from incremental_json import IncrementalItemParser
+from generation_cache import GenerationKey, GenerationResultCache
+from poem_inventory import PoemInventory
+from single_flight import SingleFlight
+from token_budget import TokenBudgeter
+
 # Supabase 클라이언트 설정
 supabase_url = os.getenv("SUPABASE_URL")
 supabase_service_key = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
 
 if not supabase_url or not supabase_service_key:
     print("경고: Supabase 환경변수가 설정되지 않았습니다.")
-    supabase = None
-else:
-    supabase: Client = create_client(supabase_url, supabase_service_key)
+
+# 크레딧 저장소 (비동기 Supabase 클라이언트, lifespan에서 생성)
+credit_repo: Optional[CreditRepository] = None
+# 크레딧 차감 원장 (묶음 반영, lifespan에서 시작/종료)
+credit_ledger: Optional[CreditLedger] = None
+# 인기 조건 시 재고 (백그라운드 보충, lifespan에서 시작/종료)
+poem_inventory: Optional[PoemInventory] = None
+
+# OpenAI 클라이언트 레지스트리 (시/글귀 생성이 하나의 커넥션 풀과 모델별 어댑터를 공유)
+try:
+    llm_registry = LLMClientRegistry.from_env()
+except Exception as e:
+    print(f"⚠️ OpenAI 클라이언트 레지스트리 초기화 실패: {e}")
+    llm_registry = None
 
 # PoemGenerator 인스턴스 초기화 (전역으로 재사용)
 try:
-    poem_generator = PoemGenerator()
+    poem_generator = PoemGenerator(registry=llm_registry)
     print("✅ PoemGenerator 초기화 완료")
 except Exception as e:
     print(f"⚠️ PoemGenerator 초기화 실패: {e}")
@@ -32,13 +63,84 @@ except Exception as e:
 
 # QuoteGenerator 인스턴스 초기화 (전역으로 재사용)
 try:
-    quote_generator = QuoteGenerator()
+    quote_generator = QuoteGenerator(registry=llm_registry)
     print("✅ QuoteGenerator 초기화 완료")
 except Exception as e:
     print(f"⚠️ QuoteGenerator 초기화 실패: {e}")
     quote_generator = None
 
-app = FastAPI(title="시 생성 API", version="1.0.0")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global credit_repo, credit_ledger, poem_inventory
+    if supabase_url and supabase_service_key:
+        credit_repo = await CreditRepository.create(supabase_url, supabase_service_key)
+        credit_ledger = CreditLedger.from_env(credit_repo)
+        await credit_ledger.start()
+    # JWKS를 미리 받아 첫 인증 요청이 키 조회를 기다리지 않도록 함
+    try:
+        await prefetch_jwks()
+    except Exception as e:
+        print(f"⚠️ JWKS 사전 로드 실패 (첫 요청 시 재시도): {e}")
+    if poem_generator and POEM_INVENTORY_ENABLED:
+        poem_inventory = PoemInventory.from_env(generate_inventory_poems)
+        poem_inventory.start()
+    yield
+    if poem_inventory:
+        # 보충 중인 생성은 취소 (재고는 프로세스 메모리에만 있으므로 버림)
+        await poem_inventory.aclose()
+    await aclose_jwks_client()
+    if credit_ledger:
+        # 종료 전 확정된 예약을 정산
+        await credit_ledger.aclose()
+    if credit_repo:
+        await credit_repo.aclose()
+    if llm_registry:
+        await llm_registry.aclose()
+
+# 시 생성 방식 기본값 ("single": 한 번에 4편, "fanout": 한 편씩 4개 동시 요청)과 fan-out 슬롯별 재시도 횟수
+POEM_GENERATION_MODE = os.getenv("POEM_GENERATION_MODE", "single")
+FANOUT_SLOT_RETRIES = int(os.getenv("FANOUT_SLOT_RETRIES", "1"))
+
+# 한 번에 생성한 응답이 일부 잘리거나 거절됐을 때 빠진 항목만 다시 생성하는 부분 복구 (재시도 횟수, 최대 복구 항목 수, 0이면 끔)
+SALVAGE_MAX_RETRIES = int(os.getenv("SALVAGE_MAX_RETRIES", "1"))
+SALVAGE_MAX_SLOTS = int(os.getenv("SALVAGE_MAX_SLOTS", "3"))
+
+# 길이별 출력 토큰 예산 (실제 사용량의 백분위 + 여유분, 잘림이 늘면 자동 확대)
+token_budgets = TokenBudgeter.from_env()
+
+# 정규화된 요청 조건별 생성 결과 캐시 (프리셋 반복 요청은 LLM 호출 없이 응답)
+result_cache = GenerationResultCache.from_env()
+
+# 같은 조건으로 동시에 들어온 생성 요청 합치기 (진행 중인 호출 하나를 여러 요청이 함께 기다림)
+generation_flights = SingleFlight.from_env()
+
+# 인기 조건 시 재고 사용 여부 (요청이 많은 조건의 4편 묶음을 미리 생성해 두고 즉시 응답)
+# 보충이 요청 밖에서 돌기 때문에 기본은 끔: 켜려면 Cloud Run을 CPU 항상 할당 + 최소 인스턴스 1개 이상으로 배포 (deploy.sh 참고)
+POEM_INVENTORY_ENABLED = os.getenv("POEM_INVENTORY_ENABLED", "false").lower() == "true"
+
+# 요청 하나의 LLM 작업 시간 상한 (입장 대기, 재시도 백오프, 대체 모델, 부분 복구/보정 호출을 모두 포함)
+# Cloud Run 요청 타임아웃(--timeout=60)보다 짧게 잡아, 시간이 다 되면 잘리기 전에 503/오류 이벤트로 응답하고 예약을 해제
+LLM_REQUEST_DEADLINE_SECONDS = float(os.getenv("LLM_REQUEST_DEADLINE_SECONDS", "50"))
+
+app = FastAPI(title="시 생성 API", version="1.0.0", lifespan=lifespan)
+
+
+class LLMRequestDeadlineMiddleware:
+    """요청마다 LLM 작업 마감(request_deadline)을 설정하는 ASGI 미들웨어 (스트리밍 응답 본문까지 같은 마감 적용)"""
+
+    def __init__(self, app, seconds: float):
+        self.app = app
+        self.seconds = seconds
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        with request_deadline(self.seconds):
+            await self.app(scope, receive, send)
+
+
+app.add_middleware(LLMRequestDeadlineMiddleware, seconds=LLM_REQUEST_DEADLINE_SECONDS)
 
 # Pydantic 모델 정의
 class UserCurrency(BaseModel):
@@ -80,6 +182,7 @@ class PoemRequest(BaseModel):
     author_style: str  # 작가 스타일 (예: "김소월", "윤동주")
     keywords: List[str]  # 포함할 단어들 (3-5개)
     length: str  # 길이 (예: "8행", "16행", "보통")
+    generation_mode: Optional[str] = None  # "single"(한 번에 4편), "fanout"(한 편씩 4개 동시 요청), 없으면 POEM_GENERATION_MODE
 
 class PoemResponse(BaseModel):
     success: bool
@@ -87,6 +190,7 @@ class PoemResponse(BaseModel):
     poems: List[str]  # 생성된 시들 (제목 포함)
     generation_time: Optional[float] = None
     remaining_credits: Optional[int] = None
+    ai_model_used: Optional[str] = None  # 실제로 시를 생성한 모델 (대체 모델로 전환됐을 수 있음)
     error: Optional[str] = None
 
 # 오늘의 글귀 관련 모델
@@ -183,11 +287,33 @@ async def ping():
     }
 
 
+# 내부 캐시/성능 지표
+@app.get("/metrics")
+async def metrics():
+    """캐시 히트율 등 서버 내부 지표를 반환합니다"""
+    return {
+        "timestamp": datetime.now().isoformat(),
+        "jwt_claims_cache": claims_cache_stats(),
+        "credit_balance_cache": credit_repo.balance_cache.stats() if credit_repo else None,
+        "credit_ledger": credit_ledger.stats() if credit_ledger else None,
+        "supabase_transport": credit_repo.transport_stats() if credit_repo else None,
+        "openai_clients": llm_registry.stats() if llm_registry else None,
+        "generation_result_cache": result_cache.stats(),
+        "poem_inventory": poem_inventory.stats() if poem_inventory else None,
+        "single_flight": generation_flights.stats(),
+        "token_budgets": token_budgets.stats(),
+        "parse_results": {
+            "poem": poem_generator.parse_stats.stats() if poem_generator else None,
+            "quote": quote_generator.parse_stats.stats() if quote_generator else None,
+        },
+    }
+
+
 # 회원가입 (실제용) - access_token으로 등록
 @app.post("/auth/register", response_model=UserRegistrationResponse)
 async def register_user(request: UserRegistrationRequest):
     """실제용: access_token을 검증하고 회원가입 처리"""
-    if not supabase:
+    if not credit_repo:
         raise HTTPException(
             status_code=500,
             detail="Supabase 클라이언트가 설정되지 않았습니다"
@@ -195,14 +321,13 @@ async def register_user(request: UserRegistrationRequest):
     
     try:
         # JWT 토큰 검증
-        claims = verify_and_decode_supabase_jwt(request.access_token)
+        claims = await averify_and_decode_supabase_jwt(request.access_token)
         user_id = claims["sub"]
         
         # 기존 사용자 확인
-        existing_user = supabase.table("users_credits").select("*").eq("user_id", user_id).execute()
+        user_data = await credit_repo.get_user(user_id)
 
-        if existing_user.data:
-            user_data = existing_user.data[0]
+        if user_data:
             total_credits = user_data.get("free_credits", 0) + user_data.get("paid_credits", 0)
             return UserRegistrationResponse(
                 success=True,
@@ -214,15 +339,9 @@ async def register_user(request: UserRegistrationRequest):
 
         # 새 사용자 등록
         initial_credits = 100  # 기본 크레딧
-        result = supabase.table("users_credits").insert({
-            "user_id": user_id,
-            "free_credits": initial_credits,
-            "paid_credits": 0,
-            "updated_at": datetime.now().isoformat()
-        }).execute()
-
-        if result.data:
-            user_data = result.data[0]
+        user_data = await credit_repo.insert_user(user_id, initial_credits)
+
+        if user_data:
             total_credits = user_data.get("free_credits", 0) + user_data.get("paid_credits", 0)
             return UserRegistrationResponse(
                 success=True,
@@ -250,7 +369,7 @@ async def register_user(request: UserRegistrationRequest):
 @app.post("/auth/withdraw", response_model=UserWithdrawalResponse)
 async def withdraw_user(request: UserWithdrawalRequest):
     """access_token을 검증하고 회원탈퇴 처리"""
-    if not supabase:
+    if not credit_repo:
         raise HTTPException(
             status_code=500,
             detail="Supabase 클라이언트가 설정되지 않았습니다"
@@ -258,20 +377,18 @@ async def withdraw_user(request: UserWithdrawalRequest):
 
     try:
         # JWT 토큰 검증
-        claims = verify_and_decode_supabase_jwt(request.access_token)
+        claims = await averify_and_decode_supabase_jwt(request.access_token)
         user_id = claims["sub"]
 
         # 사용자 존재 확인
-        existing_user = supabase.table("users_credits").select("*").eq("user_id", user_id).execute()
+        user_data = await credit_repo.get_user(user_id)
 
-        if not existing_user.data:
+        if not user_data:
             raise HTTPException(
                 status_code=404,
                 detail="등록되지 않은 사용자입니다"
             )
 
-        user_data = existing_user.data[0]
-
         # 이미 탈퇴한 사용자인지 확인
         if user_data.get("deleted_at"):
             return UserWithdrawalResponse(
@@ -283,12 +400,9 @@ async def withdraw_user(request: UserWithdrawalRequest):
 
         # 탈퇴 처리 - deleted_at에 현재 시각 기록
         deleted_at = datetime.now().isoformat()
-        result = supabase.table("users_credits").update({
-            "deleted_at": deleted_at,
-            "updated_at": deleted_at
-        }).eq("user_id", user_id).execute()
+        updated_user = await credit_repo.mark_deleted(user_id, deleted_at)
 
-        if result.data:
+        if updated_user:
             return UserWithdrawalResponse(
                 success=True,
                 user_id=user_id,
@@ -343,36 +457,71 @@ async def approve_payment(payment_request: PaymentRequest):
         "timestamp": datetime.now().isoformat()
     }
 
-# 크레딧 검증 함수
-def validate_user_credit(user_id: str) -> int:
-    """사용자의 크레딧을 확인하고 반환합니다"""
-    if not supabase:
+# 크레딧 사전 거절 함수
+def reject_by_cached_credit(user_id: str) -> None:
+    """캐시된 잔액으로 탈퇴/잔액 부족 사용자를 DB 왕복 없이 미리 거절합니다
+
+    캐시 미스면 그대로 통과하며, 최종 판단(미등록/탈퇴/잔액)은 reserve_user_credit RPC 한 번으로 합니다.
+    """
+    if not credit_repo:
+        raise HTTPException(
+            status_code=500,
+            detail="Supabase 클라이언트가 설정되지 않았습니다"
+        )
+
+    balance = credit_repo.cached_balance(user_id)
+    if balance is None:
+        return
+
+    if balance.deleted_at:
+        raise HTTPException(
+            status_code=403,
+            detail="탈퇴 처리된 사용자입니다"
+        )
+
+    if balance.total <= 0:
+        raise HTTPException(
+            status_code=400,
+            detail="크레딧이 부족합니다. 크레딧을 충전해주세요"
+        )
+
+# 크레딧 예약(hold) 유지 시간 - 인스턴스가 죽어도 이 시간이 지나면 예약이 자동 해제됨
+CREDIT_HOLD_TTL_SECONDS = int(os.getenv("CREDIT_HOLD_TTL_SECONDS", "120"))
+
+# 크레딧 예약 함수
+async def reserve_user_credit(user_id: str) -> dict:
+    """LLM 호출 전에 크레딧 1개를 원자적으로 예약하고 예약 정보(hold_id, available_credits)를 반환합니다
+
+    미등록/탈퇴/잔액 확인과 예약을 RPC 한 번으로 처리합니다. 예약된 크레딧은
+    잔액 계산에서 제외되므로, 마지막 크레딧으로 여러 생성 요청을 동시에 시작할 수 없습니다.
+    """
+    if not credit_repo:
         raise HTTPException(
             status_code=500,
             detail="Supabase 클라이언트가 설정되지 않았습니다"
         )
 
     try:
-        user_data = supabase.table("users_credits").select("*").eq("user_id", user_id).execute()
+        hold = await credit_repo.reserve(user_id, CREDIT_HOLD_TTL_SECONDS)
+        status = hold.get("status")
 
-        if not user_data.data:
+        if status == "not_found":
             raise HTTPException(
                 status_code=404,
                 detail="등록되지 않은 사용자입니다"
             )
-
-        user_info = user_data.data[0]
-        free_credits = user_info.get("free_credits", 0)
-        paid_credits = user_info.get("paid_credits", 0)
-        total_credits = free_credits + paid_credits
-
-        if total_credits <= 0:
+        if status == "deleted":
+            raise HTTPException(
+                status_code=403,
+                detail="탈퇴 처리된 사용자입니다"
+            )
+        if status != "ok":
             raise HTTPException(
                 status_code=400,
                 detail="크레딧이 부족합니다. 크레딧을 충전해주세요"
             )
 
-        return total_credits
+        return hold
 
     except HTTPException:
         raise
@@ -382,58 +531,227 @@ def validate_user_credit(user_id: str) -> int:
             detail=f"크레딧 확인 중 오류가 발생했습니다: {str(e)}"
         )
 
-# 크레딧 차감 함수
-def deduct_user_credit(user_id: str) -> int:
-    """사용자의 크레딧을 1 차감하고 남은 크레딧을 반환합니다 (free_credits 우선 소모)"""
-    if not supabase:
+# 크레딧 예약 확정 함수
+async def commit_credit_hold(user_id: str, hold: dict) -> int:
+    """예약을 확정해 크레딧 1 차감을 DB에 기록하고 남은 크레딧을 반환합니다
+
+    확정은 예약 행에 committed_at을 남기는 작은 RPC 한 번이며, 확정된 예약은 만료되지 않으므로
+    응답 이후 인스턴스가 죽어도 차감이 유실되지 않습니다. 잔액 반영(정산)은 백그라운드에서
+    묶음으로 처리됩니다. 남은 크레딧은 예약 시점의 가용 잔액입니다.
+    """
+    if not credit_ledger:
         raise HTTPException(
             status_code=500,
             detail="Supabase 클라이언트가 설정되지 않았습니다"
         )
 
     try:
-        # 현재 크레딧 조회
-        current_credits_result = supabase.table("users_credits").select("*").eq("user_id", user_id).execute()
-        user_info = current_credits_result.data[0]
-        free_credits = user_info.get("free_credits", 0)
-        paid_credits = user_info.get("paid_credits", 0)
-
-        # free_credits 우선 차감
-        if free_credits > 0:
-            new_free_credits = free_credits - 1
-            new_paid_credits = paid_credits
-        elif paid_credits > 0:
-            new_free_credits = free_credits
-            new_paid_credits = paid_credits - 1
-        else:
-            raise HTTPException(
-                status_code=400,
-                detail="크레딧이 부족합니다"
-            )
+        await credit_ledger.commit(user_id, hold["hold_id"])
+        return hold.get("available_credits", 0)
 
-        # 크레딧 업데이트
-        result = supabase.table("users_credits").update({
-            "free_credits": new_free_credits,
-            "paid_credits": new_paid_credits,
-            "updated_at": datetime.now().isoformat()
-        }).eq("user_id", user_id).execute()
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"크레딧 차감 중 오류가 발생했습니다: {str(e)}"
+        )
 
-        if result.data:
-            updated_user = result.data[0]
-            return updated_user.get("free_credits", 0) + updated_user.get("paid_credits", 0)
-        else:
-            raise HTTPException(
-                status_code=500,
-                detail="크레딧 차감에 실패했습니다"
-            )
+# 크레딧 예약 해제 함수
+async def release_credit_hold(hold_id: str) -> None:
+    """생성 실패 시 예약을 해제합니다 (실패해도 TTL이 지나면 자동 해제되므로 예외를 올리지 않음)"""
+    if not credit_repo:
+        return
 
-    except HTTPException:
-        raise
+    try:
+        await credit_repo.release_hold(hold_id)
     except Exception as e:
+        print(f"⚠️ 크레딧 예약 해제 실패 (hold_id={hold_id}, TTL 후 자동 해제): {e}")
+
+# 요청 모델 확인 함수
+def resolve_model(requested: Optional[str]) -> str:
+    """요청 모델(없으면 OPENAI_MODEL)이 지원 목록에 있는지 크레딧 예약 전에 확인하고 반환합니다"""
+    if not llm_registry:
         raise HTTPException(
             status_code=500,
-            detail=f"크레딧 차감 중 오류가 발생했습니다: {str(e)}"
+            detail="OpenAI 클라이언트가 초기화되지 않았습니다. OpenAI API 키를 확인해주세요."
+        )
+
+    try:
+        return llm_registry.validate_model(requested or os.getenv('OPENAI_MODEL', 'gpt-5-mini-2025-08-07'))
+    except UnsupportedModelError as e:
+        raise HTTPException(
+            status_code=400,
+            detail=str(e)
+        )
+
+# 모델에 따른 시 생성 옵션
+def build_poem_options(model: str) -> GenOptions:
+    if model.startswith('gpt-5'):
+        # GPT-5 계열: Responses API
+        return GenOptions(
+            model=model,
+            reasoning_effort="low",
+            max_output_tokens=2048
+        )
+    # GPT-4o 계열: Chat Completions API
+    return GenOptions(
+        model=model,
+        temperature=0.9,
+        max_tokens=2000
+    )
+
+# 모델에 따른 글귀 생성 옵션
+def build_quote_options(model: str, reasoning_effort: str) -> GenOptions:
+    if model.startswith('gpt-5'):
+        # GPT-5 계열: Responses API
+        return GenOptions(
+            model=model,
+            reasoning_effort=reasoning_effort,
+            max_output_tokens=1024
         )
+    # GPT-4o 계열: Chat Completions API
+    return GenOptions(
+        model=model,
+        temperature=0.8,
+        max_tokens=1000
+    )
+
+# 예산 구분: 용도와 모델, reasoning effort마다 토큰 사용량이 크게 달라 따로 관리
+def token_budget_kind(purpose: str, opt: GenOptions) -> str:
+    return f"{purpose}:{opt.model}:{opt.reasoning_effort or '-'}"
+
+# 길이별 예산을 옵션에 적용 (build_*_options의 고정값을 기본값이자 상한 기준으로 사용)
+def with_token_budget(purpose: str, length: str, opt: GenOptions) -> GenOptions:
+    kind = token_budget_kind(purpose, opt)
+    if opt.max_output_tokens is not None:
+        return replace(opt, max_output_tokens=token_budgets.budget(kind, length, opt.max_output_tokens))
+    if opt.max_tokens is not None:
+        return replace(opt, max_tokens=token_budgets.budget(kind, length, opt.max_tokens))
+    return opt
+
+# 호출 결과의 출력/reasoning 토큰 사용량과 잘림 여부를 예산에 반영
+def record_token_usage(purpose: str, length: str, opt: GenOptions, completion: Completion) -> None:
+    if completion.model and completion.model != opt.model:
+        # 대체 모델의 사용량은 요청 모델의 예산 구분에 섞지 않음
+        return
+    if completion.truncated:
+        print(f"⚠️ 출력 토큰 상한에 걸려 응답이 잘림 ({purpose}, 길이: {length}, 상한: {opt.max_output_tokens or opt.max_tokens})")
+    token_budgets.record(
+        token_budget_kind(purpose, opt),
+        length,
+        completion.output_tokens,
+        completion.reasoning_tokens,
+        completion.truncated
+    )
+
+# 실제 LLM 호출로 시 생성 (생성 방식에 따라 한 번에 4편 또는 fan-out), parse_response 형태의 결과 반환
+async def generate_poem_result(poem_request: PoemRequest, gen_options: GenOptions) -> dict:
+    if (poem_request.generation_mode or POEM_GENERATION_MODE) == "fanout":
+        # 한 편씩 4개 요청을 동시에 보내 가장 느린 한 편의 시간만큼만 기다림
+        # (실패한 슬롯만 다시 요청, 슬롯 호출마다 입장 제어의 동시 호출 한 자리씩 점유)
+        slot_options = with_token_budget("poem_slot", poem_request.length, gen_options)
+        parsed_result = await poem_generator.agenerate_poems_fanout(
+            style=poem_request.style,
+            author_style=poem_request.author_style,
+            keywords=poem_request.keywords,
+            length=poem_request.length,
+            opt=slot_options,
+            max_retries=FANOUT_SLOT_RETRIES,
+            on_completion=lambda completion: record_token_usage(
+                "poem_slot", poem_request.length, slot_options, completion
+            )
+        )
+    else:
+        # PoemGenerator 비동기 경로로 시 생성 (동시 호출 수/대기열/429 재시도는 어댑터 앞의 입장 제어가 담당)
+        poem_options = with_token_budget("poem", poem_request.length, gen_options)
+        completion = await poem_generator.acomplete_poems(
+            style=poem_request.style,
+            author_style=poem_request.author_style,
+            keywords=poem_request.keywords,
+            length=poem_request.length,
+            opt=poem_options
+        )
+        record_token_usage("poem", poem_request.length, poem_options, completion)
+        
+        # 응답 파싱하여 구조화된 결과 생성 (통과한 시는 살리고 빠진/거절된 시만 한 편짜리 호출로 다시 생성)
+        slot_options = with_token_budget("poem_slot", poem_request.length, gen_options)
+        parsed_result = await poem_generator.arepair_poems(
+            completion.text,
+            poem_request.style,
+            poem_request.author_style,
+            poem_request.keywords,
+            poem_request.length,
+            opt=slot_options,
+            model_used=completion.model,
+            max_retries=SALVAGE_MAX_RETRIES,
+            max_slots=SALVAGE_MAX_SLOTS,
+            on_completion=lambda slot_completion: record_token_usage(
+                "poem_slot", poem_request.length, slot_options, slot_completion
+            )
+        )
+    return parsed_result
+
+# 시 재고 보충용 생성 (요청자 없이 정규화된 조건 그대로 생성, 검증 통과한 4편만 반환)
+async def generate_inventory_poems(key: GenerationKey) -> Optional[List[str]]:
+    poem_request = PoemRequest(
+        user_id="inventory",
+        style=key.style,
+        author_style=key.author_style,
+        keywords=list(key.keywords),
+        length=key.length
+    )
+    parsed_result = await generate_poem_result(poem_request, build_poem_options(key.model))
+    # 대체 모델로 생성된 묶음은 이 조건(모델 포함)의 재고로 쓰지 않음
+    if not parsed_result.get("success", False) or parsed_result.get("ai_model_used") != key.model:
+        return None
+    return parsed_result["poems"]
+
+# 실제 LLM 호출로 글귀 생성, parse_response 형태의 결과 반환
+async def generate_quote_result(quote_request: QuoteRequest, gen_options: GenOptions) -> dict:
+    # QuoteGenerator 비동기 경로로 글귀 생성 (동시 호출 수/대기열/429 재시도는 어댑터 앞의 입장 제어가 담당)
+    quote_options = with_token_budget("quote", quote_request.length, gen_options)
+    completion = await quote_generator.acomplete_quotes(
+        style=quote_request.style,
+        author_style=quote_request.author_style,
+        keywords=quote_request.keywords,
+        length=quote_request.length,
+        opt=quote_options
+    )
+    record_token_usage("quote", quote_request.length, quote_options, completion)
+    
+    # 응답 파싱하여 구조화된 결과 생성 (통과한 글귀는 살리고 빠진/거절된 글귀만 작은 호출로 다시 생성)
+    repair_options = with_token_budget("quote_repair", quote_request.length, gen_options)
+    parsed_result = await quote_generator.arepair_quotes(
+        completion.text,
+        quote_request.style,
+        quote_request.author_style,
+        quote_request.keywords,
+        quote_request.length,
+        opt=repair_options,
+        model_used=completion.model,
+        max_retries=SALVAGE_MAX_RETRIES,
+        max_slots=SALVAGE_MAX_SLOTS,
+        on_completion=lambda repair_completion: record_token_usage(
+            "quote_repair", quote_request.length, repair_options, repair_completion
+        )
+    )
+    return parsed_result
+
+# 같은 조건으로 진행 중인 생성이 있으면 그 결과를 함께 사용, (결과, 공유 여부) 반환
+# 결과 dict는 요청마다 복사하고, 공유받은 경우 request 항목을 이 요청의 원래 값으로 바꿈
+async def generate_coalesced(
+    cache_key: GenerationKey,
+    request_info: dict,
+    call: Callable[[], Awaitable[dict]]
+) -> Tuple[dict, bool]:
+    parsed_result, shared = await generation_flights.run(
+        cache_key,
+        call,
+        succeeded=lambda result: result.get("success", False)
+    )
+    parsed_result = dict(parsed_result)
+    if shared:
+        parsed_result["request"] = request_info
+    return parsed_result, shared
 
 # 6. 실제 AI 시 생성
 @app.post("/poems/generate", response_model=PoemResponse)
@@ -445,51 +763,65 @@ async def generate_poems(poem_request: PoemRequest):
             detail="시 생성기가 초기화되지 않았습니다. OpenAI API 키를 확인해주세요."
         )
     
-    # 크레딧 검증
-    validate_user_credit(poem_request.user_id)
+    # 환경변수의 모델이 지원 목록에 있는지 예약 전에 확인
+    model = resolve_model(None)
+    
+    # 캐시된 잔액으로만 사전 거절 (미스 시 추가 조회 없음) 후 예약 RPC 한 번으로 검증 + 예약
+    reject_by_cached_credit(poem_request.user_id)
+    hold = await reserve_user_credit(poem_request.user_id)
+    committed = False
     
     start_time = datetime.now()
     
     try:
-        # 환경변수에서 모델 정보 가져오기
-        model = os.getenv('OPENAI_MODEL', 'gpt-5-mini-2025-08-07')
-        
-        # 모델에 따른 옵션 설정
-        if model.startswith('gpt-5'):
-            # GPT-5 계열: Responses API
-            gen_options = GenOptions(
-                model=model,
-                reasoning_effort="low",
-                max_output_tokens=2048
-            )
-        else:
-            # GPT-4o 계열: Chat Completions API
-            gen_options = GenOptions(
-                model=model,
-                temperature=0.9,
-                max_tokens=2000
-            )
+        gen_options = build_poem_options(model)
         
-        # PoemGenerator를 사용하여 시 생성 (원시 텍스트 반환)
-        raw_result = await asyncio.to_thread(
-            poem_generator.generate_poems,
-            style=poem_request.style,
-            author_style=poem_request.author_style,
-            keywords=poem_request.keywords,
-            length=poem_request.length,
-            opt=gen_options
-        )
-        
-        # 응답 파싱하여 구조화된 결과 생성
-        parsed_result = poem_generator.parse_response(
-            raw_result,
+        # 1) 미리 생성해 둔 재고 → 2) 결과 캐시 → 3) 실제 생성 순으로 사용
+        cache_key = GenerationKey.normalize(
+            "poem",
             poem_request.style,
             poem_request.author_style,
             poem_request.keywords,
-            poem_request.length
+            poem_request.length,
+            model,
+            gen_options.reasoning_effort
         )
+        ready_poems = None
+        if poem_inventory:
+            # 요청 수를 집계해 인기 조건을 재고 대상으로 올리고, 재고가 있으면 하나를 꺼냄
+            poem_inventory.record(cache_key)
+            ready_poems = poem_inventory.take(cache_key)
+        if ready_poems is None:
+            ready_poems = result_cache.get(cache_key)
+        if ready_poems is not None:
+            parsed_result = {
+                "success": True,
+                "request": {
+                    "style": poem_request.style,
+                    "author_style": poem_request.author_style,
+                    "keywords": poem_request.keywords,
+                    "length": poem_request.length
+                },
+                "poems": ready_poems,
+                "ai_model_used": model
+            }
+        else:
+            # 같은 조건의 생성이 진행 중이면 합류 (크레딧은 요청마다 따로 예약/확정)
+            parsed_result, shared = await generate_coalesced(
+                cache_key,
+                {
+                    "style": poem_request.style,
+                    "author_style": poem_request.author_style,
+                    "keywords": poem_request.keywords,
+                    "length": poem_request.length
+                },
+                lambda: generate_poem_result(poem_request, gen_options)
+            )
+            # 캐시에는 요청 모델이 직접 생성한 결과만 보관 (대체 모델 결과는 이번 응답에만 사용)
+            if parsed_result.get("success", False) and not shared and parsed_result.get("ai_model_used") == model:
+                result_cache.put(cache_key, parsed_result["poems"])
         
-        # 파싱 결과 확인 - 실패한 경우 크레딧 차감하지 않고 에러 응답
+        # 파싱 결과 확인 - 실패한 경우 예약을 해제하고 에러 응답
         if not parsed_result.get("success", False):
             end_time = datetime.now()
             generation_time = (end_time - start_time).total_seconds()
@@ -506,25 +838,42 @@ async def generate_poems(poem_request: PoemRequest):
                 }
             )
         
-        # 시 생성 성공 후 크레딧 차감
-        remaining_credits = deduct_user_credit(poem_request.user_id)
+        # 시 생성 성공 후 예약 확정 (DB에 확정 기록, 잔액 정산은 묶음 처리)
+        remaining_credits = await commit_credit_hold(poem_request.user_id, hold)
+        committed = True
         
         end_time = datetime.now()
         generation_time = (end_time - start_time).total_seconds()
         
-        # 생성 시간과 남은 크레딧 정보 추가
+        # 생성 시간과 남은 크레딧, AI 모델 정보 추가 (대체 모델로 생성됐으면 그 모델)
         parsed_result["generation_time"] = generation_time
         parsed_result["remaining_credits"] = remaining_credits
+        parsed_result["ai_model_used"] = parsed_result.get("ai_model_used") or model
         
         return PoemResponse(**parsed_result)
         
     except HTTPException:
         raise
+    except LLMOverloadedError as e:
+        # 동시 호출 상한과 대기열이 가득 찬 상태 → 잠시 후 재시도하도록 503 + Retry-After
+        raise HTTPException(
+            status_code=503,
+            detail={
+                "message": f"{e} 잠시 후 다시 시도해주세요.",
+                "error_code": "LLM_OVERLOADED",
+                "retry_recommended": True
+            },
+            headers={"Retry-After": str(max(1, round(e.retry_after)))}
+        )
     except Exception as e:
         raise HTTPException(
             status_code=500,
             detail=f"시 생성 중 오류가 발생했습니다: {str(e)}"
         )
+    finally:
+        # 확정되지 못한 예약(422, 500 등)은 즉시 해제
+        if not committed:
+            await release_credit_hold(hold["hold_id"])
 
 
 # 7. 오늘의 글귀 생성
@@ -537,52 +886,59 @@ async def generate_quotes(quote_request: QuoteRequest):
             detail="글귀 생성기가 초기화되지 않았습니다. OpenAI API 키를 확인해주세요."
         )
     
-    # 크레딧 검증
-    validate_user_credit(quote_request.user_id)
+    # 요청한 AI 모델이 지원 목록에 있는지 예약 전에 확인 (지원하지 않으면 400, 크레딧 예약 없음)
+    model = resolve_model(quote_request.ai_model)
+    
+    # 캐시된 잔액으로만 사전 거절 (미스 시 추가 조회 없음) 후 예약 RPC 한 번으로 검증 + 예약
+    reject_by_cached_credit(quote_request.user_id)
+    hold = await reserve_user_credit(quote_request.user_id)
+    committed = False
     
     start_time = datetime.now()
     
     try:
-        # AI 모델 설정
-        model = quote_request.ai_model or os.getenv('OPENAI_MODEL', 'gpt-5-mini-2025-08-07')
-        reasoning_effort = quote_request.reasoning_effort or "low"
+        gen_options = build_quote_options(model, quote_request.reasoning_effort or "low")
         
-        # 모델에 따른 옵션 설정
-        if model.startswith('gpt-5'):
-            # GPT-5 계열: Responses API
-            gen_options = GenOptions(
-                model=model,
-                reasoning_effort=reasoning_effort,
-                max_output_tokens=1024
-            )
-        else:
-            # GPT-4o 계열: Chat Completions API
-            gen_options = GenOptions(
-                model=model,
-                temperature=0.8,
-                max_tokens=1000
-            )
-        
-        # QuoteGenerator를 사용하여 글귀 생성 (원시 텍스트 반환)
-        raw_result = await asyncio.to_thread(
-            quote_generator.generate_quotes,
-            style=quote_request.style,
-            author_style=quote_request.author_style,
-            keywords=quote_request.keywords,
-            length=quote_request.length,
-            opt=gen_options
-        )
-        
-        # 응답 파싱하여 구조화된 결과 생성
-        parsed_result = quote_generator.parse_response(
-            raw_result,
+        # 같은 조건의 결과가 캐시에 충분히 쌓여 있으면 LLM 호출 없이 그중 하나를 사용
+        cache_key = GenerationKey.normalize(
+            "quote",
             quote_request.style,
             quote_request.author_style,
             quote_request.keywords,
-            quote_request.length
+            quote_request.length,
+            model,
+            gen_options.reasoning_effort
         )
+        cached_quotes = result_cache.get(cache_key)
+        if cached_quotes is not None:
+            parsed_result = {
+                "success": True,
+                "request": {
+                    "style": quote_request.style,
+                    "author_style": quote_request.author_style,
+                    "keywords": quote_request.keywords,
+                    "length": quote_request.length
+                },
+                "quotes": cached_quotes,
+                "ai_model_used": model
+            }
+        else:
+            # 같은 조건의 생성이 진행 중이면 합류 (크레딧은 요청마다 따로 예약/확정)
+            parsed_result, shared = await generate_coalesced(
+                cache_key,
+                {
+                    "style": quote_request.style,
+                    "author_style": quote_request.author_style,
+                    "keywords": quote_request.keywords,
+                    "length": quote_request.length
+                },
+                lambda: generate_quote_result(quote_request, gen_options)
+            )
+            # 캐시에는 요청 모델이 직접 생성한 결과만 보관 (대체 모델 결과는 이번 응답에만 사용)
+            if parsed_result.get("success", False) and not shared and parsed_result.get("ai_model_used") == model:
+                result_cache.put(cache_key, parsed_result["quotes"])
         
-        # 파싱 결과 확인 - 실패한 경우 크레딧 차감하지 않고 에러 응답
+        # 파싱 결과 확인 - 실패한 경우 예약을 해제하고 에러 응답
         if not parsed_result.get("success", False):
             end_time = datetime.now()
             generation_time = (end_time - start_time).total_seconds()
@@ -598,23 +954,236 @@ async def generate_quotes(quote_request: QuoteRequest):
                 }
             )
         
-        # 글귀 생성 성공 후 크레딧 차감
-        remaining_credits = deduct_user_credit(quote_request.user_id)
+        # 글귀 생성 성공 후 예약 확정 (DB에 확정 기록, 잔액 정산은 묶음 처리)
+        remaining_credits = await commit_credit_hold(quote_request.user_id, hold)
+        committed = True
         
         end_time = datetime.now()
         generation_time = (end_time - start_time).total_seconds()
         
-        # 생성 시간과 남은 크레딧, AI 모델 정보 추가
+        # 생성 시간과 남은 크레딧, AI 모델 정보 추가 (대체 모델로 생성됐으면 그 모델)
         parsed_result["generation_time"] = generation_time
         parsed_result["remaining_credits"] = remaining_credits
-        parsed_result["ai_model_used"] = model
+        parsed_result["ai_model_used"] = parsed_result.get("ai_model_used") or model
         
         return QuoteResponse(**parsed_result)
         
     except HTTPException:
         raise
+    except LLMOverloadedError as e:
+        # 동시 호출 상한과 대기열이 가득 찬 상태 → 잠시 후 재시도하도록 503 + Retry-After
+        raise HTTPException(
+            status_code=503,
+            detail={
+                "message": f"{e} 잠시 후 다시 시도해주세요.",
+                "error_code": "LLM_OVERLOADED",
+                "retry_recommended": True
+            },
+            headers={"Retry-After": str(max(1, round(e.retry_after)))}
+        )
     except Exception as e:
         raise HTTPException(
             status_code=500,
             detail=f"글귀 생성 중 오류가 발생했습니다: {str(e)}"
         )
+    finally:
+        # 확정되지 못한 예약(422, 500 등)은 즉시 해제
+        if not committed:
+            await release_credit_hold(hold["hold_id"])
+
+
+# 8. 스트리밍 생성 (SSE)
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "Connection": "keep-alive",
+    "X-Accel-Buffering": "no",  # 프록시가 이벤트를 모아서 보내지 않도록 함
+}
+
+def _sse(payload: dict) -> str:
+    """dict를 Server-Sent Event 프레임으로 변환"""
+    return f"data: {json.dumps(payload, ensure_ascii=False)}\n\n"
+
+async def stream_generation_events(
+    user_id: str,
+    hold: dict,
+    item_type: str,
+    deltas: ModelStream,
+    parser: IncrementalItemParser,
+    request_info: dict,
+    record_parse: Callable[[Optional[str]], None],
+) -> AsyncIterator[str]:
+    """모델 응답을 스트리밍하면서 각 항목이 완성·검증되는 즉시 SSE 이벤트로 전송
+
+    이벤트 순서: start → {item_type} (index 1~4, 완성되는 대로) → done | error
+    예약된 크레딧은 4개 항목이 모두 전송된 뒤에만 확정되며,
+    검증 실패·오류·클라이언트 연결 종료 시에는 해제됩니다.
+    record_parse에는 끝까지 받은 응답의 파싱 결과(출력 모드별 집계)를 전달합니다.
+    done 이벤트를 보낸 뒤에는 남은 응답(닫는 괄호와 최종 사용량 이벤트)까지 읽어
+    deltas의 on_completion이 토큰 예산에 사용량을 반영할 수 있게 합니다.
+    동시 호출 자리·차단기·429 반영과 첫 조각 전 대체 모델 전환은 deltas(레지스트리 스트림)가 맡습니다.
+    """
+    start_time = datetime.now()
+    committed = False
+
+    def error_event(message: str, error_code: str) -> str:
+        return _sse({
+            "type": "error",
+            "message": message,
+            "error_code": error_code,
+            "generation_time": (datetime.now() - start_time).total_seconds(),
+            "retry_recommended": True
+        })
+
+    try:
+        yield _sse({"type": "start", "request": request_info})
+
+        # 스트리밍도 동시 호출 한 자리를 차지 (대기열이 차 있으면 LLM_OVERLOADED 오류 이벤트)
+        async with aclosing(deltas) as stream:
+            async for delta in stream:
+                # 증분 파서가 이번 조각으로 닫힌 항목만 (검증 결과와 함께) 돌려줌
+                for item in parser.feed(delta):
+                    # 첫 항목부터 사과문 등이 나오면 나머지를 기다리지 않고 바로 중단
+                    if not item.valid:
+                        print(f"⚠️ {item.key}에서 부적절한 내용 감지: {item.text[:100]}...")
+                        record_parse("INAPPROPRIATE_RESPONSE")
+                        yield error_event("AI가 부적절한 응답을 생성했습니다. 다시 시도해주세요.", "INAPPROPRIATE_RESPONSE")
+                        return
+                    yield _sse({"type": item_type, "index": item.index, "text": item.text})
+                # 마지막 항목까지 받았으면 닫는 괄호 등 나머지는 done 이벤트 뒤에 읽음
+                if parser.done:
+                    break
+
+            if not parser.done:
+                record_parse("PARSING_FAILED")
+                yield error_event("AI 응답 파싱에 실패했습니다. 다시 시도해주세요.", "PARSING_FAILED")
+                return
+            record_parse(None)
+
+            # 모든 항목 전송 후 예약 확정 (DB에 확정 기록, 잔액 정산은 묶음 처리)
+            remaining_credits = await commit_credit_hold(user_id, hold)
+            committed = True
+
+            yield _sse({
+                "type": "done",
+                "success": True,
+                "request": request_info,
+                f"{item_type}s": parser.values(),
+                "generation_time": (datetime.now() - start_time).total_seconds(),
+                "remaining_credits": remaining_credits,
+                "ai_model_used": deltas.model
+            })
+
+            # 응답은 이미 끝났으므로 남은 조각의 오류는 무시 (출력 상한 잘림은 on_completion에 이미 기록됨)
+            try:
+                async for _ in stream:
+                    pass
+            except Exception as e:
+                print(f"⚠️ 스트림 나머지 읽기 실패 (응답은 완료됨): {e}")
+
+    except HTTPException as e:
+        yield error_event(str(e.detail), "GENERATION_FAILED")
+    except LLMOverloadedError as e:
+        yield error_event(f"{e} 잠시 후 다시 시도해주세요.", "LLM_OVERLOADED")
+    except IncompleteResponseError as e:
+        # 4개 항목을 다 받기 전에 응답이 끊김 (출력 토큰 상한 등) → 받은 항목만으로는 확정하지 않음
+        print(f"⚠️ 스트림 응답 미완료 ({e.model}, reason={e.reason}, 출력 토큰: {e.output_tokens})")
+        if e.truncated:
+            yield error_event("AI 응답이 출력 길이 상한에서 잘렸습니다. 다시 시도해주세요.", "RESPONSE_TRUNCATED")
+        else:
+            yield error_event("AI 응답이 완료되지 않았습니다. 다시 시도해주세요.", "RESPONSE_INCOMPLETE")
+    except Exception as e:
+        yield error_event(f"생성 중 오류가 발생했습니다: {str(e)}", "GENERATION_FAILED")
+    finally:
+        # 확정되지 못한 예약(검증 실패, 오류, 연결 종료)은 즉시 해제
+        if not committed:
+            await release_credit_hold(hold["hold_id"])
+
+@app.post("/poems/generate/stream")
+async def generate_poems_stream(poem_request: PoemRequest):
+    """4편의 시를 생성하면서 한 편이 완성될 때마다 SSE 이벤트로 전송합니다 (스트림이 정상 종료될 때만 크레딧 차감)"""
+    if not poem_generator:
+        raise HTTPException(
+            status_code=500,
+            detail="시 생성기가 초기화되지 않았습니다. OpenAI API 키를 확인해주세요."
+        )
+
+    # 모델 확인과 크레딧 검증/예약은 스트림 시작 전에 처리해 실패 시 일반 HTTP 오류로 응답 (예약 RPC 한 번으로 검증 + 예약)
+    requested_model = resolve_model(None)
+    request_info = {
+        "style": poem_request.style,
+        "author_style": poem_request.author_style,
+        "keywords": poem_request.keywords,
+        "length": poem_request.length
+    }
+    # 모델/어댑터는 예약 전에 준비 (실제 호출은 스트림을 읽기 시작할 때, 첫 조각 전 실패면 대체 모델로 전환)
+    poem_options = with_token_budget("poem", poem_request.length, build_poem_options(requested_model))
+    deltas = poem_generator.astream_poems(
+        **request_info,
+        opt=poem_options,
+        on_completion=lambda completion: record_token_usage("poem", poem_request.length, poem_options, completion)
+    )
+    reject_by_cached_credit(poem_request.user_id)
+    hold = await reserve_user_credit(poem_request.user_id)
+
+    # 예약 이후 응답을 만들기 전에 실패하면 예약을 바로 해제 (스트림이 시작된 뒤에는 stream_generation_events가 해제)
+    try:
+        events = stream_generation_events(
+            user_id=poem_request.user_id,
+            hold=hold,
+            item_type="poem",
+            deltas=deltas,
+            parser=poem_generator.create_stream_parser(),
+            request_info=request_info,
+            record_parse=poem_generator.record_parse,
+        )
+        return StreamingResponse(events, headers=SSE_HEADERS, media_type="text/event-stream; charset=utf-8")
+    except BaseException:
+        await release_credit_hold(hold["hold_id"])
+        raise
+
+@app.post("/quotes/generate/stream")
+async def generate_quotes_stream(quote_request: QuoteRequest):
+    """4개의 글귀를 생성하면서 하나가 완성될 때마다 SSE 이벤트로 전송합니다 (스트림이 정상 종료될 때만 크레딧 차감)"""
+    if not quote_generator:
+        raise HTTPException(
+            status_code=500,
+            detail="글귀 생성기가 초기화되지 않았습니다. OpenAI API 키를 확인해주세요."
+        )
+
+    # 모델 확인과 크레딧 검증/예약은 스트림 시작 전에 처리해 실패 시 일반 HTTP 오류로 응답 (예약 RPC 한 번으로 검증 + 예약)
+    requested_model = resolve_model(quote_request.ai_model)
+    request_info = {
+        "style": quote_request.style,
+        "author_style": quote_request.author_style,
+        "keywords": quote_request.keywords,
+        "length": quote_request.length
+    }
+    # 모델/어댑터는 예약 전에 준비 (실제 호출은 스트림을 읽기 시작할 때, 첫 조각 전 실패면 대체 모델로 전환)
+    quote_options = with_token_budget(
+        "quote",
+        quote_request.length,
+        build_quote_options(requested_model, quote_request.reasoning_effort or "low")
+    )
+    deltas = quote_generator.astream_quotes(
+        **request_info,
+        opt=quote_options,
+        on_completion=lambda completion: record_token_usage("quote", quote_request.length, quote_options, completion)
+    )
+    reject_by_cached_credit(quote_request.user_id)
+    hold = await reserve_user_credit(quote_request.user_id)
+
+    # 예약 이후 응답을 만들기 전에 실패하면 예약을 바로 해제 (스트림이 시작된 뒤에는 stream_generation_events가 해제)
+    try:
+        events = stream_generation_events(
+            user_id=quote_request.user_id,
+            hold=hold,
+            item_type="quote",
+            deltas=deltas,
+            parser=quote_generator.create_stream_parser(),
+            request_info=request_info,
+            record_parse=quote_generator.record_parse,
+        )
+        return StreamingResponse(events, headers=SSE_HEADERS, media_type="text/event-stream; charset=utf-8")
+    except BaseException:
+        await release_credit_hold(hold["hold_id"])
+        raise
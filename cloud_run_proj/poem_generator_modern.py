@@ -1,37 +1,19 @@
 # poem_generator_modern.py
 from __future__ import annotations
 from dataclasses import dataclass
-from abc import ABC, abstractmethod
-from typing import Optional, Dict, Any, Iterable, List
-from openai import OpenAI
+from typing import Optional, Dict, Any, Iterable, List, Sequence, Tuple, Callable
+from openai import OpenAI, AsyncOpenAI
 import os
 import re
+import asyncio
 import json
 import sys
 from dotenv import load_dotenv
 
-# ======================
-# 공통 DTO
-# ======================
-@dataclass(frozen=True)
-class Prompt:
-   system_prompt: str
-   user_prompt: str
-
-
-@dataclass(frozen=True)
-class GenOptions:
-   # 공통
-   model: str
-
-   # GPT-4o 전용
-   temperature: Optional[float] = None
-   max_tokens: Optional[int] = None
-
-   # GPT-5 전용
-   reasoning_effort: Optional[str] = None  # "low" | "medium" | "high"
-   max_output_tokens: Optional[int] = None  # Responses API 상한
-
+from llm_client_registry import LLMClientRegistry, ModelStream
+from llm_adapters import Prompt, GenOptions, Completion, ModelAdapterFactory
+from llm_admission import LLMOverloadedError, is_transient_error
+from incremental_json import IncrementalItemParser, ParseStats, items_json_schema
 
 # ======================
 # 프롬프트 빌더 (단일 책임)
@@ -41,6 +23,7 @@ class KoreanPoemPromptBuilder:
    simple_poem_generator.py의 의도를 보존:
    - system_prompt: 한국 문학에 정통한 시인 / 4편 작성 / 서로 다른 관점
    - user_prompt: style, author_style, keywords, length를 받아 본질 지침 생성
+     (고정 지침을 앞에, 조건을 뒤에 두어 프롬프트 캐시가 적용되는 앞부분을 길게 유지)
    """
 
    SYSTEM_PROMPT: str = (
@@ -51,124 +34,180 @@ class KoreanPoemPromptBuilder:
        "오직 시 작품만을 창작하세요."
    )
 
+   # 프롬프트 배치
+   # - static_first: 요청마다 같은 지침/출력 형식을 앞에, 조건(성향·작가·단어·길이)을 맨 끝에 둠
+   #   → system prompt와 user prompt 앞부분이 바이트 단위로 같아 OpenAI 프롬프트 캐시가 적용되는 구간이 길어짐
+   # - variable_first: 조건을 먼저 두는 이전 배치 (bench_prompt_cache.py 비교용)
+   LAYOUTS = ("static_first", "variable_first")
+
+   GUIDELINES: str = """창작 지침:
+• 각 시는 반드시 제목으로 시작하세요
+• 지정된 단어들을 자연스럽게 녹여내세요
+• 조건의 작가 스타일에 맞는 문체와 정서를 반영하세요
+• 은유와 상징을 적절히 활용하세요
+• 감정과 정서가 잘 전달되도록 작성하세요
+• 리듬감과 운율을 고려하세요
+• 4편의 시는 서로 다른 관점과 표현을 사용하세요
+
+중요한 제약사항:
+• 절대로 "죄송합니다", "~할 수는 없지만", "~해드립니다" 같은 사과나 설명으로 시작하지 마세요
+• 직접적으로 시 작품만 창작하세요
+• 메타 언급이나 부가 설명은 금지합니다"""
+
+   @staticmethod
+   def create_conditions(
+       style: str,
+       author_style: str,
+       keywords: Iterable[str],
+       length: str,
+   ) -> str:
+       """요청마다 달라지는 조건 블록"""
+       keywords_str: List[str] = [k.strip() for k in keywords if str(k).strip()]
+       kw_str = ", ".join(keywords_str) if keywords_str else "제한 없음"
+
+       return f"""조건:
+• 성향: {style}
+• 작가 스타일: {author_style}
+• 포함 단어: '{kw_str}'
+• 길이: {length}"""
+
    @staticmethod
    def create_user_prompt(
        style: str,
        author_style: str,
        keywords: Iterable[str],
        length: str,
+       structured: bool = False,
+       layout: str = "static_first",
    ) -> str:
        """
        - style: 전체적인 분위기/톤(예: 서정적, 미니멀, 초현실 등)
        - author_style: 참고 작가/문체(예: 김소월 풍, 이육사의 결 등)
        - keywords: 반드시 자연스럽게 녹일 핵심 단어 목록
        - length: 길이 지침(예: '각 시 6~10행', '짧게 4~6행', '중간 길이' 등)
+       - structured: 구조화 출력(JSON schema)으로 형식을 강제할 때는 JSON 예시 대신 짧은 안내만 넣음
+       - layout: static_first(고정 지침 → 조건) / variable_first(조건 → 고정 지침)
        """
-       keywords_str: List[str] = [k.strip() for k in keywords if str(k).strip()]
-       kw_str = ", ".join(keywords_str) if keywords_str else "제한 없음"
+       conditions = KoreanPoemPromptBuilder.create_conditions(style, author_style, keywords, length)
+       output_format = (
+           KoreanPoemPromptBuilder.SCHEMA_INSTRUCTION if structured else KoreanPoemPromptBuilder.JSON_EXAMPLE
+       )
 
-       prompt = f"""다음 조건에 맞춰 정확히 4편의 시를 창작하세요.
+       if layout == "variable_first":
+           return f"""다음 조건에 맞춰 정확히 4편의 시를 창작하세요.
 
-조건:
-• 성향: {style}
-• 작가 스타일: {author_style}  
-• 포함 단어: '{kw_str}'
-• 길이: {length}
+{conditions}
 
-창작 지침:
-• 각 시는 반드시 제목으로 시작하세요
-• 지정된 단어들을 자연스럽게 녹여내세요
-• {author_style} 작가의 문체와 정서를 반영하세요
-• 은유와 상징을 적절히 활용하세요
-• 감정과 정서가 잘 전달되도록 작성하세요
-• 리듬감과 운율을 고려하세요
-• 4편의 시는 서로 다른 관점과 표현을 사용하세요
+{KoreanPoemPromptBuilder.GUIDELINES}
 
-중요한 제약사항:
-• 절대로 "죄송합니다", "~할 수는 없지만", "~해드립니다" 같은 사과나 설명으로 시작하지 마세요
-• 직접적으로 시 작품만 창작하세요
-• 메타 언급이나 부가 설명은 금지합니다
+{output_format}"""
 
-최종 출력은 반드시 아래 JSON 형식만 사용하세요:
+       return f"""아래 지침과 맨 끝의 조건에 맞춰 정확히 4편의 시를 창작하세요.
 
-{{
+{KoreanPoemPromptBuilder.GUIDELINES}
+
+{output_format}
+
+{conditions}"""
+
+   # ---------- 출력 형식 ----------
+   # 프롬프트로 형식을 요청하는 모드의 JSON 예시
+   JSON_EXAMPLE: str = """최종 출력은 반드시 아래 JSON 형식만 사용하세요:
+
+{
   "poem1": "첫 번째 시 제목\n\n첫 번째 시 본문...",
   "poem2": "두 번째 시 제목\n\n두 번째 시 본문...",
   "poem3": "세 번째 시 제목\n\n세 번째 시 본문...",
   "poem4": "네 번째 시 제목\n\n네 번째 시 본문..."
-}}"""
+}"""
 
-       return prompt
+   # 구조화 출력 모드: 키와 형식은 스키마가 강제하므로 시 한 편의 모양만 안내
+   SCHEMA_INSTRUCTION: str = "poem1~poem4에 시를 한 편씩, 제목과 본문 사이에 빈 줄을 두어 작성하세요."
+   SINGLE_SCHEMA_INSTRUCTION: str = "poem에 제목과 본문 사이에 빈 줄을 두어 작성하세요."
 
+   POEM_FORMAT: str = "시 제목, 빈 줄, 시 본문 순서로 쓴 시 한 편"
 
-# ======================
-# 어댑터 인터페이스
-# ======================
-class BaseModelAdapter(ABC):
-   def __init__(self, client: OpenAI, model: str):
-       self.client = client
-       self.model = model
+   @staticmethod
+   def output_schema(keys: Sequence[str]) -> Dict[str, Any]:
+       """keys(poem1~poem4 또는 poem)의 시 본문만 갖는 응답 스키마"""
+       return items_json_schema("poems", keys, KoreanPoemPromptBuilder.POEM_FORMAT)
 
-   @abstractmethod
-   def generate(self, prompt: Prompt, opt: GenOptions) -> str: ...
+   # ---------- 한 편씩 나눠 요청하는 모드 (fan-out) ----------
+   SINGLE_SYSTEM_PROMPT: str = (
+       "당신은 한국 문학에 정통한 전문 시인입니다. "
+       "주어진 조건에 맞춰 감동적이고 아름다운 한국어 시를 정확히 1편 작성합니다. "
+       "절대로 사과문이나 설명문으로 시작하지 마세요. "
+       "오직 시 작품만을 창작하세요."
+   )
 
+   SINGLE_JSON_EXAMPLE: str = """최종 출력은 반드시 아래 JSON 형식만 사용하세요:
 
-# ======================
-# GPT-4o 어댑터 (Chat Completions)
-# ======================
-class GPT4oAdapter(BaseModelAdapter):
-   def generate(self, prompt: Prompt, opt: GenOptions) -> str:
-       kwargs: Dict[str, Any] = {
-           "model": self.model,
-           "messages": [
-               {"role": "system", "content": prompt.system_prompt},
-               {"role": "user", "content": prompt.user_prompt},
-           ],
-       }
-       if opt.temperature is not None:
-           kwargs["temperature"] = opt.temperature
-       if opt.max_tokens is not None:
-           kwargs["max_tokens"] = opt.max_tokens
+{
+  "poem": "시 제목\n\n시 본문..."
+}"""
 
-       resp = self.client.chat.completions.create(**kwargs)
-       return resp.choices[0].message.content or ""
+   # 동시에 보내는 4개 요청이 서로 다른 시가 되도록 요청마다 하나씩 배정하는 관점
+   FANOUT_ANGLES = (
+       "화자의 내면을 고백하듯 감정을 직접 드러내는 관점",
+       "풍경과 사물의 묘사를 통해 감정을 간접적으로 드러내는 관점",
+       "하나의 장면이나 순간을 이야기처럼 따라가는 관점",
+       "누군가에게 말을 건네는 편지나 대화 형식의 관점",
+   )
 
+   SINGLE_GUIDELINES: str = """창작 지침:
+• 시는 반드시 제목으로 시작하세요
+• 지정된 단어들을 자연스럽게 녹여내세요
+• 조건의 작가 스타일에 맞는 문체와 정서를 반영하세요
+• 은유와 상징을 적절히 활용하세요
+• 감정과 정서가 잘 전달되도록 작성하세요
+• 리듬감과 운율을 고려하세요
 
-# ======================
-# GPT-5 어댑터 (Responses API)
-# ======================
-class GPT5Adapter(BaseModelAdapter):
-   def generate(self, prompt: Prompt, opt: GenOptions) -> str:
-       kwargs: Dict[str, Any] = {
-           "model": self.model,
-           # Responses API 권장 필드 매핑:
-           # - system 성격 → instructions
-           # - user 성격  → input
-           "instructions": prompt.system_prompt,
-           "input": prompt.user_prompt,
-       }
-       if opt.reasoning_effort:
-           kwargs["reasoning"] = {"effort": opt.reasoning_effort}
-       if opt.max_output_tokens is not None:
-           kwargs["max_output_tokens"] = opt.max_output_tokens
+중요한 제약사항:
+• 절대로 "죄송합니다", "~할 수는 없지만", "~해드립니다" 같은 사과나 설명으로 시작하지 마세요
+• 직접적으로 시 작품만 창작하세요
+• 메타 언급이나 부가 설명은 금지합니다"""
+
+   @staticmethod
+   def create_single_user_prompt(
+       style: str,
+       author_style: str,
+       keywords: Iterable[str],
+       length: str,
+       angle: str,
+       structured: bool = False,
+       layout: str = "static_first",
+   ) -> str:
+       """
+       fan-out 모드에서 요청마다 1편씩 생성하는 프롬프트
+       - 요청마다 달라지는 관점(angle)은 맨 끝에 둠 → 4개 요청의 앞부분이 바이트 단위로 같아 OpenAI 프롬프트 캐시가 그대로 적용됨
+       - static_first면 조건도 지침 뒤에 두어, 조건이 다른 요청끼리도 지침 구간을 캐시에서 읽음
+       """
+       conditions = KoreanPoemPromptBuilder.create_conditions(style, author_style, keywords, length)
+       output_format = (
+           KoreanPoemPromptBuilder.SINGLE_SCHEMA_INSTRUCTION if structured
+           else KoreanPoemPromptBuilder.SINGLE_JSON_EXAMPLE
+       )
 
-       resp = self.client.responses.create(**kwargs)
-       # Python SDK: output_text가 있으면 가장 깔끔
-       return getattr(resp, "output_text", None) or ""
+       if layout == "variable_first":
+           return f"""다음 조건에 맞춰 시 1편을 창작하세요.
 
+{conditions}
 
-# ======================
-# 어댑터 팩토리 (OCP)
-# ======================
-class ModelAdapterFactory:
-   @staticmethod
-   def create(client: OpenAI, model: str) -> BaseModelAdapter:
-       name = model.lower()
-       if name.startswith("gpt-5"):
-           return GPT5Adapter(client, model)
-       if name.startswith("gpt-4o"):
-           return GPT4oAdapter(client, model)
-       raise ValueError(f"Unsupported model family: {model}")
+{KoreanPoemPromptBuilder.SINGLE_GUIDELINES}
+
+{output_format}
+
+이번 시의 관점: {angle}"""
+
+       return f"""아래 지침과 맨 끝의 조건에 맞춰 시 1편을 창작하세요.
+
+{KoreanPoemPromptBuilder.SINGLE_GUIDELINES}
+
+{output_format}
+
+{conditions}
+
+이번 시의 관점: {angle}"""
 
 
 # ======================
@@ -211,25 +250,49 @@ class ParseResult:
 # 퍼사드: 시 생성 유스케이스 (SRP)
 # ======================
 class PoemGenerator:
-   def __init__(self, client: Optional[OpenAI] = None, api_key: str = None):
+   POEM_KEYS = ("poem1", "poem2", "poem3", "poem4")
+
+   def __init__(
+       self,
+       client: Optional[OpenAI] = None,
+       api_key: str = None,
+       async_client: Optional[AsyncOpenAI] = None,
+       registry: Optional[LLMClientRegistry] = None,
+       structured_output: Optional[bool] = None,
+       prompt_layout: Optional[str] = None,
+   ):
        # 환경변수 로드
        load_dotenv()
-       
+
        # OpenAI 클라이언트 설정
-       if client:
-           self.client = client
-       else:
-           # API 키 설정
-           if api_key is None:
-               api_key = os.getenv('OPENAI_API_KEY')
-           
-           if not api_key:
-               raise ValueError("OPENAI_API_KEY가 설정되지 않았습니다.")
-           
-           self.client = OpenAI(api_key=api_key)
-       
+       # - registry를 넘기면 다른 생성기와 커넥션 풀/어댑터를 공유
+       # - 없으면 주어진 클라이언트(또는 API 키)로 전용 레지스트리를 만듦
+       if registry is None:
+           registry = LLMClientRegistry(api_key=api_key, client=client, async_client=async_client)
+       self.registry = registry
+
        self.system_prompt = KoreanPoemPromptBuilder.SYSTEM_PROMPT
 
+       # 구조화 출력(JSON schema) 사용 여부: 켜면 프롬프트의 JSON 예시를 빼고 스키마로 형식을 강제 (기본은 꺼짐: 프롬프트의 JSON 예시)
+       if structured_output is None:
+           structured_output = os.getenv("STRUCTURED_OUTPUT", "false").lower() == "true"
+       self.structured_output = structured_output
+       self.output_mode = "json_schema" if structured_output else "json_example"
+       self.parse_stats = ParseStats()
+
+       # 프롬프트 배치 (static_first: 고정 지침을 앞에 두어 프롬프트 캐시 적용 구간을 늘림)
+       self.prompt_layout = prompt_layout or os.getenv("PROMPT_LAYOUT", "static_first")
+       if self.prompt_layout not in KoreanPoemPromptBuilder.LAYOUTS:
+           raise ValueError(f"Unsupported prompt layout: {self.prompt_layout}")
+
+   @property
+   def client(self) -> OpenAI:
+       return self.registry.client
+
+   @property
+   def async_client(self) -> AsyncOpenAI:
+       return self.registry.async_client
+
    def _build_prompt(
        self,
        style: str,
@@ -242,8 +305,11 @@ class PoemGenerator:
            author_style=author_style,
            keywords=keywords,
            length=length,
+           structured=self.structured_output,
+           layout=self.prompt_layout,
        )
-       return Prompt(system_prompt=self.system_prompt, user_prompt=user_prompt)
+       schema = KoreanPoemPromptBuilder.output_schema(self.POEM_KEYS) if self.structured_output else None
+       return Prompt(system_prompt=self.system_prompt, user_prompt=user_prompt, schema=schema, cache_key="poem")
 
    def generate_poems(
        self,
@@ -253,10 +319,245 @@ class PoemGenerator:
        length: str,
        opt: GenOptions,
    ) -> str:
-       adapter = ModelAdapterFactory.create(self.client, opt.model)
+       adapter = self.registry.adapter(opt.model, ModelAdapterFactory.create)
        prompt = self._build_prompt(style, author_style, keywords, length)
        return adapter.generate(prompt, opt)
 
+   async def acomplete_poems(
+       self,
+       style: str,
+       author_style: str,
+       keywords: Iterable[str],
+       length: str,
+       opt: GenOptions,
+   ) -> Completion:
+       """원시 응답 텍스트와 토큰 사용량/잘림 여부 (요청 모델이 차단·실패하면 대체 모델로 생성)"""
+       prompt = self._build_prompt(style, author_style, keywords, length)
+       return await self.registry.acomplete(
+           opt, ModelAdapterFactory.create, lambda adapter, model_opt: adapter.acomplete(prompt, model_opt)
+       )
+
+   def astream_poems(
+       self,
+       style: str,
+       author_style: str,
+       keywords: Iterable[str],
+       length: str,
+       opt: GenOptions,
+       on_completion: Optional[Callable[[Completion], None]] = None,
+   ) -> ModelStream:
+       """원시 응답 텍스트를 조각(delta) 단위로 스트리밍 (첫 조각 전에 요청 모델이 차단·실패하면 대체 모델로 생성, .model이 실제 응답 모델)
+       on_completion에는 끝까지 받았거나 출력 상한에서 잘린 응답의 토큰 사용량을 전달
+       """
+       prompt = self._build_prompt(style, author_style, keywords, length)
+       return self.registry.astream(
+           opt, ModelAdapterFactory.create, lambda adapter, model_opt: adapter.astream_recorded(prompt, model_opt, on_completion)
+       )
+
+   async def acomplete_poem_slot(
+       self,
+       style: str,
+       author_style: str,
+       keywords: Iterable[str],
+       length: str,
+       opt: GenOptions,
+       slot: int,
+   ) -> Completion:
+       """fan-out 모드의 한 슬롯(0~3): slot번째 관점으로 시 1편을 생성해 원시 텍스트와 토큰 사용량 반환"""
+       user_prompt = KoreanPoemPromptBuilder.create_single_user_prompt(
+           style=style,
+           author_style=author_style,
+           keywords=keywords,
+           length=length,
+           angle=KoreanPoemPromptBuilder.FANOUT_ANGLES[slot],
+           structured=self.structured_output,
+           layout=self.prompt_layout,
+       )
+       prompt = Prompt(
+           system_prompt=KoreanPoemPromptBuilder.SINGLE_SYSTEM_PROMPT,
+           user_prompt=user_prompt,
+           schema=KoreanPoemPromptBuilder.output_schema(("poem",)) if self.structured_output else None,
+           cache_key="poem-slot",
+       )
+       return await self.registry.acomplete(
+           opt, ModelAdapterFactory.create, lambda adapter, model_opt: adapter.acomplete(prompt, model_opt)
+       )
+
+   async def _agenerate_slot(
+       self,
+       style: str,
+       author_style: str,
+       keywords: Iterable[str],
+       length: str,
+       opt: GenOptions,
+       slot: int,
+       max_retries: int,
+       on_completion: Optional[Callable[[Completion], None]] = None,
+   ) -> Tuple[Optional[str], Optional[str], Optional[Exception], Optional[str]]:
+       """한 슬롯을 최대 max_retries번 다시 시도하며 생성 → (시, 실패 코드, 호출 예외, 사용 모델)
+
+       과부하·요청 마감(LLMOverloadedError)은 다시 시도하지 않고 그대로 올려 부하를 줄이고,
+       그 밖의 호출 예외는 일시적 오류(is_transient_error)일 때만 다시 시도합니다.
+       """
+       error_code, last_error = "GENERATION_FAILED", None
+       for attempt in range(max_retries + 1):
+           try:
+               completion = await self.acomplete_poem_slot(style, author_style, keywords, length, opt, slot)
+           except LLMOverloadedError:
+               raise
+           except Exception as e:
+               print(f"⚠️ 시 {slot + 1}번 생성 실패 (시도 {attempt + 1}): {e}")
+               error_code, last_error = "GENERATION_FAILED", e
+               if not is_transient_error(e):
+                   break
+               continue
+           if on_completion:
+               on_completion(completion)
+           raw = completion.text
+
+           parser = IncrementalItemParser(("poem",), self._validate_poem_content)
+           parser.feed(raw)
+           if parser.rejected:
+               print(f"⚠️ 시 {slot + 1}번에서 부적절한 내용 감지 (시도 {attempt + 1}): {raw[:100]}...")
+               error_code, last_error = "INAPPROPRIATE_RESPONSE", None
+               self.record_parse(error_code, kind="slot")
+               continue
+           if not parser.done:
+               print(f"⚠️ 시 {slot + 1}번 파싱 실패 (시도 {attempt + 1}): {raw[:100]}...")
+               error_code, last_error = "PARSING_FAILED", None
+               self.record_parse(error_code, kind="slot")
+               continue
+           self.record_parse(None, kind="slot")
+           return parser.items["poem"], None, None, completion.model
+       return None, error_code, last_error, None
+
+   async def agenerate_poems_fanout(
+       self,
+       style: str,
+       author_style: str,
+       keywords: List[str],
+       length: str,
+       opt: GenOptions,
+       max_retries: int = 1,
+       on_completion: Optional[Callable[[Completion], None]] = None,
+   ) -> Dict:
+       """
+       4편을 한 편씩 4개 요청으로 동시에 생성해 parse_response와 같은 형태로 조립
+       - 전체 지연은 가장 느린 한 편의 생성 시간 수준
+       - 일시적 호출 실패/파싱 실패/부적절한 내용은 해당 슬롯만 최대 max_retries번 다시 요청
+       - 슬롯 호출마다 입장 제어(AdaptiveLimiter)의 동시 호출 한 자리씩 점유, 과부하·요청 마감이면 LLMOverloadedError
+       - 재시도 후에도 호출 예외로 실패한 슬롯이 있으면 그 예외를 다시 던짐
+       - on_completion이 주어지면 슬롯 호출이 끝날 때마다 토큰 사용량을 전달
+       - 성공 결과의 ai_model_used에는 슬롯들이 실제로 사용한 모델을 표기
+       """
+       results = await asyncio.gather(*(
+           self._agenerate_slot(style, author_style, keywords, length, opt, slot, max_retries, on_completion)
+           for slot in range(len(self.POEM_KEYS))
+       ))
+
+       for poem, error_code, error, _ in results:
+           if error is not None:
+               raise error
+       failed = [error_code for poem, error_code, _, _ in results if poem is None]
+       if failed:
+           return self._failure_result(failed[0], style, author_style, keywords, length)
+
+       return {
+           "success": True,
+           "request": {
+               "style": style,
+               "author_style": author_style,
+               "keywords": keywords,
+               "length": length
+           },
+           "poems": [poem for poem, _, _, _ in results],
+           # 슬롯마다 대체 모델로 전환됐을 수 있으므로 실제 사용된 모델을 모두 표기
+           "ai_model_used": ", ".join(dict.fromkeys(model for _, _, _, model in results if model))
+       }
+
+   async def arepair_poems(
+       self,
+       content: str,
+       style: str,
+       author_style: str,
+       keywords: List[str],
+       length: str,
+       opt: GenOptions,
+       model_used: Optional[str] = None,
+       max_retries: int = 1,
+       max_slots: int = 3,
+       on_completion: Optional[Callable[[Completion], None]] = None,
+   ) -> Dict:
+       """
+       한 번에 4편을 생성한 응답(content)을 parse_response처럼 해석하되, 실패해도 버리지 않고 부분 복구
+       - 검증을 통과한 시는 그대로 두고, 빠졌거나(응답 잘림) 거절된 슬롯만 fan-out 슬롯 호출(시 1편)로 다시 생성
+       - 슬롯마다 최대 max_retries번 재시도, 다시 생성할 슬롯이 max_slots개를 넘으면 복구하지 않음
+       - 복구하지 못하면 원래의 실패 결과(PARSING_FAILED / INAPPROPRIATE_RESPONSE)를 그대로 반환
+       - model_used는 content를 생성한 모델 (ai_model_used에 슬롯 모델과 함께 표기)
+       """
+       parsed_result = self.parse_response(content, style, author_style, keywords, length)
+       if parsed_result["success"]:
+           parsed_result["ai_model_used"] = model_used
+           return parsed_result
+
+       parser = self.create_stream_parser()
+       parser.feed(content)
+       kept = parser.valid_items()
+       missing = [slot for slot, key in enumerate(self.POEM_KEYS) if key not in kept]
+       if len(missing) > max_slots:
+           return parsed_result
+
+       print(f"🩹 시 {len(kept)}편을 살리고 {[slot + 1 for slot in missing]}번만 다시 생성합니다")
+       results = await asyncio.gather(*(
+           self._agenerate_slot(style, author_style, keywords, length, opt, slot, max_retries, on_completion)
+           for slot in missing
+       ), return_exceptions=True)
+       models = [model_used]
+       for slot, result in zip(missing, results):
+           if isinstance(result, BaseException) or result[0] is None:
+               return parsed_result
+           kept[self.POEM_KEYS[slot]] = result[0]
+           models.append(result[3])
+
+       return {
+           "success": True,
+           "request": {
+               "style": style,
+               "author_style": author_style,
+               "keywords": keywords,
+               "length": length
+           },
+           "poems": [kept[key] for key in self.POEM_KEYS],
+           "ai_model_used": ", ".join(dict.fromkeys(m for m in models if m)),
+           "repaired_slots": [slot + 1 for slot in missing]
+       }
+
+   def _failure_result(self, error_code: str, style: str, author_style: str, keywords: List[str], length: str) -> Dict:
+       return {
+           "success": False,
+           "error": (
+               "AI가 부적절한 응답을 생성했습니다. 다시 시도해주세요."
+               if error_code == "INAPPROPRIATE_RESPONSE"
+               else "AI 응답 파싱에 실패했습니다. 다시 시도해주세요."
+           ),
+           "error_code": error_code,
+           "request": {
+               "style": style,
+               "author_style": author_style,
+               "keywords": keywords,
+               "length": length
+           },
+           "poems": []
+       }
+
+   def create_stream_parser(self) -> IncrementalItemParser:
+       """스트리밍 응답용 증분 파서 (poem1~poem4 값이 닫힐 때마다 _validate_poem_content로 검증)"""
+       return IncrementalItemParser(self.POEM_KEYS, self._validate_poem_content)
+
+   def record_parse(self, error_code: Optional[str], kind: str = "primary") -> None:
+       """응답 하나의 파싱 결과를 현재 출력 모드로 집계 (성공이면 None, 한 편짜리 슬롯 호출은 kind="slot")"""
+       self.parse_stats.record(self.output_mode, error_code, kind)
+
 
    def _validate_poem_content(self, poem: str) -> bool:
        """시 내용이 올바른지 검증 (사과문이나 메타 언급 체크)"""
@@ -289,51 +590,34 @@ class PoemGenerator:
 
    # ---------- 파싱 ----------
    def parse_response(self, content: str, style: str, author_style: str, keywords: List[str], length: str) -> Dict:
-       """OpenAI 응답 파싱"""
-       try:
-           # JSON 코드 블록 제거
-           content = content.replace('```json', '').replace('```', '').strip()
-
-           # JSON 파싱
-           parsed = json.loads(content)
-           
-           poems = [
-               parsed.get("poem1", ""),
-               parsed.get("poem2", ""),
-               parsed.get("poem3", ""),
-               parsed.get("poem4", "")
-           ]
-           
-           # 각 시의 내용을 검증
-           for i, poem in enumerate(poems, 1):
-               if not self._validate_poem_content(poem):
-                   print(f"⚠️ 시 {i}번에서 부적절한 내용 감지: {poem[:100]}...")
-                   return {
-                       "success": False,
-                       "error": "AI가 부적절한 응답을 생성했습니다. 다시 시도해주세요.",
-                       "error_code": "INAPPROPRIATE_RESPONSE",
-                       "request": {
-                           "style": style,
-                           "author_style": author_style,
-                           "keywords": keywords,
-                           "length": length
-                       },
-                       "poems": []
-                   }
+       """OpenAI 응답 파싱 (스트리밍과 같은 증분 파서에 전체 텍스트를 한 번에 넣음)
 
+       코드 블록(```json)이나 앞뒤 설명문은 파서가 최상위 객체 밖의 텍스트로 보고 무시하므로
+       시 본문에 들어 있는 ``` 등이 지워지지 않습니다.
+       """
+       parser = self.create_stream_parser()
+       parser.feed(content)
+
+       # 각 시의 내용은 파서가 값이 닫힐 때 이미 검증함 (응답이 잘렸더라도 부적절한 내용이 우선)
+       if parser.rejected:
+           item = parser.rejected
+           print(f"⚠️ 시 {item.index}번에서 부적절한 내용 감지: {item.text[:100]}...")
+           self.record_parse("INAPPROPRIATE_RESPONSE")
            return {
-               "success": True,
+               "success": False,
+               "error": "AI가 부적절한 응답을 생성했습니다. 다시 시도해주세요.",
+               "error_code": "INAPPROPRIATE_RESPONSE",
                "request": {
                    "style": style,
                    "author_style": author_style,
                    "keywords": keywords,
                    "length": length
                },
-               "poems": poems
+               "poems": []
            }
 
-       except json.JSONDecodeError as e:
-           print(f"⚠️ JSON 파싱 실패: {e}")
+       if not parser.done:
+           print(f"⚠️ JSON 파싱 실패: {len(parser.items)}/{len(parser.keys)}개 항목만 완성됨")
            print(f"📋 원본 응답 길이: {len(content)}")
            print(f"📝 원본 응답 내용:")
            print("=" * 50)
@@ -346,10 +630,11 @@ class PoemGenerator:
                print(f"📄 마지막 100자: {content[-100:]}")
 
            # JSON 파싱 실패 시 실패 응답 반환
+           self.record_parse("PARSING_FAILED")
            return {
                "success": False,
                "error": "AI 응답 파싱에 실패했습니다. 다시 시도해주세요.",
-               "error_code": "PARSING_FAILED", 
+               "error_code": "PARSING_FAILED",
                "request": {
                    "style": style,
                    "author_style": author_style,
@@ -359,6 +644,18 @@ class PoemGenerator:
                "poems": []
            }
 
+       self.record_parse(None)
+       return {
+           "success": True,
+           "request": {
+               "style": style,
+               "author_style": author_style,
+               "keywords": keywords,
+               "length": length
+           },
+           "poems": parser.values()
+       }
+
    def _fallback_parse(self, content: str, style: str, author_style: str, keywords: List[str], length: str) -> Dict:
        """JSON 파싱 실패시 대안 파싱"""
        try:
@@ -0,0 +1,185 @@
+# poem_inventory.py
+from __future__ import annotations
+from collections import deque
+from typing import Optional, Dict, Any, List, Callable, Awaitable, Tuple
+import asyncio
+import os
+import time
+
+from generation_cache import GenerationKey
+
+
+# ======================
+# 인기 조건 시 재고 (미리 생성)
+# ======================
+class PoemInventory:
+    """
+    요청이 많은 조건(top_n)마다 검증된 4편 묶음을 target_stock개씩 미리 만들어 두는 재고
+    - record: 요청마다 조건별 요청 수를 집계 (decay_interval_seconds마다 절반으로 줄여 최근 트래픽 위주로 순위 유지)
+    - take: 재고가 있으면 하나를 꺼내 즉시 반환 (한 묶음은 한 번만 사용), 부족해지면 보충 작업을 깨움
+    - 보충은 백그라운드 작업이 refill_concurrency개까지 동시에 실제 생성으로 수행
+    - 재고는 ttl_seconds가 지나면 버리고, 순위에서 밀려난 조건은 남은 재고가 소진되면 정리
+    - min_requests번 이상 요청된 조건만 재고 대상 (한 번뿐인 조건에 토큰을 쓰지 않도록)
+    """
+
+    def __init__(
+        self,
+        generate: Callable[[GenerationKey], Awaitable[Optional[List[str]]]],
+        top_n: int = 20,
+        target_stock: int = 3,
+        min_requests: int = 3,
+        ttl_seconds: float = 21600.0,
+        refill_interval_seconds: float = 5.0,
+        decay_interval_seconds: float = 600.0,
+        refill_concurrency: int = 2,
+    ):
+        self.generate = generate
+        self.top_n = top_n
+        self.target_stock = target_stock
+        self.min_requests = min_requests
+        self.ttl_seconds = ttl_seconds
+        self.refill_interval_seconds = refill_interval_seconds
+        self.decay_interval_seconds = decay_interval_seconds
+        self.refill_concurrency = refill_concurrency
+
+        self._traffic: Dict[GenerationKey, float] = {}
+        self._stock: Dict[GenerationKey, deque[Tuple[float, List[str]]]] = {}
+        self._wake = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._last_decay = time.monotonic()
+        self._stats = {
+            "served": 0,
+            "misses": 0,
+            "refilled": 0,
+            "refill_failures": 0,
+            "expired": 0,
+        }
+
+    @classmethod
+    def from_env(cls, generate: Callable[[GenerationKey], Awaitable[Optional[List[str]]]]) -> "PoemInventory":
+        return cls(
+            generate=generate,
+            top_n=int(os.getenv("POEM_INVENTORY_TOP_N", "20")),
+            target_stock=int(os.getenv("POEM_INVENTORY_TARGET_STOCK", "3")),
+            min_requests=int(os.getenv("POEM_INVENTORY_MIN_REQUESTS", "3")),
+            ttl_seconds=float(os.getenv("POEM_INVENTORY_TTL_SECONDS", "21600")),
+            refill_interval_seconds=float(os.getenv("POEM_INVENTORY_REFILL_INTERVAL_SECONDS", "5")),
+            decay_interval_seconds=float(os.getenv("POEM_INVENTORY_DECAY_SECONDS", "600")),
+            refill_concurrency=int(os.getenv("POEM_INVENTORY_REFILL_CONCURRENCY", "2")),
+        )
+
+    # ---------- 수명주기 ----------
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    async def aclose(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    # ---------- 요청 경로 ----------
+    def record(self, key: GenerationKey) -> None:
+        self._traffic[key] = self._traffic.get(key, 0.0) + 1
+
+    def take(self, key: GenerationKey) -> Optional[List[str]]:
+        """재고가 있으면 하나를 꺼내 반환, 없으면 None (호출한 쪽이 실제 생성으로 대체)"""
+        stock = self._stock.get(key)
+        now = time.monotonic()
+        while stock:
+            expires_at, items = stock.popleft()
+            if expires_at <= now:
+                self._stats["expired"] += 1
+                continue
+            self._stats["served"] += 1
+            if len(stock) < self.target_stock:
+                self._wake.set()
+            return list(items)
+
+        self._stats["misses"] += 1
+        if self._traffic.get(key, 0) >= self.min_requests:
+            self._wake.set()
+        return None
+
+    # ---------- 보충 ----------
+    def top_keys(self) -> List[GenerationKey]:
+        """최근 요청 수 기준 상위 top_n개 조건 (min_requests 미만 제외)"""
+        ranked = sorted(self._traffic.items(), key=lambda kv: kv[1], reverse=True)
+        return [key for key, count in ranked[:self.top_n] if count >= self.min_requests]
+
+    async def refill_once(self) -> int:
+        """상위 조건의 재고를 목표치까지 채우고 새로 채운 묶음 수를 반환"""
+        self._drop_expired()
+        jobs = []
+        for key in self.top_keys():
+            missing = self.target_stock - len(self._stock.get(key, ()))
+            jobs.extend([key] * max(0, missing))
+        if not jobs:
+            return 0
+
+        semaphore = asyncio.Semaphore(self.refill_concurrency)
+
+        async def refill(key: GenerationKey) -> bool:
+            async with semaphore:
+                try:
+                    items = await self.generate(key)
+                except Exception as e:
+                    print(f"⚠️ 시 재고 보충 실패 ({key.style}/{key.author_style}): {e}")
+                    items = None
+            if not items:
+                self._stats["refill_failures"] += 1
+                return False
+            self._stock.setdefault(key, deque()).append((time.monotonic() + self.ttl_seconds, items))
+            self._stats["refilled"] += 1
+            return True
+
+        results = await asyncio.gather(*(refill(key) for key in jobs))
+        return sum(results)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self._stats["served"] + self._stats["misses"]
+        return {
+            "tracked_keys": len(self._traffic),
+            "stocked_keys": sum(1 for s in self._stock.values() if s),
+            "stocked_sets": sum(len(s) for s in self._stock.values()),
+            "top_n": self.top_n,
+            "target_stock": self.target_stock,
+            **self._stats,
+            "hit_rate": self._stats["served"] / lookups if lookups else 0.0,
+        }
+
+    # ---------- 내부 ----------
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.refill_interval_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            self._decay()
+            try:
+                await self.refill_once()
+            except Exception as e:
+                print(f"⚠️ 시 재고 보충 작업 오류 (다음 주기에 재시도): {e}")
+
+    def _decay(self) -> None:
+        """주기마다 요청 수를 절반으로 줄이고, 순위에서 밀려나 재고도 없는 조건은 정리"""
+        if time.monotonic() - self._last_decay < self.decay_interval_seconds:
+            return
+        self._last_decay = time.monotonic()
+        for key in list(self._traffic):
+            self._traffic[key] /= 2
+            if self._traffic[key] < 0.5 and not self._stock.get(key):
+                del self._traffic[key]
+                self._stock.pop(key, None)
+
+    def _drop_expired(self) -> None:
+        now = time.monotonic()
+        for key, stock in list(self._stock.items()):
+            while stock and stock[0][0] <= now:
+                stock.popleft()
+                self._stats["expired"] += 1
+            if not stock and key not in self.top_keys():
+                del self._stock[key]
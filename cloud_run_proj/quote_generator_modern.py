@@ -1,35 +1,15 @@
 # quote_generator_modern.py
 from __future__ import annotations
 from dataclasses import dataclass
-from abc import ABC, abstractmethod
-from typing import Optional, Dict, Any, Iterable, List
-from openai import OpenAI
+from typing import Optional, Dict, Any, Iterable, List, Callable, Sequence
+from openai import OpenAI, AsyncOpenAI
 import os
 import json
 from dotenv import load_dotenv
 
-
-# ======================
-# 공통 DTO
-# ======================
-@dataclass(frozen=True)
-class Prompt:
-    system_prompt: str
-    user_prompt: str
-
-
-@dataclass(frozen=True)
-class GenOptions:
-    # 공통
-    model: str
-
-    # GPT-4o 전용
-    temperature: Optional[float] = None
-    max_tokens: Optional[int] = None
-
-    # GPT-5 전용
-    reasoning_effort: Optional[str] = None  # "low" | "medium" | "high"
-    max_output_tokens: Optional[int] = None  # Responses API 상한
+from llm_client_registry import LLMClientRegistry, ModelStream
+from llm_adapters import Prompt, GenOptions, Completion, ModelAdapterFactory
+from incremental_json import IncrementalItemParser, ParseStats, items_json_schema
 
 
 # ======================
@@ -40,6 +20,7 @@ class KoreanQuotePromptBuilder:
     오늘의 글귀 생성을 위한 프롬프트 빌더
     - system_prompt: 한국 문학과 명언에 정통한 작가 / 4개 작성 / 서로 다른 관점
     - user_prompt: style, author_style, keywords, length를 받아 본질 지침 생성
+      (고정 지침을 앞에, 조건을 뒤에 두어 프롬프트 캐시가 적용되는 앞부분을 길게 유지)
     """
 
     SYSTEM_PROMPT: str = (
@@ -50,120 +31,156 @@ class KoreanQuotePromptBuilder:
         "오직 글귀만을 창작하세요."
     )
 
+    # 프롬프트 배치
+    # - static_first: 요청마다 같은 지침/출력 형식을 앞에, 조건(성향·작가·단어·길이)을 맨 끝에 둠
+    #   → system prompt와 user prompt 앞부분이 바이트 단위로 같아 OpenAI 프롬프트 캐시가 적용되는 구간이 길어짐
+    # - variable_first: 조건을 먼저 두는 이전 배치 (bench_prompt_cache.py 비교용)
+    LAYOUTS = ("static_first", "variable_first")
+
+    GUIDELINES: str = """창작 지침:
+• 각 글귀는 1-3문장으로 구성된 짧고 임팩트 있는 메시지여야 합니다
+• 지정된 단어들을 자연스럽게 녹여내세요
+• 조건의 작가 스타일에 맞는 문체와 정서를 반영하세요
+• 은유와 비유를 적절히 활용하세요
+• 독자에게 영감과 위로를 주는 내용이어야 합니다
+• 기억하기 쉽고 공유하고 싶은 문장으로 작성하세요
+• 4개의 글귀는 서로 다른 관점과 표현을 사용하세요
+
+중요한 제약사항:
+• 절대로 "죄송합니다", "~할 수는 없지만", "~해드립니다" 같은 사과나 설명으로 시작하지 마세요
+• 직접적으로 글귀만 창작하세요
+• 메타 언급이나 부가 설명은 금지합니다"""
+
+    @staticmethod
+    def create_conditions(
+            style: str,
+            author_style: str,
+            keywords: Iterable[str],
+            length: str,
+    ) -> str:
+        """요청마다 달라지는 조건 블록"""
+        keywords_str: List[str] = [k.strip() for k in keywords if str(k).strip()]
+        kw_str = ", ".join(keywords_str) if keywords_str else "제한 없음"
+
+        return f"""조건:
+• 성향: {style}
+• 작가 스타일: {author_style}
+• 포함 단어: '{kw_str}'
+• 길이: {length}"""
+
     @staticmethod
     def create_user_prompt(
             style: str,
             author_style: str,
             keywords: Iterable[str],
             length: str,
+            structured: bool = False,
+            layout: str = "static_first",
     ) -> str:
         """
         - style: 전체적인 분위기/톤(예: 희망적, 위로, 동기부여 등)
         - author_style: 참고 작가/문체(예: 김소월 풍, 괴테, 니체 등)
         - keywords: 반드시 자연스럽게 녹일 핵심 단어 목록
         - length: 길이 지침(예: '짧게 1-2문장', '보통 2-3문장', '길게 3-4문장' 등)
+        - structured: 구조화 출력(JSON schema)으로 형식을 강제할 때는 JSON 예시 대신 짧은 안내만 넣음
+        - layout: static_first(고정 지침 → 조건) / variable_first(조건 → 고정 지침)
         """
-        keywords_str: List[str] = [k.strip() for k in keywords if str(k).strip()]
-        kw_str = ", ".join(keywords_str) if keywords_str else "제한 없음"
+        conditions = KoreanQuotePromptBuilder.create_conditions(style, author_style, keywords, length)
+        output_format = (
+            KoreanQuotePromptBuilder.SCHEMA_INSTRUCTION if structured else KoreanQuotePromptBuilder.JSON_EXAMPLE
+        )
 
-        prompt = f"""다음 조건에 맞춰 정확히 4개의 글귀를 창작하세요.
+        if layout == "variable_first":
+            return f"""다음 조건에 맞춰 정확히 4개의 글귀를 창작하세요.
 
-조건:
-• 성향: {style}
-• 작가 스타일: {author_style}
-• 포함 단어: '{kw_str}'
-• 길이: {length}
+{conditions}
 
-창작 지침:
-• 각 글귀는 1-3문장으로 구성된 짧고 임팩트 있는 메시지여야 합니다
-• 지정된 단어들을 자연스럽게 녹여내세요
-• {author_style} 작가의 문체와 정서를 반영하세요
-• 은유와 비유를 적절히 활용하세요
-• 독자에게 영감과 위로를 주는 내용이어야 합니다
-• 기억하기 쉽고 공유하고 싶은 문장으로 작성하세요
-• 4개의 글귀는 서로 다른 관점과 표현을 사용하세요
+{KoreanQuotePromptBuilder.GUIDELINES}
 
-중요한 제약사항:
-• 절대로 "죄송합니다", "~할 수는 없지만", "~해드립니다" 같은 사과나 설명으로 시작하지 마세요
-• 직접적으로 글귀만 창작하세요
-• 메타 언급이나 부가 설명은 금지합니다
+{output_format}"""
+
+        return f"""아래 지침과 맨 끝의 조건에 맞춰 정확히 4개의 글귀를 창작하세요.
+
+{KoreanQuotePromptBuilder.GUIDELINES}
+
+{output_format}
 
-최종 출력은 반드시 아래 JSON 형식만 사용하세요:
+{conditions}"""
 
-{{
+    # ---------- 출력 형식 ----------
+    # 프롬프트로 형식을 요청하는 모드의 JSON 예시
+    JSON_EXAMPLE: str = """최종 출력은 반드시 아래 JSON 형식만 사용하세요:
+
+{
   "quote1": "첫 번째 글귀 내용...",
   "quote2": "두 번째 글귀 내용...",
   "quote3": "세 번째 글귀 내용...",
   "quote4": "네 번째 글귀 내용..."
-}}"""
+}"""
 
-        return prompt
+    # 구조화 출력 모드: 키와 형식은 스키마가 강제하므로 짧게 안내
+    SCHEMA_INSTRUCTION: str = "quote1~quote4에 글귀를 하나씩 작성하세요."
 
+    QUOTE_FORMAT: str = "글귀 하나의 본문"
 
-# ======================
-# 어댑터 인터페이스
-# ======================
-class BaseModelAdapter(ABC):
-    def __init__(self, client: OpenAI, model: str):
-        self.client = client
-        self.model = model
+    @staticmethod
+    def output_schema(keys: Sequence[str]) -> Dict[str, Any]:
+        """keys(quote1~quote4 중 요청한 키)의 글귀만 갖는 응답 스키마"""
+        return items_json_schema("quotes", keys, KoreanQuotePromptBuilder.QUOTE_FORMAT)
 
-    @abstractmethod
-    def generate(self, prompt: Prompt, opt: GenOptions) -> str: ...
+    # ---------- 빠진 글귀만 다시 요청하는 부분 복구 ----------
+    REPAIR_SYSTEM_PROMPT: str = (
+        "당신은 한국 문학과 명언에 정통한 전문 작가입니다. "
+        "주어진 조건에 맞춰 감동적이고 의미 있는 한국어 글귀를 요청된 개수만큼 작성합니다. "
+        "절대로 사과문이나 설명문으로 시작하지 마세요. "
+        "오직 글귀만을 창작하세요."
+    )
 
+    REPAIR_GUIDELINES: str = """창작 지침:
+• 각 글귀는 1-3문장으로 구성된 짧고 임팩트 있는 메시지여야 합니다
+• 지정된 단어들을 자연스럽게 녹여내세요
+• 조건의 작가 스타일에 맞는 문체와 정서를 반영하세요
+• 이미 작성된 글귀와 겹치지 않는 관점과 표현을 사용하세요
 
-# ======================
-# GPT-4o 어댑터 (Chat Completions)
-# ======================
-class GPT4oAdapter(BaseModelAdapter):
-    def generate(self, prompt: Prompt, opt: GenOptions) -> str:
-        kwargs: Dict[str, Any] = {
-            "model": self.model,
-            "messages": [
-                {"role": "system", "content": prompt.system_prompt},
-                {"role": "user", "content": prompt.user_prompt},
-            ],
-        }
-        if opt.temperature is not None:
-            kwargs["temperature"] = opt.temperature
-        if opt.max_tokens is not None:
-            kwargs["max_tokens"] = opt.max_tokens
+중요한 제약사항:
+• 절대로 "죄송합니다", "~할 수는 없지만", "~해드립니다" 같은 사과나 설명으로 시작하지 마세요
+• 직접적으로 글귀만 창작하세요
+• 메타 언급이나 부가 설명은 금지합니다"""
 
-        resp = self.client.chat.completions.create(**kwargs)
-        return resp.choices[0].message.content or ""
+    @staticmethod
+    def create_repair_user_prompt(
+            style: str,
+            author_style: str,
+            keywords: Iterable[str],
+            length: str,
+            missing_keys: Sequence[str],
+            kept_quotes: Iterable[str],
+            structured: bool = False,
+    ) -> str:
+        """
+        부분 복구용 프롬프트: 통과한 글귀는 참고로만 보여주고, 빠진 키(missing_keys)의 글귀만 새로 요청
+        - 고정 지침을 앞에, 조건/이미 작성된 글귀/요청할 키를 뒤에 둠 (static_first 배치)
+        """
+        conditions = KoreanQuotePromptBuilder.create_conditions(style, author_style, keywords, length)
+        kept_str = "\n".join(f"• {q}" for q in kept_quotes) or "• (없음)"
+        json_lines = ",\n".join(f'  "{key}": "글귀 내용..."' for key in missing_keys)
+        if structured:
+            output_format = f"{', '.join(missing_keys)}에 글귀를 하나씩 작성하세요."
+        else:
+            output_format = f"최종 출력은 반드시 아래 JSON 형식만 사용하세요:\n\n{{\n{json_lines}\n}}"
 
+        prompt = f"""아래 지침과 조건에 맞춰, 맨 끝에 요청한 개수만큼 글귀를 창작하세요.
 
-# ======================
-# GPT-5 어댑터 (Responses API)
-# ======================
-class GPT5Adapter(BaseModelAdapter):
-    def generate(self, prompt: Prompt, opt: GenOptions) -> str:
-        kwargs: Dict[str, Any] = {
-            "model": self.model,
-            "instructions": prompt.system_prompt,
-            "input": prompt.user_prompt,
-        }
-        if opt.reasoning_effort:
-            kwargs["reasoning"] = {"effort": opt.reasoning_effort}
-        if opt.max_output_tokens is not None:
-            kwargs["max_output_tokens"] = opt.max_output_tokens
+{KoreanQuotePromptBuilder.REPAIR_GUIDELINES}
 
-        resp = self.client.responses.create(**kwargs)
-        return getattr(resp, "output_text", None) or ""
+{conditions}
 
+이미 작성된 글귀:
+{kept_str}
 
-# ======================
-# 어댑터 팩토리 (OCP)
-# ======================
-class ModelAdapterFactory:
-    @staticmethod
-    def create(client: OpenAI, model: str) -> BaseModelAdapter:
-        name = model.lower()
-        if name.startswith("gpt-5"):
-            return GPT5Adapter(client, model)
-        if name.startswith("gpt-4o"):
-            return GPT4oAdapter(client, model)
-        raise ValueError(f"Unsupported model family: {model}")
+정확히 {len(missing_keys)}개를 작성하세요. {output_format}"""
+
+        return prompt
 
 
 # ======================
@@ -202,24 +219,48 @@ class ParseResult:
 # 퍼사드: 글귀 생성 유스케이스 (SRP)
 # ======================
 class QuoteGenerator:
-    def __init__(self, client: Optional[OpenAI] = None, api_key: str = None):
+    QUOTE_KEYS = ("quote1", "quote2", "quote3", "quote4")
+
+    def __init__(
+            self,
+            client: Optional[OpenAI] = None,
+            api_key: str = None,
+            async_client: Optional[AsyncOpenAI] = None,
+            registry: Optional[LLMClientRegistry] = None,
+            structured_output: Optional[bool] = None,
+            prompt_layout: Optional[str] = None,
+    ):
         # 환경변수 로드
         load_dotenv()
 
         # OpenAI 클라이언트 설정
-        if client:
-            self.client = client
-        else:
-            # API 키 설정
-            if api_key is None:
-                api_key = os.getenv('OPENAI_API_KEY')
+        # - registry를 넘기면 다른 생성기와 커넥션 풀/어댑터를 공유
+        # - 없으면 주어진 클라이언트(또는 API 키)로 전용 레지스트리를 만듦
+        if registry is None:
+            registry = LLMClientRegistry(api_key=api_key, client=client, async_client=async_client)
+        self.registry = registry
 
-            if not api_key:
-                raise ValueError("OPENAI_API_KEY가 설정되지 않았습니다.")
+        self.system_prompt = KoreanQuotePromptBuilder.SYSTEM_PROMPT
 
-            self.client = OpenAI(api_key=api_key)
+        # 구조화 출력(JSON schema) 사용 여부: 켜면 프롬프트의 JSON 예시를 빼고 스키마로 형식을 강제 (기본은 꺼짐: 프롬프트의 JSON 예시)
+        if structured_output is None:
+            structured_output = os.getenv("STRUCTURED_OUTPUT", "false").lower() == "true"
+        self.structured_output = structured_output
+        self.output_mode = "json_schema" if structured_output else "json_example"
+        self.parse_stats = ParseStats()
 
-        self.system_prompt = KoreanQuotePromptBuilder.SYSTEM_PROMPT
+        # 프롬프트 배치 (static_first: 고정 지침을 앞에 두어 프롬프트 캐시 적용 구간을 늘림)
+        self.prompt_layout = prompt_layout or os.getenv("PROMPT_LAYOUT", "static_first")
+        if self.prompt_layout not in KoreanQuotePromptBuilder.LAYOUTS:
+            raise ValueError(f"Unsupported prompt layout: {self.prompt_layout}")
+
+    @property
+    def client(self) -> OpenAI:
+        return self.registry.client
+
+    @property
+    def async_client(self) -> AsyncOpenAI:
+        return self.registry.async_client
 
     def _build_prompt(
             self,
@@ -233,8 +274,11 @@ class QuoteGenerator:
             author_style=author_style,
             keywords=keywords,
             length=length,
+            structured=self.structured_output,
+            layout=self.prompt_layout,
         )
-        return Prompt(system_prompt=self.system_prompt, user_prompt=user_prompt)
+        schema = KoreanQuotePromptBuilder.output_schema(self.QUOTE_KEYS) if self.structured_output else None
+        return Prompt(system_prompt=self.system_prompt, user_prompt=user_prompt, schema=schema, cache_key="quote")
 
     def generate_quotes(
             self,
@@ -244,10 +288,130 @@ class QuoteGenerator:
             length: str,
             opt: GenOptions,
     ) -> str:
-        adapter = ModelAdapterFactory.create(self.client, opt.model)
+        adapter = self.registry.adapter(opt.model, ModelAdapterFactory.create)
         prompt = self._build_prompt(style, author_style, keywords, length)
         return adapter.generate(prompt, opt)
 
+    async def acomplete_quotes(
+            self,
+            style: str,
+            author_style: str,
+            keywords: Iterable[str],
+            length: str,
+            opt: GenOptions,
+    ) -> Completion:
+        """원시 응답 텍스트와 토큰 사용량/잘림 여부 (요청 모델이 차단·실패하면 대체 모델로 생성)"""
+        prompt = self._build_prompt(style, author_style, keywords, length)
+        return await self.registry.acomplete(
+            opt, ModelAdapterFactory.create, lambda adapter, model_opt: adapter.acomplete(prompt, model_opt)
+        )
+
+    def astream_quotes(
+            self,
+            style: str,
+            author_style: str,
+            keywords: Iterable[str],
+            length: str,
+            opt: GenOptions,
+            on_completion: Optional[Callable[[Completion], None]] = None,
+    ) -> ModelStream:
+        """원시 응답 텍스트를 조각(delta) 단위로 스트리밍 (첫 조각 전에 요청 모델이 차단·실패하면 대체 모델로 생성, .model이 실제 응답 모델)
+        on_completion에는 끝까지 받았거나 출력 상한에서 잘린 응답의 토큰 사용량을 전달
+        """
+        prompt = self._build_prompt(style, author_style, keywords, length)
+        return self.registry.astream(
+            opt, ModelAdapterFactory.create, lambda adapter, model_opt: adapter.astream_recorded(prompt, model_opt, on_completion)
+        )
+
+    async def arepair_quotes(
+            self,
+            content: str,
+            style: str,
+            author_style: str,
+            keywords: List[str],
+            length: str,
+            opt: GenOptions,
+            model_used: Optional[str] = None,
+            max_retries: int = 1,
+            max_slots: int = 3,
+            on_completion: Optional[Callable[[Completion], None]] = None,
+    ) -> Dict:
+        """
+        4개를 한 번에 생성한 응답(content)을 parse_response처럼 해석하되, 실패해도 버리지 않고 부분 복구
+        - 검증을 통과한 글귀는 그대로 두고, 빠졌거나(응답 잘림) 거절된 키만 한 번의 작은 호출로 다시 요청
+        - 최대 max_retries번 재시도하며 매번 아직 채우지 못한 키만 요청, 다시 생성할 키가 max_slots개를 넘으면 복구하지 않음
+        - 복구하지 못하면 원래의 실패 결과(PARSING_FAILED / INAPPROPRIATE_RESPONSE)를 그대로 반환
+        - model_used는 content를 생성한 모델 (ai_model_used에 복구 호출 모델과 함께 표기)
+        """
+        parsed_result = self.parse_response(content, style, author_style, keywords, length)
+        if parsed_result["success"]:
+            parsed_result["ai_model_used"] = model_used
+            return parsed_result
+
+        parser = self.create_stream_parser()
+        parser.feed(content)
+        kept = parser.valid_items()
+        missing = [key for key in self.QUOTE_KEYS if key not in kept]
+        if len(missing) > max_slots:
+            return parsed_result
+
+        print(f"🩹 글귀 {len(kept)}개를 살리고 {missing}만 다시 생성합니다")
+        models = [model_used]
+        for attempt in range(max_retries + 1):
+            todo = [key for key in self.QUOTE_KEYS if key not in kept]
+            if not todo:
+                break
+            user_prompt = KoreanQuotePromptBuilder.create_repair_user_prompt(
+                style, author_style, keywords, length, todo, kept.values(), structured=self.structured_output
+            )
+            prompt = Prompt(
+                system_prompt=KoreanQuotePromptBuilder.REPAIR_SYSTEM_PROMPT,
+                user_prompt=user_prompt,
+                schema=KoreanQuotePromptBuilder.output_schema(todo) if self.structured_output else None,
+                cache_key="quote-repair",
+            )
+            try:
+                completion = await self.registry.acomplete(
+                    opt, ModelAdapterFactory.create, lambda adapter, model_opt: adapter.acomplete(prompt, model_opt)
+                )
+            except Exception as e:
+                print(f"⚠️ 글귀 부분 복구 호출 실패 (시도 {attempt + 1}): {e}")
+                continue
+            if on_completion:
+                on_completion(completion)
+            repair_parser = IncrementalItemParser(todo, self._validate_quote_content)
+            repair_parser.feed(completion.text)
+            if repair_parser.rejected:
+                self.record_parse("INAPPROPRIATE_RESPONSE", kind="repair")
+            else:
+                self.record_parse(None if repair_parser.done else "PARSING_FAILED", kind="repair")
+            kept.update(repair_parser.valid_items())
+            models.append(completion.model)
+
+        if any(key not in kept for key in self.QUOTE_KEYS):
+            return parsed_result
+
+        return {
+            "success": True,
+            "request": {
+                "style": style,
+                "author_style": author_style,
+                "keywords": keywords,
+                "length": length
+            },
+            "quotes": [kept[key] for key in self.QUOTE_KEYS],
+            "ai_model_used": ", ".join(dict.fromkeys(m for m in models if m)),
+            "repaired_slots": [self.QUOTE_KEYS.index(key) + 1 for key in missing]
+        }
+
+    def create_stream_parser(self) -> IncrementalItemParser:
+        """스트리밍 응답용 증분 파서 (quote1~quote4 값이 닫힐 때마다 _validate_quote_content로 검증)"""
+        return IncrementalItemParser(self.QUOTE_KEYS, self._validate_quote_content)
+
+    def record_parse(self, error_code: Optional[str], kind: str = "primary") -> None:
+        """응답 하나의 파싱 결과를 현재 출력 모드로 집계 (성공이면 None, 부분 복구 호출은 kind="repair")"""
+        self.parse_stats.record(self.output_mode, error_code, kind)
+
     def _validate_quote_content(self, quote: str) -> bool:
         """글귀 내용이 올바른지 검증 (사과문이나 메타 언급 체크)"""
         if not quote or not quote.strip():
@@ -279,55 +443,38 @@ class QuoteGenerator:
 
     # ---------- 파싱 ----------
     def parse_response(self, content: str, style: str, author_style: str, keywords: List[str], length: str) -> Dict:
-        """OpenAI 응답 파싱"""
-        try:
-            # JSON 코드 블록 제거
-            content = content.replace('```json', '').replace('```', '').strip()
-
-            # JSON 파싱
-            parsed = json.loads(content)
-
-            quotes = [
-                parsed.get("quote1", ""),
-                parsed.get("quote2", ""),
-                parsed.get("quote3", ""),
-                parsed.get("quote4", "")
-            ]
-
-            # 각 글귀의 내용을 검증
-            for i, quote in enumerate(quotes, 1):
-                if not self._validate_quote_content(quote):
-                    print(f"⚠️ 글귀 {i}번에서 부적절한 내용 감지: {quote[:100]}...")
-                    return {
-                        "success": False,
-                        "error": "AI가 부적절한 응답을 생성했습니다. 다시 시도해주세요.",
-                        "error_code": "INAPPROPRIATE_RESPONSE",
-                        "request": {
-                            "style": style,
-                            "author_style": author_style,
-                            "keywords": keywords,
-                            "length": length
-                        },
-                        "quotes": []
-                    }
+        """OpenAI 응답 파싱 (스트리밍과 같은 증분 파서에 전체 텍스트를 한 번에 넣음)
 
+        코드 블록(```json)이나 앞뒤 설명문은 파서가 최상위 객체 밖의 텍스트로 보고 무시하므로
+        글귀 본문에 들어 있는 ``` 등이 지워지지 않습니다.
+        """
+        parser = self.create_stream_parser()
+        parser.feed(content)
+
+        # 각 글귀의 내용은 파서가 값이 닫힐 때 이미 검증함 (응답이 잘렸더라도 부적절한 내용이 우선)
+        if parser.rejected:
+            item = parser.rejected
+            print(f"⚠️ 글귀 {item.index}번에서 부적절한 내용 감지: {item.text[:100]}...")
+            self.record_parse("INAPPROPRIATE_RESPONSE")
             return {
-                "success": True,
+                "success": False,
+                "error": "AI가 부적절한 응답을 생성했습니다. 다시 시도해주세요.",
+                "error_code": "INAPPROPRIATE_RESPONSE",
                 "request": {
                     "style": style,
                     "author_style": author_style,
                     "keywords": keywords,
                     "length": length
                 },
-                "quotes": quotes
+                "quotes": []
             }
 
-        except json.JSONDecodeError as e:
-            print(f"⚠️ JSON 파싱 실패: {e}")
+        if not parser.done:
+            print(f"⚠️ JSON 파싱 실패: {len(parser.items)}/{len(parser.keys)}개 항목만 완성됨")
             print(f"📋 원본 응답 길이: {len(content)}")
             print(f"📝 원본 응답 내용:")
             print("=" * 50)
-            print(repr(content))
+            print(repr(content))  # repr로 출력하여 숨겨진 문자들까지 보이도록 함
             print("=" * 50)
             if content.strip() == "":
                 print("⚠️ 빈 응답이 수신되었습니다!")
@@ -335,6 +482,8 @@ class QuoteGenerator:
                 print(f"📄 첫 100자: {content[:100]}")
                 print(f"📄 마지막 100자: {content[-100:]}")
 
+            # JSON 파싱 실패 시 실패 응답 반환
+            self.record_parse("PARSING_FAILED")
             return {
                 "success": False,
                 "error": "AI 응답 파싱에 실패했습니다. 다시 시도해주세요.",
@@ -348,6 +497,18 @@ class QuoteGenerator:
                 "quotes": []
             }
 
+        self.record_parse(None)
+        return {
+            "success": True,
+            "request": {
+                "style": style,
+                "author_style": author_style,
+                "keywords": keywords,
+                "length": length
+            },
+            "quotes": parser.values()
+        }
+
     def display_quotes(self, result: Dict) -> None:
         """생성된 글귀들을 보기 좋게 출력"""
         if not result["success"]:
@@ -0,0 +1,85 @@
+# single_flight.py
+from __future__ import annotations
+from dataclasses import dataclass
+from typing import Dict, Any, Callable, Awaitable, Hashable, Tuple, TypeVar
+import asyncio
+import os
+
+T = TypeVar("T")
+
+
+@dataclass
+class _Flight:
+    task: asyncio.Task
+    followers: int = 0
+
+
+# ======================
+# 동일 요청 합치기 (single-flight)
+# ======================
+class SingleFlight:
+    """
+    같은 키로 진행 중인 생성이 있으면 새로 호출하지 않고 그 결과를 함께 기다리는 합치기 계층
+    - 처음 들어온 요청(리더)의 호출을 별도 작업으로 실행 → 리더 요청이 취소돼도 기다리는 요청(팔로워)은 결과를 받음
+    - 키마다 팔로워는 max_followers명까지, 넘치면 합치지 않고 각자 호출 (한 번의 실패가 너무 많은 요청에 번지지 않도록)
+    - fresh_followers가 켜져 있으면 팔로워는 리더가 성공한 뒤 각자 새로 호출해 서로 다른 결과를 받음
+      (리더가 실패하면 그 실패를 그대로 공유해 장애 중인 API에 요청이 몰리지 않도록 함)
+    - 크레딧 예약/확정은 호출한 쪽(엔드포인트)에서 요청마다 따로 처리
+    """
+
+    def __init__(self, max_followers: int = 32, fresh_followers: bool = False):
+        self.max_followers = max_followers
+        self.fresh_followers = fresh_followers
+        self._flights: Dict[Hashable, _Flight] = {}
+        self._stats = {"leaders": 0, "followers": 0, "overflow": 0, "fresh_calls": 0}
+
+    @classmethod
+    def from_env(cls) -> "SingleFlight":
+        return cls(
+            max_followers=int(os.getenv("SINGLE_FLIGHT_MAX_FOLLOWERS", "32")),
+            fresh_followers=os.getenv("SINGLE_FLIGHT_FRESH_FOLLOWERS", "false").lower() == "true",
+        )
+
+    async def run(
+        self,
+        key: Hashable,
+        call: Callable[[], Awaitable[T]],
+        succeeded: Callable[[T], bool] = lambda result: True,
+    ) -> Tuple[T, bool]:
+        """
+        call() 결과와 공유 여부(팔로워로서 리더 결과를 받았으면 True)를 반환
+        succeeded는 fresh_followers 모드에서 리더 결과가 성공인지 판단 (실패 결과는 공유)
+        """
+        flight = self._flights.get(key)
+        if flight is not None and flight.followers >= self.max_followers:
+            self._stats["overflow"] += 1
+            return await call(), False
+
+        if flight is None:
+            self._stats["leaders"] += 1
+            flight = self._flights[key] = _Flight(task=asyncio.ensure_future(call()))
+            flight.task.add_done_callback(lambda _: self._forget(key, flight))
+            return await asyncio.shield(flight.task), False
+
+        self._stats["followers"] += 1
+        flight.followers += 1
+        result = await asyncio.shield(flight.task)
+        if self.fresh_followers and succeeded(result):
+            self._stats["fresh_calls"] += 1
+            return await call(), False
+        return result, True
+
+    def stats(self) -> Dict[str, Any]:
+        calls = self._stats["leaders"] + self._stats["followers"] + self._stats["overflow"]
+        return {
+            "in_flight": len(self._flights),
+            "max_followers": self.max_followers,
+            "fresh_followers": self.fresh_followers,
+            **self._stats,
+            "coalesced_rate": self._stats["followers"] / calls if calls else 0.0,
+        }
+
+    # ---------- 내부 ----------
+    def _forget(self, key: Hashable, flight: _Flight) -> None:
+        if self._flights.get(key) is flight:
+            del self._flights[key]
@@ -0,0 +1,64 @@
+# conftest.py
+import asyncio
+import os
+from types import SimpleNamespace
+from typing import Any, Dict
+
+import httpx
+import pytest
+
+# main.py가 import 시점에 OpenAI 레지스트리를 만들므로 테스트 전용 기본값을 먼저 넣어 둠 (실제 호출은 가짜 클라이언트가 받음)
+os.environ.setdefault("OPENAI_API_KEY", "test")
+os.environ.setdefault("LLM_HEDGE_ENABLED", "false")
+
+from fakes import FakeAsyncOpenAI, FakeSupabase, items_json  # noqa: E402
+
+
+@pytest.fixture
+def service(monkeypatch):
+    """
+    main.app의 전역 의존성을 메모리 대체물로 바꾼 서비스
+    - db: FakeSupabase (크레딧 테이블/RPC), openai: FakeAsyncOpenAI (응답은 replies[prompt_cache_key])
+    - budgets: 테스트마다 새로 만든 토큰 예산기 (main.token_budgets)
+    - post(path, body): lifespan 없이 ASGI로 직접 요청 (응답 본문을 끝까지 읽음)
+    """
+    import main
+    from credit_ledger import CreditLedger
+    from credit_repository import CreditBalanceCache, CreditRepository
+    from generation_cache import GenerationResultCache
+    from llm_client_registry import LLMClientRegistry
+    from poem_generator_modern import PoemGenerator
+    from quote_generator_modern import QuoteGenerator
+    from single_flight import SingleFlight
+    from token_budget import TokenBudgeter
+
+    replies: Dict[str, Any] = {"poem": items_json("poem"), "quote": items_json("quote")}
+    openai_client = FakeAsyncOpenAI(lambda kwargs: replies[kwargs.get("prompt_cache_key")])
+    registry = LLMClientRegistry(async_client=openai_client, hedging=False, fallback_models=[])
+    db = FakeSupabase()
+    repo = CreditRepository(db, balance_cache=CreditBalanceCache(ttl_seconds=30, max_size=100))
+
+    monkeypatch.setattr(main, "credit_repo", repo)
+    monkeypatch.setattr(main, "credit_ledger", CreditLedger(repo))
+    monkeypatch.setattr(main, "llm_registry", registry)
+    monkeypatch.setattr(main, "poem_generator", PoemGenerator(registry=registry, structured_output=False))
+    monkeypatch.setattr(main, "quote_generator", QuoteGenerator(registry=registry, structured_output=False))
+    monkeypatch.setattr(main, "result_cache", GenerationResultCache(ttl_seconds=60, max_keys=10, variants=1))
+    monkeypatch.setattr(main, "generation_flights", SingleFlight())
+    monkeypatch.setattr(main, "poem_inventory", None)
+    monkeypatch.setattr(main, "token_budgets", TokenBudgeter())
+
+    async def request(path: str, body: Dict[str, Any]) -> httpx.Response:
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.post(path, json=body)
+
+    return SimpleNamespace(
+        db=db,
+        openai=openai_client,
+        replies=replies,
+        registry=registry,
+        ledger=main.credit_ledger,
+        budgets=main.token_budgets,
+        post=lambda path, body: asyncio.run(request(path, body)),
+    )
@@ -0,0 +1,251 @@
+# fakes.py
+from __future__ import annotations
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List, Optional, Set
+import json
+import uuid
+
+import httpx
+import openai
+
+
+# ======================
+# OpenAI SDK 예외
+# ======================
+_STATUS_ERRORS = {
+    400: openai.BadRequestError,
+    429: openai.RateLimitError,
+    500: openai.InternalServerError,
+}
+
+
+def openai_status_error(status: int, headers: Optional[Dict[str, str]] = None) -> openai.APIStatusError:
+    """SDK가 HTTP 오류 응답에서 만드는 것과 같은 예외 (retry-after 등 헤더 포함)"""
+    response = httpx.Response(status, headers=headers, request=httpx.Request("POST", "https://api.openai.test/v1"))
+    return _STATUS_ERRORS[status](f"HTTP {status}", response=response, body=None)
+
+
+# ======================
+# Supabase 비동기 클라이언트 대체 (메모리)
+# ======================
+class FakeSupabase:
+    """
+    CreditRepository가 쓰는 만큼만 흉내 낸 메모리 Supabase 클라이언트
+    - table(): users_credits 조회/추가/수정, credit_holds 삭제
+    - rpc(): reserve_user_credit / commit_credit_hold / settle_credit_holds (실제 SQL 함수와 같은 결과 형태)
+    - failing에 RPC 이름을 넣으면 그 RPC는 예외를 던짐
+    """
+
+    def __init__(self):
+        self.users: Dict[str, Dict[str, Any]] = {}
+        self.holds: Dict[str, str] = {}  # hold_id -> user_id
+        self.committed: Set[str] = set()
+        self.ledger: Dict[str, Dict[str, Any]] = {}
+        self.failing: Set[str] = set()
+        self.calls: List[str] = []
+        self.postgrest = SimpleNamespace(aclose=self._noop)
+
+    def add_user(self, user_id: str, free_credits: int = 0, paid_credits: int = 0, deleted_at: Optional[str] = None) -> None:
+        self.users[user_id] = {
+            "user_id": user_id,
+            "free_credits": free_credits,
+            "paid_credits": paid_credits,
+            "deleted_at": deleted_at,
+        }
+
+    def balance(self, user_id: str) -> int:
+        user = self.users[user_id]
+        return user["free_credits"] + user["paid_credits"]
+
+    def table(self, name: str) -> "_FakeQuery":
+        return _FakeQuery(self, name)
+
+    def rpc(self, name: str, params: Dict[str, Any]) -> "_FakeCall":
+        return _FakeCall(self, name, lambda: getattr(self, f"_rpc_{name}")(**params))
+
+    # ---------- RPC ----------
+    def _rpc_reserve_user_credit(self, p_user_id: str, p_ttl_seconds: int) -> List[Dict[str, Any]]:
+        user = self.users.get(p_user_id)
+        if not user:
+            return [{"status": "not_found", "hold_id": None, "available_credits": 0}]
+        balance = {key: user[key] for key in ("free_credits", "paid_credits", "deleted_at")}
+        if user["deleted_at"]:
+            return [{"status": "deleted", "hold_id": None, "available_credits": 0, **balance}]
+        available = self.balance(p_user_id) - sum(1 for u in self.holds.values() if u == p_user_id)
+        if available <= 0:
+            return [{"status": "insufficient", "hold_id": None, "available_credits": available, **balance}]
+        hold_id = str(uuid.uuid4())
+        self.holds[hold_id] = p_user_id
+        return [{"status": "ok", "hold_id": hold_id, "available_credits": available - 1, **balance}]
+
+    def _rpc_commit_credit_hold(self, p_hold_id: str, p_user_id: str) -> None:
+        self.holds[p_hold_id] = p_user_id
+        self.committed.add(p_hold_id)
+        return None
+
+    def _rpc_settle_credit_holds(self, p_limit: int) -> List[Dict[str, Any]]:
+        touched: Dict[str, int] = {}
+        for hold_id in sorted(self.committed)[:p_limit]:
+            self.committed.discard(hold_id)
+            user_id = self.holds.pop(hold_id)
+            self.ledger[hold_id] = {"user_id": user_id, "amount": 1}
+            user = self.users[user_id]
+            from_free = min(user["free_credits"], 1)
+            user["free_credits"] -= from_free
+            user["paid_credits"] -= 1 - from_free
+            touched[user_id] = touched.get(user_id, 0) + 1
+        return [
+            {
+                "user_id": user_id,
+                "free_credits": self.users[user_id]["free_credits"],
+                "paid_credits": self.users[user_id]["paid_credits"],
+                "settled": settled,
+            }
+            for user_id, settled in touched.items()
+        ]
+
+    @staticmethod
+    async def _noop() -> None:
+        pass
+
+
+class _FakeCall:
+    def __init__(self, db: FakeSupabase, name: str, run: Callable[[], Any]):
+        self.db = db
+        self.name = name
+        self.run = run
+
+    async def execute(self) -> SimpleNamespace:
+        self.db.calls.append(self.name)
+        if self.name in self.db.failing:
+            raise RuntimeError(f"{self.name} 실패")
+        return SimpleNamespace(data=self.run())
+
+
+class _FakeQuery:
+    def __init__(self, db: FakeSupabase, table: str):
+        self.db = db
+        self.table = table
+        self.op = "select"
+        self.payload: Dict[str, Any] = {}
+        self.filters: Dict[str, Any] = {}
+
+    def select(self, *columns: str) -> "_FakeQuery":
+        return self
+
+    def insert(self, row: Dict[str, Any]) -> "_FakeQuery":
+        self.op, self.payload = "insert", row
+        return self
+
+    def update(self, values: Dict[str, Any]) -> "_FakeQuery":
+        self.op, self.payload = "update", values
+        return self
+
+    def delete(self) -> "_FakeQuery":
+        self.op = "delete"
+        return self
+
+    def eq(self, column: str, value: Any) -> "_FakeQuery":
+        self.filters[column] = value
+        return self
+
+    async def execute(self) -> SimpleNamespace:
+        self.db.calls.append(f"{self.op}:{self.table}")
+        if self.table == "credit_holds":
+            self.db.holds.pop(self.filters["hold_id"], None)
+            return SimpleNamespace(data=[])
+
+        if self.op == "insert":
+            self.db.add_user(self.payload["user_id"], self.payload["free_credits"], self.payload["paid_credits"])
+            return SimpleNamespace(data=[dict(self.db.users[self.payload["user_id"]])])
+        user = self.db.users.get(self.filters.get("user_id"))
+        if user and self.op == "update":
+            user.update(self.payload)
+        return SimpleNamespace(data=[dict(user)] if user else [])
+
+
+# ======================
+# OpenAI 비동기 클라이언트 대체 (메모리)
+# ======================
+POEM = "봄바람 불어오는 언덕에\n그리운 이름 하나 적어 두고\n햇살 아래 천천히 걸으며\n오래된 노래를 흥얼거린다"
+
+
+def items_json(prefix: str, count: int = 4, text: str = POEM, **overrides: str) -> str:
+    """{prefix}1~{prefix}{count} 키로 된 응답 JSON (overrides로 특정 키의 값을 바꿈)"""
+    items = {f"{prefix}{i}": f"제목 {i}\n\n{text}" for i in range(1, count + 1)}
+    items.update(overrides)
+    return json.dumps(items, ensure_ascii=False)
+
+
+class FakeAsyncOpenAI:
+    """
+    Responses / Chat Completions 호출을 reply(kwargs)의 텍스트로 답하는 대체 클라이언트
+    - reply는 요청 인자(prompt_cache_key, model, input 등)를 보고 응답 텍스트를 고름
+    - stream=True이면 텍스트를 chunk_size 글자씩 output_text.delta 이벤트로 보냄
+    - 예외를 돌려주면 그 예외를 던짐 (첫 조각 전 실패 재현)
+    - incomplete_reason을 정하면 응답을 미완료(예: "max_output_tokens")로 끝냄
+    """
+
+    api_key = "test"
+
+    def __init__(self, reply: Callable[[Dict[str, Any]], Any], chunk_size: int = 16):
+        self.reply = reply
+        self.chunk_size = chunk_size
+        self.incomplete_reason: Optional[str] = None
+        self.calls: List[Dict[str, Any]] = []
+        self.responses = SimpleNamespace(create=self._responses_create)
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._chat_create))
+
+    def _answer(self, kwargs: Dict[str, Any]) -> str:
+        self.calls.append(kwargs)
+        answer = self.reply(kwargs)
+        if isinstance(answer, BaseException):
+            raise answer
+        return answer
+
+    async def _responses_create(self, **kwargs: Any) -> Any:
+        text = self._answer(kwargs)
+        usage = SimpleNamespace(
+            input_tokens=1200, output_tokens=400,
+            input_tokens_details=SimpleNamespace(cached_tokens=0),
+            output_tokens_details=SimpleNamespace(reasoning_tokens=0),
+        )
+        incomplete = SimpleNamespace(reason=self.incomplete_reason) if self.incomplete_reason else None
+        if kwargs.get("stream"):
+            return _FakeEventStream(text, self.chunk_size, SimpleNamespace(usage=usage, incomplete_details=incomplete))
+        return SimpleNamespace(output_text=text, usage=usage, incomplete_details=incomplete)
+
+    async def _chat_create(self, **kwargs: Any) -> Any:
+        text = self._answer(kwargs)
+        usage = SimpleNamespace(
+            prompt_tokens=1200, completion_tokens=400,
+            prompt_tokens_details=SimpleNamespace(cached_tokens=0),
+            completion_tokens_details=SimpleNamespace(reasoning_tokens=0),
+        )
+        message = SimpleNamespace(content=text)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message, finish_reason="stop")], usage=usage)
+
+    async def close(self) -> None:
+        pass
+
+
+class _FakeEventStream:
+    def __init__(self, text: str, chunk_size: int, response: Any):
+        self.text = text
+        self.chunk_size = chunk_size
+        self.response = response
+
+    async def __aenter__(self) -> "_FakeEventStream":
+        return self
+
+    async def __aexit__(self, *exc: Any) -> bool:
+        return False
+
+    def __aiter__(self):
+        return self._events()
+
+    async def _events(self):
+        for i in range(0, len(self.text), self.chunk_size):
+            yield SimpleNamespace(type="response.output_text.delta", delta=self.text[i:i + self.chunk_size])
+        done = "response.incomplete" if self.response.incomplete_details else "response.completed"
+        yield SimpleNamespace(type=done, response=self.response)
@@ -0,0 +1,192 @@
+# test_circuit_breaker.py
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from circuit_breaker import CircuitBreaker
+from fakes import openai_status_error
+from llm_adapters import GenOptions
+from llm_admission import LLMOverloadedError
+from llm_client_registry import LLMClientRegistry, UnsupportedModelError
+
+PRIMARY = "gpt-5-mini-2025-08-07"
+FALLBACK = "gpt-4o-mini"
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("circuit_breaker.time.monotonic", lambda: now[0])
+    return now
+
+
+def _breaker(**kwargs) -> CircuitBreaker:
+    options = {"failure_rate": 0.5, "p95_seconds": 5.0, "window_size": 4, "min_calls": 4, "open_seconds": 30.0}
+    options.update(kwargs)
+    return CircuitBreaker(**options)
+
+
+def test_opens_on_failure_rate_once_min_calls_are_in(clock):
+    breaker = _breaker()
+    for ok in (True, False, True):
+        breaker.record(ok, 0.1)
+    assert breaker.state == CircuitBreaker.CLOSED
+
+    breaker.record(False, 0.1)
+
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow()
+    assert breaker.stats()["rejected"] == 1
+
+
+def test_opens_on_p95_latency(clock):
+    breaker = _breaker()
+    for _ in range(4):
+        breaker.record(True, 6.0)
+
+    assert breaker.state == CircuitBreaker.OPEN
+
+
+def test_half_open_probe_closes_on_fast_success(clock):
+    breaker = _breaker()
+    for _ in range(4):
+        breaker.record(False, 0.1)
+
+    clock[0] += 30
+    assert breaker.allow()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert not breaker.allow()  # 시험 호출은 한 번만
+
+    breaker.record(True, 0.1)
+
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.allow()
+
+
+def test_half_open_probe_reopens_on_failure_or_slow_success(clock):
+    breaker = _breaker()
+    for _ in range(4):
+        breaker.record(False, 0.1)
+    clock[0] += 30
+    breaker.allow()
+
+    breaker.record(True, 6.0)
+
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.stats()["opened"] == 2
+
+
+def test_lost_probe_is_replaced_after_open_seconds(clock):
+    breaker = _breaker()
+    for _ in range(4):
+        breaker.record(False, 0.1)
+    clock[0] += 30
+    assert breaker.allow()
+
+    clock[0] += 30
+
+    assert breaker.allow()
+
+
+def test_late_results_while_open_are_ignored(clock):
+    breaker = _breaker()
+    for _ in range(4):
+        breaker.record(False, 0.1)
+
+    breaker.record(True, 0.1)
+
+    assert breaker.stats()["calls_in_window"] == 0
+
+
+# ======================
+# 레지스트리 대체 경로
+# ======================
+def _registry() -> LLMClientRegistry:
+    return LLMClientRegistry(api_key="test", hedging=False, fallback_models=[FALLBACK])
+
+
+def _factory(client, model, async_client):
+    return SimpleNamespace(model=model)
+
+
+def _opt() -> GenOptions:
+    return GenOptions(model=PRIMARY, reasoning_effort="low", max_output_tokens=100)
+
+
+def test_transient_error_falls_back_to_the_next_model():
+    registry = _registry()
+    tried = []
+
+    async def invoke(adapter, opt):
+        tried.append(opt.model)
+        if adapter.model == PRIMARY:
+            raise openai_status_error(500)
+        return opt
+
+    result = asyncio.run(registry.acomplete(_opt(), _factory, invoke))
+
+    assert tried == [PRIMARY, FALLBACK]
+    assert result.model == FALLBACK and result.max_tokens == 100
+
+
+def test_request_errors_do_not_fall_back():
+    registry = _registry()
+    tried = []
+
+    async def invoke(adapter, opt):
+        tried.append(opt.model)
+        raise openai_status_error(400)
+
+    with pytest.raises(Exception) as error:
+        asyncio.run(registry.acomplete(_opt(), _factory, invoke))
+
+    assert error.value.status_code == 400
+    assert tried == [PRIMARY]
+
+
+def test_open_breakers_skip_models_and_all_open_is_overloaded():
+    registry = _registry()
+    for model in (PRIMARY, FALLBACK):
+        breaker = registry.breaker(model)
+        while breaker.state != CircuitBreaker.OPEN:
+            breaker.record(False, 0.1)
+
+    async def invoke(adapter, opt):
+        raise AssertionError("차단된 모델은 호출하지 않음")
+
+    with pytest.raises(LLMOverloadedError):
+        asyncio.run(registry.acomplete(_opt(), _factory, invoke))
+
+
+def test_unsupported_model_is_rejected_before_any_call():
+    registry = _registry()
+
+    with pytest.raises(UnsupportedModelError):
+        asyncio.run(registry.acomplete(GenOptions(model="gpt-unknown"), _factory, lambda adapter, opt: None))
+    assert "gpt-unknown" not in registry.stats()["breakers"]
+
+
+def test_stream_falls_back_only_before_the_first_delta():
+    registry = _registry()
+
+    def open_stream(fail_after: int):
+        async def deltas(adapter, opt):
+            for i in range(3):
+                if adapter.model == PRIMARY and i == fail_after:
+                    raise openai_status_error(429)
+                yield f"{adapter.model}:{i}"
+        return deltas
+
+    async def collect(stream):
+        return [delta async for delta in stream]
+
+    before_first = registry.astream(_opt(), _factory, open_stream(fail_after=0))
+    assert asyncio.run(collect(before_first)) == [f"{FALLBACK}:0", f"{FALLBACK}:1", f"{FALLBACK}:2"]
+    assert before_first.model == FALLBACK
+
+    after_first = registry.astream(_opt(), _factory, open_stream(fail_after=1))
+    with pytest.raises(Exception) as error:
+        asyncio.run(collect(after_first))
+    assert error.value.status_code == 429
+    assert after_first.model == PRIMARY
@@ -0,0 +1,77 @@
+# test_credit_balance_cache.py
+import asyncio
+
+from credit_repository import CreditBalance, CreditBalanceCache, CreditRepository
+from fakes import FakeSupabase
+
+
+def test_get_returns_stored_balance_until_ttl_expires(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr("credit_repository.time.monotonic", lambda: now[0])
+    cache = CreditBalanceCache(ttl_seconds=30, max_size=10)
+    cache.put("u1", CreditBalance(free_credits=2, paid_credits=1))
+
+    assert cache.get("u1").total == 3
+    now[0] += 30
+    assert cache.get("u1") is None
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+    assert cache.stats()["size"] == 0
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = CreditBalanceCache(ttl_seconds=30, max_size=2)
+    cache.put("u1", CreditBalance(1, 0))
+    cache.put("u2", CreditBalance(2, 0))
+    cache.get("u1")
+    cache.put("u3", CreditBalance(3, 0))
+
+    assert cache.peek("u2") is None
+    assert cache.peek("u1").total == 1
+    assert cache.stats()["evictions"] == 1
+
+
+def test_debit_spends_free_credits_first_and_keeps_deleted_at():
+    cache = CreditBalanceCache(ttl_seconds=30, max_size=10)
+    cache.put("u1", CreditBalance(free_credits=1, paid_credits=5, deleted_at=None))
+
+    cache.debit("u1", 2)
+
+    assert cache.peek("u1") == CreditBalance(free_credits=0, paid_credits=4)
+    cache.debit("missing", 1)
+    assert cache.peek("missing") is None
+
+
+def test_zero_size_cache_stores_nothing():
+    cache = CreditBalanceCache(ttl_seconds=30, max_size=0)
+    cache.put("u1", CreditBalance(1, 0))
+
+    assert cache.get("u1") is None
+
+
+def test_reserve_rpc_result_refreshes_the_cache():
+    db = FakeSupabase()
+    db.add_user("u1", free_credits=1)
+    repo = CreditRepository(db, balance_cache=CreditBalanceCache(ttl_seconds=30, max_size=10))
+
+    async def scenario():
+        first = await repo.reserve("u1", ttl_seconds=120)
+        second = await repo.reserve("u1", ttl_seconds=120)
+        return first, second
+
+    first, second = asyncio.run(scenario())
+
+    assert first["status"] == "ok"
+    assert second["status"] == "insufficient"
+    assert repo.cached_balance("u1").total == 1
+    assert db.calls == ["reserve_user_credit", "reserve_user_credit"]
+
+
+def test_unknown_user_is_not_cached():
+    repo = CreditRepository(FakeSupabase(), balance_cache=CreditBalanceCache(ttl_seconds=30, max_size=10))
+    repo.balance_cache.put("ghost", CreditBalance(1, 0))
+
+    hold = asyncio.run(repo.reserve("ghost", ttl_seconds=120))
+
+    assert hold["status"] == "not_found"
+    assert repo.balance_cache.peek("ghost") is None
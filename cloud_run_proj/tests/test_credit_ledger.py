@@ -0,0 +1,121 @@
+# test_credit_ledger.py
+import asyncio
+
+import pytest
+
+from credit_ledger import CreditLedger
+from credit_repository import CreditBalanceCache, CreditRepository
+from fakes import FakeSupabase
+
+
+def _ledger(db: FakeSupabase, batch_size: int = 200, flush_interval_seconds: float = 60) -> CreditLedger:
+    repo = CreditRepository(db, balance_cache=CreditBalanceCache(ttl_seconds=30, max_size=100))
+    return CreditLedger(repo, flush_interval_seconds=flush_interval_seconds, batch_size=batch_size)
+
+
+async def _reserve_and_commit(ledger: CreditLedger, user_id: str) -> None:
+    hold = await ledger.repo.reserve(user_id, ttl_seconds=120)
+    await ledger.commit(user_id, hold["hold_id"])
+
+
+def test_commit_is_durable_before_flush_and_debits_the_cache():
+    db = FakeSupabase()
+    db.add_user("u1", free_credits=3)
+    ledger = _ledger(db)
+
+    asyncio.run(_reserve_and_commit(ledger, "u1"))
+
+    # 확정 예약은 DB에 남아 있고 잔액 반영 전이지만 캐시는 이미 차감됨
+    assert len(db.committed) == 1
+    assert db.balance("u1") == 3
+    assert ledger.repo.cached_balance("u1").total == 2
+    assert ledger.stats()["unsettled"] == 1
+
+
+def test_flush_settles_committed_holds_in_one_rpc():
+    db = FakeSupabase()
+    db.add_user("u1", free_credits=1, paid_credits=2)
+    db.add_user("u2", free_credits=2)
+    ledger = _ledger(db)
+
+    async def scenario():
+        for user_id in ("u1", "u1", "u2"):
+            await _reserve_and_commit(ledger, user_id)
+        return await ledger.flush()
+
+    settled = asyncio.run(scenario())
+
+    assert settled == 3
+    assert db.calls.count("settle_credit_holds") == 1
+    assert (db.users["u1"]["free_credits"], db.users["u1"]["paid_credits"]) == (0, 1)
+    assert db.balance("u2") == 1
+    assert db.holds == {} and len(db.ledger) == 3
+    assert ledger.repo.cached_balance("u1").total == 1
+    assert ledger.stats()["unsettled"] == 0
+
+
+def test_failed_commit_raises_and_is_not_counted():
+    db = FakeSupabase()
+    db.add_user("u1", free_credits=1)
+    db.failing.add("commit_credit_hold")
+    ledger = _ledger(db)
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(_reserve_and_commit(ledger, "u1"))
+
+    assert ledger.stats()["commit_failures"] == 1
+    assert ledger.stats()["unsettled"] == 0
+
+
+def test_failed_flush_keeps_commits_for_the_next_flush():
+    db = FakeSupabase()
+    db.add_user("u1", free_credits=2)
+    ledger = _ledger(db)
+
+    async def scenario():
+        await _reserve_and_commit(ledger, "u1")
+        db.failing.add("settle_credit_holds")
+        first = await ledger.flush()
+        db.failing.clear()
+        return first, await ledger.flush()
+
+    first, second = asyncio.run(scenario())
+
+    assert (first, second) == (0, 1)
+    assert ledger.stats()["flush_failures"] == 1
+    assert db.balance("u1") == 1
+
+
+def test_reaching_batch_size_starts_a_background_flush():
+    db = FakeSupabase()
+    db.add_user("u1", free_credits=5)
+    ledger = _ledger(db, batch_size=2)
+
+    async def scenario():
+        await _reserve_and_commit(ledger, "u1")
+        await _reserve_and_commit(ledger, "u1")
+        await ledger._flush_task
+
+    asyncio.run(scenario())
+
+    assert db.balance("u1") == 3
+    assert ledger.stats()["settled"] == 2
+
+
+def test_start_settles_holds_left_by_a_previous_instance():
+    db = FakeSupabase()
+    db.add_user("u1", free_credits=2)
+    previous = _ledger(db)
+    asyncio.run(_reserve_and_commit(previous, "u1"))
+
+    # 이전 인스턴스가 정산 전에 죽어도 확정 예약은 DB에 있으므로 새 인스턴스가 기동 시 정산
+    async def scenario():
+        ledger = _ledger(db)
+        await ledger.start()
+        await ledger.aclose()
+        return ledger
+
+    ledger = asyncio.run(scenario())
+
+    assert db.balance("u1") == 1
+    assert ledger.stats()["settled"] == 1
@@ -0,0 +1,141 @@
+# test_generate_endpoints.py
+import json
+
+from circuit_breaker import CircuitBreaker
+from fakes import POEM, items_json, openai_status_error
+
+APOLOGY = "죄송합니다. 요청하신 작가의 문체를 그대로 재현할 수는 없지만"
+
+
+def _poem_request(user_id: str = "u1", **overrides) -> dict:
+    body = {"user_id": user_id, "style": "서정적", "author_style": "윤동주", "keywords": ["봄", "바람"], "length": "4행"}
+    body.update(overrides)
+    return body
+
+
+def _quote_request(user_id: str = "u1", **overrides) -> dict:
+    body = {"user_id": user_id, "style": "희망적인", "author_style": "괴테", "keywords": ["길"], "length": "짧게 1-2문장"}
+    body.update(overrides)
+    return body
+
+
+def test_generate_poems_commits_the_reserved_credit(service):
+    service.db.add_user("u1", free_credits=3)
+
+    response = service.post("/poems/generate", _poem_request())
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["poems"] == [f"제목 {i}\n\n{POEM}" for i in range(1, 5)]
+    assert body["remaining_credits"] == 2
+    assert body["ai_model_used"] == "gpt-5-mini-2025-08-07"
+    assert len(service.db.committed) == 1
+    assert service.ledger.stats()["committed"] == 1
+
+
+def test_unknown_user_is_rejected_before_calling_openai(service):
+    response = service.post("/poems/generate", _poem_request("ghost"))
+
+    assert response.status_code == 404
+    assert service.openai.calls == []
+
+
+def test_insufficient_credit_is_rejected_from_cache_on_the_next_request(service):
+    service.db.add_user("u1", free_credits=0)
+
+    first = service.post("/poems/generate", _poem_request())
+    second = service.post("/poems/generate", _poem_request())
+
+    assert (first.status_code, second.status_code) == (400, 400)
+    # 첫 요청의 예약 RPC 결과로 캐시가 채워져 두 번째는 DB 왕복 없이 거절
+    assert service.db.calls == ["reserve_user_credit"]
+    assert service.openai.calls == []
+
+
+def test_deleted_user_is_rejected(service):
+    service.db.add_user("u1", free_credits=3, deleted_at="2026-01-01T00:00:00")
+
+    response = service.post("/poems/generate", _poem_request())
+
+    assert response.status_code == 403
+
+
+def test_unrepairable_response_releases_the_hold(service):
+    service.db.add_user("u1", free_credits=1)
+    # 4편 모두 거절되면 다시 생성할 슬롯이 SALVAGE_MAX_SLOTS를 넘어 복구하지 않음
+    service.replies["poem"] = items_json("poem", text=APOLOGY)
+
+    response = service.post("/poems/generate", _poem_request())
+
+    assert response.status_code == 422
+    assert response.json()["detail"]["error_code"] == "INAPPROPRIATE_RESPONSE"
+    assert service.db.holds == {} and service.db.committed == set()
+    assert service.ledger.stats()["committed"] == 0
+    assert len(service.openai.calls) == 1
+
+
+def test_truncated_response_is_salvaged_with_slot_calls(service):
+    service.db.add_user("u1", free_credits=1)
+    service.replies["poem"] = items_json("poem").rsplit(', "poem4"', 1)[0]
+    service.replies["poem-slot"] = json.dumps({"poem": f"새 시\n\n{POEM}"}, ensure_ascii=False)
+
+    response = service.post("/poems/generate", _poem_request())
+
+    assert response.status_code == 200
+    assert response.json()["poems"][3] == f"새 시\n\n{POEM}"
+    assert len(service.db.committed) == 1
+
+
+def test_openai_request_error_releases_the_hold(service):
+    service.db.add_user("u1", free_credits=1)
+    service.replies["poem"] = openai_status_error(400)
+
+    response = service.post("/poems/generate", _poem_request())
+
+    assert response.status_code == 500
+    assert service.db.holds == {}
+
+
+def test_open_breakers_return_503_with_retry_after(service):
+    service.db.add_user("u1", free_credits=1)
+    breaker = service.registry.breaker("gpt-5-mini-2025-08-07")
+    while breaker.state != CircuitBreaker.OPEN:
+        breaker.record(False, 0.1)
+
+    response = service.post("/poems/generate", _poem_request())
+
+    assert response.status_code == 503
+    assert response.json()["detail"]["error_code"] == "LLM_OVERLOADED"
+    assert int(response.headers["Retry-After"]) >= 1
+    assert service.db.holds == {}
+
+
+def test_cached_result_is_served_but_still_charged(service):
+    service.db.add_user("u1", free_credits=3)
+
+    first = service.post("/poems/generate", _poem_request())
+    second = service.post("/poems/generate", _poem_request(keywords=["바람", " 봄 "]))
+
+    assert second.status_code == 200
+    assert second.json()["poems"] == first.json()["poems"]
+    assert len(service.openai.calls) == 1
+    assert len(service.db.committed) == 2
+
+
+def test_generate_quotes(service):
+    service.db.add_user("u1", paid_credits=2)
+
+    response = service.post("/quotes/generate", _quote_request())
+
+    assert response.status_code == 200
+    assert len(response.json()["quotes"]) == 4
+    assert response.json()["remaining_credits"] == 1
+
+
+def test_unsupported_quote_model_is_rejected_before_reserving(service):
+    service.db.add_user("u1", free_credits=1)
+
+    response = service.post("/quotes/generate", _quote_request(ai_model="gpt-unknown"))
+
+    assert response.status_code == 400
+    assert service.db.calls == []
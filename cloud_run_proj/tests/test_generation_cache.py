@@ -0,0 +1,78 @@
+# test_generation_cache.py
+import unicodedata
+
+from generation_cache import GenerationKey, GenerationResultCache
+
+
+def _key(*keywords: str, style: str = "서정적") -> GenerationKey:
+    return GenerationKey.normalize("poem", style, "윤동주", keywords or ("봄",), "8행", "gpt-5-mini-2025-08-07", "low")
+
+
+def test_key_ignores_spacing_order_duplicates_and_composed_hangul():
+    decomposed = unicodedata.normalize("NFD", "봄")  # 자모가 분리된 '봄'
+    assert _key("바람", "봄") == _key(f" {decomposed} ", "바람", "봄", "")
+    assert _key("봄", style="서정적") == _key("봄", style="  서정적 ")
+    assert _key("봄") != _key("봄", style="희망적")
+
+
+def test_misses_until_all_variants_are_stored_then_rotates():
+    cache = GenerationResultCache(ttl_seconds=60, max_keys=10, variants=3)
+    key = _key()
+    for i in range(3):
+        assert cache.get(key) is None
+        cache.put(key, [f"묶음{i}"])
+
+    served = [cache.get(key)[0] for _ in range(4)]
+
+    assert served == ["묶음0", "묶음1", "묶음2", "묶음0"]
+    assert cache.stats()["hits"] == 4
+
+
+def test_put_beyond_variants_replaces_the_oldest_set():
+    cache = GenerationResultCache(ttl_seconds=60, max_keys=10, variants=2)
+    key = _key()
+    for i in range(3):
+        cache.put(key, [f"묶음{i}"])
+
+    assert {cache.get(key)[0] for _ in range(2)} == {"묶음1", "묶음2"}
+
+
+def test_expired_sets_are_refilled_by_real_generation(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr("generation_cache.time.monotonic", lambda: now[0])
+    cache = GenerationResultCache(ttl_seconds=10, max_keys=10, variants=2)
+    key = _key()
+    cache.put(key, ["오래된"])
+    now[0] = 5.0
+    cache.put(key, ["새것"])
+    assert cache.get(key) is not None
+
+    now[0] = 12.0
+
+    assert cache.get(key) is None
+    assert cache.stats()["expirations"] == 1
+    cache.put(key, ["다시"])
+    assert {cache.get(key)[0] for _ in range(2)} == {"새것", "다시"}
+
+
+def test_least_recently_used_key_is_evicted():
+    cache = GenerationResultCache(ttl_seconds=60, max_keys=2, variants=1)
+    first, second, third = _key("하나"), _key("둘"), _key("셋")
+    cache.put(first, ["1"])
+    cache.put(second, ["2"])
+    cache.get(first)
+    cache.put(third, ["3"])
+
+    assert cache.get(second) is None
+    assert cache.get(first) == ["1"]
+    assert cache.stats()["evictions"] == 1
+
+
+def test_returned_list_is_a_copy():
+    cache = GenerationResultCache(ttl_seconds=60, max_keys=10, variants=1)
+    key = _key()
+    cache.put(key, ["원본"])
+
+    cache.get(key).append("변경")
+
+    assert cache.get(key) == ["원본"]
@@ -0,0 +1,106 @@
+# test_hedging.py
+import asyncio
+
+from hedging import HedgePolicy
+
+
+def _warm_policy(**kwargs) -> HedgePolicy:
+    """지연 표본이 0.05초로 채워져 헤징 대기 시간이 0.05초인 정책"""
+    options = {"min_samples": 5, "min_delay_seconds": 0.0, "budget_ratio": 1.0, "budget_burst": 10.0}
+    options.update(kwargs)
+    policy = HedgePolicy(**options)
+    for _ in range(options["min_samples"]):
+        policy.observe(0.05)
+    return policy
+
+
+def test_no_hedge_until_enough_samples():
+    policy = HedgePolicy(min_samples=5, min_delay_seconds=0.0, budget_ratio=1.0)
+    calls = []
+
+    async def call(started: asyncio.Event) -> str:
+        started.set()
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "ok"
+
+    assert asyncio.run(policy.run(call)) == "ok"
+    assert policy.hedge_delay() is None
+    assert len(calls) == 1
+
+
+def test_slow_primary_is_overtaken_and_cancelled():
+    policy = _warm_policy()
+    attempts = []
+    cancelled = []
+
+    async def call(started: asyncio.Event) -> str:
+        started.set()
+        name = "primary" if not attempts else "hedge"
+        attempts.append(name)
+        try:
+            await asyncio.sleep(1.0 if name == "primary" else 0.01)
+        except asyncio.CancelledError:
+            cancelled.append(name)
+            raise
+        return name
+
+    async def scenario():
+        result = await policy.run(call)
+        await asyncio.sleep(0)
+        return result
+
+    assert asyncio.run(scenario()) == "hedge"
+    assert cancelled == ["primary"]
+    assert policy.stats()["hedges_fired"] == 1
+    assert policy.stats()["hedges_won"] == 1
+
+
+def test_hedge_delay_starts_when_the_call_starts():
+    policy = _warm_policy()
+
+    async def call(started: asyncio.Event) -> str:
+        # 입장 제어 대기열에서 헤징 대기 시간보다 오래 기다린 뒤 호출은 빨리 끝남
+        await asyncio.sleep(0.2)
+        started.set()
+        await asyncio.sleep(0.01)
+        return "ok"
+
+    assert asyncio.run(policy.run(call)) == "ok"
+    assert policy.stats()["hedges_fired"] == 0
+
+
+def test_token_bucket_limits_hedges_to_recent_traffic():
+    policy = _warm_policy(budget_ratio=0.5, budget_burst=1.0)
+
+    async def call(started: asyncio.Event) -> str:
+        started.set()
+        await asyncio.sleep(0.1)
+        return "ok"
+
+    async def scenario():
+        for _ in range(4):
+            await policy.run(call)
+
+    asyncio.run(scenario())
+
+    stats = policy.stats()
+    # 호출마다 0.5개씩 쌓여 두 번째와 네 번째 호출에서만 복제 가능
+    assert stats["hedges_fired"] == 2
+    assert stats["hedges_skipped_budget"] == 2
+    assert stats["budget_tokens"] == 0.0
+
+
+def test_budget_does_not_accumulate_past_burst():
+    policy = HedgePolicy(budget_ratio=1.0, budget_burst=3.0)
+
+    async def call(started: asyncio.Event) -> str:
+        return "ok"
+
+    async def scenario():
+        for _ in range(10):
+            await policy.run(call)
+
+    asyncio.run(scenario())
+
+    assert policy.stats()["budget_tokens"] == 3.0
@@ -0,0 +1,104 @@
+# test_incremental_json.py
+import json
+
+from incremental_json import IncrementalItemParser, ParseStats
+
+KEYS = ("poem1", "poem2", "poem3", "poem4")
+
+
+def _document(**items: str) -> str:
+    return json.dumps(items, ensure_ascii=False)
+
+
+def _feed_in_chunks(parser: IncrementalItemParser, text: str, size: int):
+    completed = []
+    for i in range(0, len(text), size):
+        completed.extend(parser.feed(text[i:i + size]))
+    return completed
+
+
+def test_items_complete_in_order_as_chunks_arrive():
+    parser = IncrementalItemParser(KEYS)
+    text = _document(poem1="하나", poem2="둘", poem3="셋", poem4="넷")
+
+    completed = _feed_in_chunks(parser, text, 3)
+
+    assert [(item.key, item.index, item.text) for item in completed] == [
+        ("poem1", 1, "하나"), ("poem2", 2, "둘"), ("poem3", 3, "셋"), ("poem4", 4, "넷"),
+    ]
+    assert parser.done
+    assert parser.values() == ["하나", "둘", "셋", "넷"]
+
+
+def test_item_is_returned_once_its_value_closes():
+    parser = IncrementalItemParser(KEYS)
+
+    assert parser.feed('{"poem1": "봄바') == []
+    completed = parser.feed('람", "poem2": "')
+
+    assert [item.text for item in completed] == ["봄바람"]
+    assert not parser.done
+
+
+def test_escapes_split_across_chunks():
+    parser = IncrementalItemParser(("poem1",))
+    # ensure_ascii 기본값으로 \uXXXX 이스케이프(이모지는 서러게이트 쌍)를 만들고,
+    # 한 글자씩 넣어 모든 이스케이프가 조각 경계에서 잘리게 함
+    text = json.dumps({"poem1": '첫 줄\n"인용" \\ 😀'})
+    completed = _feed_in_chunks(parser, text, 1)
+
+    assert [item.text for item in completed] == ['첫 줄\n"인용" \\ 😀']
+
+
+def test_text_outside_top_level_object_is_ignored():
+    parser = IncrementalItemParser(("poem1", "poem2"))
+    text = '설명 "무시"\n```json\n' + _document(poem1="```코드```", poem2="끝") + "\n```"
+
+    parser.feed(text)
+
+    assert parser.items == {"poem1": "```코드```", "poem2": "끝"}
+
+
+def test_unknown_and_nested_keys_are_ignored():
+    parser = IncrementalItemParser(("poem1",))
+
+    parser.feed('{"meta": {"poem1": "중첩"}, "extra": "무시", "poem1": "진짜"}')
+
+    assert parser.items == {"poem1": "진짜"}
+
+
+def test_validation_rejects_items_but_keeps_parsing():
+    parser = IncrementalItemParser(KEYS, validate=lambda text: not text.startswith("죄송"))
+    text = _document(poem1="죄송합니다", poem2="둘", poem3="죄송하지만", poem4="넷")
+
+    completed = parser.feed(text)
+
+    assert [item.valid for item in completed] == [False, True, False, True]
+    assert parser.rejected.key == "poem1"
+    assert parser.rejected_keys == ["poem1", "poem3"]
+    assert parser.valid_items() == {"poem2": "둘", "poem4": "넷"}
+    assert parser.done
+
+
+def test_truncated_document_is_not_done():
+    parser = IncrementalItemParser(KEYS)
+
+    parser.feed(_document(poem1="하나", poem2="둘")[:-1] + ', "poem3": "잘린')
+
+    assert not parser.done
+    assert parser.values() == ["하나", "둘", "", ""]
+
+
+def test_parse_stats_counts_per_kind_and_mode():
+    stats = ParseStats()
+    stats.record("json_example", None)
+    stats.record("json_example", "PARSING_FAILED")
+    stats.record("json_schema", "INAPPROPRIATE_RESPONSE", kind="slot")
+    stats.record("json_example", None, kind="repair")
+
+    result = stats.stats()
+
+    assert result["primary"]["json_example"]["parsed"] == 1
+    assert result["primary"]["json_example"]["parse_failure_rate"] == 0.5
+    assert result["slot"]["json_schema"]["inappropriate"] == 1
+    assert result["repair"]["json_example"]["parse_failure_rate"] == 0.0
@@ -0,0 +1,198 @@
+# test_llm_admission.py
+import asyncio
+import time
+
+import openai
+import pytest
+
+from fakes import openai_status_error
+from llm_admission import (
+    AdaptiveLimiter,
+    LLMDeadlineExceededError,
+    LLMOverloadedError,
+    is_transient_error,
+    request_deadline,
+)
+
+
+def _limiter(**kwargs) -> AdaptiveLimiter:
+    options = {"max_limit": 2, "min_limit": 1, "cooldown_seconds": 0.0, "backoff_base_seconds": 0.001}
+    options.update(kwargs)
+    return AdaptiveLimiter(**options)
+
+
+def test_in_flight_calls_never_exceed_the_limit():
+    limiter = _limiter(initial_limit=2, max_limit=2)
+    active, peak = 0, 0
+
+    async def call() -> None:
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        await asyncio.sleep(0.02)
+        active -= 1
+
+    async def scenario():
+        await asyncio.gather(*(limiter.run(call) for _ in range(6)))
+
+    asyncio.run(scenario())
+
+    assert peak == 2
+    assert limiter.stats()["admitted"] == 6
+
+
+def test_full_queue_is_rejected_immediately():
+    limiter = _limiter(max_limit=1, max_queue=1)
+
+    async def call() -> None:
+        await asyncio.sleep(0.05)
+
+    async def scenario():
+        # 첫 호출이 자리를 차지한 뒤 두 번째는 대기열에, 세 번째는 대기열이 차 있어 거절
+        holder = asyncio.create_task(limiter.run(call))
+        await asyncio.sleep(0.01)
+        waiting = asyncio.create_task(limiter.run(call))
+        await asyncio.sleep(0.01)
+        with pytest.raises(LLMOverloadedError):
+            await limiter.run(call)
+        await asyncio.gather(holder, waiting)
+
+    asyncio.run(scenario())
+
+    assert limiter.stats()["rejected_queue_full"] == 1
+
+
+def test_queue_wait_timeout_is_overloaded_not_deadline():
+    limiter = _limiter(max_limit=1, max_queue_wait_seconds=0.02)
+
+    async def call() -> None:
+        await asyncio.sleep(0.1)
+
+    async def scenario():
+        return await asyncio.gather(limiter.run(call), limiter.run(call), return_exceptions=True)
+
+    _, second = asyncio.run(scenario())
+
+    assert type(second) is LLMOverloadedError
+    assert limiter.stats()["rejected_wait_timeout"] == 1
+
+
+def test_success_increases_and_rate_limit_decreases_the_limit():
+    limiter = _limiter(max_limit=10, min_limit=1, initial_limit=4, decrease_factor=0.5)
+
+    for _ in range(8):
+        limiter.record_success(0.1)
+    assert limiter.limit == 5
+
+    limiter.record_rate_limited()
+    assert limiter.limit == 2
+    assert limiter.stats()["rate_limited"] == 1
+
+
+def test_latency_baselines_are_kept_per_workload():
+    limiter = _limiter(max_limit=64, initial_limit=10, min_samples=5)
+    for _ in range(5):
+        limiter.record_success(1.0, "poem")
+        limiter.record_success(0.1, "poem-slot")
+
+    # 느린 작업 종류가 섞여도 그 종류의 평소 지연이면 혼잡으로 보지 않음
+    for _ in range(10):
+        limiter.record_success(1.0, "poem")
+    assert limiter.stats()["decreases"] == 0
+
+    # 같은 종류 안에서 평소의 latency_tolerance배를 넘으면 상한을 줄임
+    for _ in range(10):
+        limiter.record_success(1.0, "poem-slot")
+    assert limiter.stats()["decreases"] == 1
+    assert set(limiter.stats()["latency_p50_seconds"]) == {"poem", "poem-slot"}
+
+
+def test_rate_limited_call_is_retried_after_backoff():
+    limiter = _limiter()
+    attempts = []
+
+    async def call() -> str:
+        attempts.append(time.monotonic())
+        if len(attempts) == 1:
+            raise openai_status_error(429, {"retry-after-ms": "20"})
+        return "ok"
+
+    assert asyncio.run(limiter.run(call)) == "ok"
+    assert attempts[1] - attempts[0] >= 0.02
+    assert limiter.stats()["retries"] == 1
+    assert limiter.stats()["rate_limited"] == 1
+
+
+def test_non_transient_errors_are_not_retried():
+    limiter = _limiter()
+    attempts = []
+
+    async def call() -> None:
+        attempts.append(1)
+        raise openai_status_error(400)
+
+    with pytest.raises(openai.BadRequestError):
+        asyncio.run(limiter.run(call))
+    assert len(attempts) == 1
+
+
+def test_deadline_cuts_a_slow_call():
+    limiter = _limiter()
+
+    async def call() -> None:
+        await asyncio.sleep(1.0)
+
+    async def scenario():
+        with request_deadline(0.05):
+            await limiter.run(call)
+
+    start = time.monotonic()
+    with pytest.raises(LLMDeadlineExceededError):
+        asyncio.run(scenario())
+    assert time.monotonic() - start < 0.5
+    assert limiter.stats()["deadline_exceeded"] == 1
+
+
+def test_deadline_caps_the_queue_wait():
+    limiter = _limiter(max_limit=1, max_queue_wait_seconds=10.0)
+
+    async def slow() -> None:
+        await asyncio.sleep(0.3)
+
+    async def scenario():
+        holder = asyncio.create_task(limiter.run(slow))
+        await asyncio.sleep(0.01)
+        with request_deadline(0.05):
+            with pytest.raises(LLMDeadlineExceededError):
+                await limiter.run(slow)
+        await holder
+
+    asyncio.run(scenario())
+
+    assert limiter.stats()["rejected_wait_timeout"] == 0
+
+
+def test_retry_is_skipped_when_backoff_passes_the_deadline():
+    limiter = _limiter()
+    attempts = []
+
+    async def call() -> None:
+        attempts.append(1)
+        raise openai_status_error(429, {"retry-after": "1"})
+
+    async def scenario():
+        with request_deadline(0.2):
+            await limiter.run(call)
+
+    with pytest.raises(openai.RateLimitError):
+        asyncio.run(scenario())
+    assert len(attempts) == 1
+    assert limiter.stats()["retries"] == 0
+
+
+def test_transient_error_classification():
+    assert is_transient_error(openai_status_error(429))
+    assert is_transient_error(openai_status_error(500))
+    assert is_transient_error(asyncio.TimeoutError())
+    assert not is_transient_error(openai_status_error(400))
+    assert not is_transient_error(ValueError())
@@ -0,0 +1,149 @@
+# test_salvage.py
+import asyncio
+import json
+
+import openai
+import pytest
+
+from fakes import POEM, FakeAsyncOpenAI, items_json, openai_status_error
+from llm_adapters import GenOptions
+from llm_admission import LLMOverloadedError
+from llm_client_registry import LLMClientRegistry
+from poem_generator_modern import PoemGenerator
+from quote_generator_modern import QuoteGenerator
+
+MODEL = "gpt-5-mini-2025-08-07"
+CONDITIONS = {"style": "서정적", "author_style": "윤동주", "keywords": ["봄", "바람"], "length": "4행"}
+APOLOGY = "죄송합니다. 요청하신 작가의 문체를 그대로 재현할 수는 없지만"
+
+
+def _opt() -> GenOptions:
+    return GenOptions(model=MODEL, reasoning_effort="low", max_output_tokens=500)
+
+
+def _registry(reply) -> LLMClientRegistry:
+    return LLMClientRegistry(async_client=FakeAsyncOpenAI(reply), hedging=False, fallback_models=[])
+
+
+def _calls(registry: LLMClientRegistry, cache_key: str) -> int:
+    return sum(1 for kwargs in registry.async_client.calls if kwargs.get("prompt_cache_key") == cache_key)
+
+
+def _truncated_poems() -> str:
+    """poem3은 사과문, poem4는 응답이 잘려 없는 4편 응답"""
+    return items_json("poem", poem3=APOLOGY).rsplit(', "poem4"', 1)[0]
+
+
+def test_valid_poems_need_no_repair():
+    registry = _registry(lambda kwargs: "")
+    generator = PoemGenerator(registry=registry, structured_output=False)
+
+    result = asyncio.run(generator.arepair_poems(items_json("poem"), **CONDITIONS, opt=_opt(), model_used=MODEL))
+
+    assert result["success"] and result["ai_model_used"] == MODEL
+    assert registry.async_client.calls == []
+
+
+def test_only_rejected_and_missing_poems_are_regenerated():
+    registry = _registry(lambda kwargs: json.dumps({"poem": f"새 시\n\n{POEM}"}, ensure_ascii=False))
+    generator = PoemGenerator(registry=registry, structured_output=False)
+
+    result = asyncio.run(generator.arepair_poems(_truncated_poems(), **CONDITIONS, opt=_opt(), model_used=MODEL))
+
+    assert result["success"]
+    assert result["repaired_slots"] == [3, 4]
+    assert result["poems"][:2] == [f"제목 1\n\n{POEM}", f"제목 2\n\n{POEM}"]
+    assert result["poems"][2:] == [f"새 시\n\n{POEM}"] * 2
+    assert result["ai_model_used"] == MODEL
+    assert _calls(registry, "poem-slot") == 2
+    stats = generator.parse_stats.stats()
+    assert stats["primary"]["json_example"]["inappropriate"] == 1
+    assert stats["slot"]["json_example"]["parsed"] == 2
+
+
+def test_slot_retries_then_gives_up_with_the_original_failure():
+    registry = _registry(lambda kwargs: json.dumps({"poem": APOLOGY}, ensure_ascii=False))
+    generator = PoemGenerator(registry=registry, structured_output=False)
+
+    result = asyncio.run(generator.arepair_poems(
+        _truncated_poems(), **CONDITIONS, opt=_opt(), model_used=MODEL, max_retries=1
+    ))
+
+    assert not result["success"]
+    assert result["error_code"] == "INAPPROPRIATE_RESPONSE"
+    # 두 슬롯 × (첫 시도 + 재시도 1번)
+    assert _calls(registry, "poem-slot") == 4
+
+
+def test_too_many_missing_poems_are_not_repaired():
+    registry = _registry(lambda kwargs: json.dumps({"poem": POEM}, ensure_ascii=False))
+    generator = PoemGenerator(registry=registry, structured_output=False)
+
+    result = asyncio.run(generator.arepair_poems(
+        items_json("poem", count=1), **CONDITIONS, opt=_opt(), model_used=MODEL, max_slots=2
+    ))
+
+    assert result["error_code"] == "PARSING_FAILED"
+    assert registry.async_client.calls == []
+
+
+def test_missing_quotes_are_requested_in_one_repair_call():
+    def reply(kwargs):
+        assert kwargs["prompt_cache_key"] == "quote-repair"
+        return json.dumps({"quote3": "다시 쓴 글귀 셋", "quote4": "다시 쓴 글귀 넷"}, ensure_ascii=False)
+
+    registry = _registry(reply)
+    generator = QuoteGenerator(registry=registry, structured_output=False)
+    content = json.dumps({"quote1": "글귀 하나", "quote2": "글귀 둘", "quote3": APOLOGY}, ensure_ascii=False)
+
+    result = asyncio.run(generator.arepair_quotes(content, **CONDITIONS, opt=_opt(), model_used=MODEL))
+
+    assert result["success"]
+    assert result["quotes"] == ["글귀 하나", "글귀 둘", "다시 쓴 글귀 셋", "다시 쓴 글귀 넷"]
+    assert result["repaired_slots"] == [3, 4]
+    assert len(registry.async_client.calls) == 1
+    assert "quote3" in registry.async_client.calls[0]["input"]
+    assert generator.parse_stats.stats()["repair"]["json_example"]["parsed"] == 1
+
+
+def test_failed_quote_repair_calls_keep_the_original_failure():
+    registry = _registry(lambda kwargs: openai_status_error(400))
+    generator = QuoteGenerator(registry=registry, structured_output=False)
+    content = json.dumps({"quote1": "글귀 하나"}, ensure_ascii=False)
+
+    result = asyncio.run(generator.arepair_quotes(content, **CONDITIONS, opt=_opt(), model_used=MODEL, max_retries=1))
+
+    assert result["error_code"] == "PARSING_FAILED"
+    assert len(registry.async_client.calls) == 2
+
+
+# ======================
+# fan-out 슬롯 재시도
+# ======================
+def test_fanout_slot_retries_transient_errors():
+    failures = iter([openai_status_error(500)])
+    registry = _registry(lambda kwargs: next(failures, None) or json.dumps({"poem": POEM}, ensure_ascii=False))
+    generator = PoemGenerator(registry=registry, structured_output=False)
+
+    result = asyncio.run(generator.agenerate_poems_fanout(**CONDITIONS, opt=_opt(), max_retries=1))
+
+    assert result["success"]
+    assert len(registry.async_client.calls) == 5
+
+
+def test_fanout_slot_does_not_retry_request_errors():
+    registry = _registry(lambda kwargs: openai_status_error(400))
+    generator = PoemGenerator(registry=registry, structured_output=False)
+
+    with pytest.raises(openai.BadRequestError):
+        asyncio.run(generator.agenerate_poems_fanout(**CONDITIONS, opt=_opt(), max_retries=2))
+    assert len(registry.async_client.calls) == 4
+
+
+def test_fanout_slot_does_not_retry_when_overloaded():
+    registry = _registry(lambda kwargs: LLMOverloadedError("대기열이 가득 찼습니다.", retry_after=1.0))
+    generator = PoemGenerator(registry=registry, structured_output=False)
+
+    with pytest.raises(LLMOverloadedError):
+        asyncio.run(generator.agenerate_poems_fanout(**CONDITIONS, opt=_opt(), max_retries=2))
+    assert len(registry.async_client.calls) == 4
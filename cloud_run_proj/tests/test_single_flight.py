@@ -0,0 +1,110 @@
+# test_single_flight.py
+import asyncio
+
+import pytest
+
+from single_flight import SingleFlight
+
+
+class _Counter:
+    def __init__(self, delay: float = 0.05, fail: bool = False):
+        self.calls = 0
+        self.delay = delay
+        self.fail = fail
+
+    async def __call__(self) -> dict:
+        self.calls += 1
+        call = self.calls
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError("생성 실패")
+        return {"success": True, "call": call}
+
+
+def test_concurrent_requests_share_the_leader_call():
+    flights = SingleFlight()
+    call = _Counter()
+
+    async def scenario():
+        return await asyncio.gather(*(flights.run("key", call) for _ in range(5)))
+
+    results = asyncio.run(scenario())
+
+    assert call.calls == 1
+    assert [shared for _, shared in results] == [False, True, True, True, True]
+    assert flights.stats()["in_flight"] == 0
+    assert flights.stats()["followers"] == 4
+
+
+def test_different_keys_do_not_coalesce():
+    flights = SingleFlight()
+    call = _Counter()
+
+    async def scenario():
+        await asyncio.gather(flights.run("a", call), flights.run("b", call))
+
+    asyncio.run(scenario())
+
+    assert call.calls == 2
+
+
+def test_followers_beyond_the_cap_call_on_their_own():
+    flights = SingleFlight(max_followers=2)
+    call = _Counter()
+
+    async def scenario():
+        return await asyncio.gather(*(flights.run("key", call) for _ in range(5)))
+
+    asyncio.run(scenario())
+
+    assert call.calls == 3
+    assert flights.stats()["overflow"] == 2
+
+
+def test_leader_failure_is_shared_with_followers():
+    flights = SingleFlight()
+    call = _Counter(fail=True)
+
+    async def scenario():
+        return await asyncio.gather(*(flights.run("key", call) for _ in range(3)), return_exceptions=True)
+
+    results = asyncio.run(scenario())
+
+    assert call.calls == 1
+    assert all(isinstance(r, RuntimeError) for r in results)
+
+
+def test_cancelled_leader_does_not_cancel_followers():
+    flights = SingleFlight()
+    call = _Counter()
+
+    async def scenario():
+        leader = asyncio.create_task(flights.run("key", call))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(flights.run("key", call))
+        await asyncio.sleep(0)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await follower
+
+    result, shared = asyncio.run(scenario())
+
+    assert shared and result["call"] == 1
+
+
+def test_fresh_followers_call_again_after_leader_succeeds():
+    flights = SingleFlight(fresh_followers=True)
+    call = _Counter()
+
+    async def scenario():
+        return await asyncio.gather(*(
+            flights.run("key", call, succeeded=lambda r: r["success"]) for _ in range(3)
+        ))
+
+    results = asyncio.run(scenario())
+
+    assert call.calls == 3
+    assert sorted(r["call"] for r, _ in results) == [1, 2, 3]
+    assert not any(shared for _, shared in results)
+    assert flights.stats()["fresh_calls"] == 2
@@ -0,0 +1,126 @@
+# test_stream_endpoints.py
+import json
+from typing import List
+
+from fakes import POEM, items_json, openai_status_error
+
+APOLOGY = "죄송합니다. 요청하신 작가의 문체를 그대로 재현할 수는 없지만"
+
+
+def _events(response) -> List[dict]:
+    return [
+        json.loads(frame[len("data: "):])
+        for frame in response.text.split("\n\n")
+        if frame.startswith("data: ")
+    ]
+
+
+def _poem_request(**overrides) -> dict:
+    body = {"user_id": "u1", "style": "서정적", "author_style": "윤동주", "keywords": ["봄", "바람"], "length": "4행"}
+    body.update(overrides)
+    return body
+
+
+def test_poems_are_streamed_one_by_one_then_committed(service):
+    service.db.add_user("u1", free_credits=2)
+
+    response = service.post("/poems/generate/stream", _poem_request())
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = _events(response)
+    assert [e["type"] for e in events] == ["start", "poem", "poem", "poem", "poem", "done"]
+    assert [e["index"] for e in events[1:5]] == [1, 2, 3, 4]
+    assert events[-1]["poems"] == [f"제목 {i}\n\n{POEM}" for i in range(1, 5)]
+    assert events[-1]["remaining_credits"] == 1
+    assert events[-1]["ai_model_used"] == "gpt-5-mini-2025-08-07"
+    assert len(service.db.committed) == 1
+
+
+def test_stream_usage_is_recorded_in_the_token_budget(service):
+    service.db.add_user("u1", free_credits=1)
+
+    service.post("/poems/generate/stream", _poem_request())
+
+    (budget,) = service.budgets.stats().values()
+    assert (budget["calls"], budget["truncated"], budget["samples"]) == (1, 0, 1)
+    assert budget["p50_output_tokens"] == 400
+
+
+def test_stream_cut_at_the_token_cap_counts_as_truncated(service):
+    service.db.add_user("u1", free_credits=1)
+    service.replies["poem"] = items_json("poem").rsplit(', "poem4"', 1)[0]
+    service.openai.incomplete_reason = "max_output_tokens"
+
+    events = _events(service.post("/poems/generate/stream", _poem_request()))
+
+    assert events[-1]["error_code"] == "RESPONSE_TRUNCATED"
+    assert service.db.holds == {}
+    (budget,) = service.budgets.stats().values()
+    assert (budget["calls"], budget["truncated"], budget["samples"]) == (1, 1, 0)
+
+
+def test_inappropriate_first_poem_stops_the_stream_and_releases(service):
+    service.db.add_user("u1", free_credits=1)
+    service.replies["poem"] = items_json("poem", poem1=APOLOGY)
+
+    events = _events(service.post("/poems/generate/stream", _poem_request()))
+
+    assert [e["type"] for e in events] == ["start", "error"]
+    assert events[-1]["error_code"] == "INAPPROPRIATE_RESPONSE"
+    assert service.db.holds == {} and service.db.committed == set()
+
+
+def test_truncated_stream_is_not_charged(service):
+    service.db.add_user("u1", free_credits=1)
+    service.replies["poem"] = items_json("poem").rsplit(', "poem4"', 1)[0]
+
+    events = _events(service.post("/poems/generate/stream", _poem_request()))
+
+    assert [e["type"] for e in events] == ["start", "poem", "poem", "poem", "error"]
+    assert events[-1]["error_code"] == "PARSING_FAILED"
+    assert service.db.holds == {}
+    stats = service.registry.stats()
+    assert stats["breakers"]["gpt-5-mini-2025-08-07"]["failure_rate"] == 0.0
+
+
+def test_stream_start_failure_is_reported_and_released(service):
+    service.db.add_user("u1", free_credits=1)
+    service.replies["poem"] = openai_status_error(400)
+
+    events = _events(service.post("/poems/generate/stream", _poem_request()))
+
+    assert [e["type"] for e in events] == ["start", "error"]
+    assert events[-1]["error_code"] == "GENERATION_FAILED"
+    assert service.db.holds == {}
+
+
+def test_credit_errors_are_plain_http_errors_before_the_stream(service):
+    service.db.add_user("u1", free_credits=0)
+
+    response = service.post("/poems/generate/stream", _poem_request())
+
+    assert response.status_code == 400
+    assert service.openai.calls == []
+
+
+def test_quotes_stream_rejects_unsupported_model_before_reserving(service):
+    service.db.add_user("u1", free_credits=1)
+    body = {"user_id": "u1", "style": "희망적인", "author_style": "괴테", "keywords": ["길"],
+            "length": "짧게 1-2문장", "ai_model": "gpt-unknown"}
+
+    response = service.post("/quotes/generate/stream", body)
+
+    assert response.status_code == 400
+    assert service.db.calls == []
+
+
+def test_quotes_are_streamed(service):
+    service.db.add_user("u1", free_credits=1)
+    body = {"user_id": "u1", "style": "희망적인", "author_style": "괴테", "keywords": ["길"], "length": "짧게 1-2문장"}
+
+    events = _events(service.post("/quotes/generate/stream", body))
+
+    assert [e["type"] for e in events] == ["start", "quote", "quote", "quote", "quote", "done"]
+    assert len(events[-1]["quotes"]) == 4
+    assert len(service.db.committed) == 1
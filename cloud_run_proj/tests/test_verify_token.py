@@ -0,0 +1,115 @@
+# test_verify_token.py
+import asyncio
+import json
+import time
+
+import httpx
+import jwt
+import pytest
+from cryptography.hazmat.primitives.asymmetric import ec
+from jwt.algorithms import ECAlgorithm
+
+import verify_token
+
+KID = "test-key"
+
+
+@pytest.fixture
+def signing_key():
+    return ec.generate_private_key(ec.SECP256R1())
+
+
+@pytest.fixture
+def jwks_server(monkeypatch, signing_key):
+    """JWKS 요청 수를 세는 MockTransport 클라이언트로 교체하고 전역 캐시를 비움"""
+    public_jwk = json.loads(ECAlgorithm.to_jwk(signing_key.public_key()))
+    public_jwk.update({"kid": KID, "alg": "ES256", "use": "sig"})
+    server = {"requests": 0, "delay": 0.05}
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        server["requests"] += 1
+        await asyncio.sleep(server["delay"])
+        return httpx.Response(200, json={"keys": [public_jwk]})
+
+    monkeypatch.setattr(verify_token, "_JWKS_CACHE", {})
+    monkeypatch.setattr(verify_token, "_JWKS_TS", 0.0)
+    monkeypatch.setattr(verify_token, "_JWKS_REFRESH_TASK", None)
+    monkeypatch.setattr(verify_token, "_CLAIMS_CACHE", type(verify_token._CLAIMS_CACHE)())
+    monkeypatch.setattr(
+        verify_token, "_ASYNC_HTTP_CLIENT", httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    )
+    return server
+
+
+def _token(signing_key, sub: str) -> str:
+    return jwt.encode(
+        {"sub": sub, "aud": "authenticated", "iss": verify_token.EXPECTED_ISS, "exp": int(time.time()) + 3600},
+        signing_key,
+        algorithm="ES256",
+        headers={"kid": KID},
+    )
+
+
+def test_concurrent_cold_verifications_share_one_jwks_fetch(jwks_server, signing_key):
+    tokens = [_token(signing_key, f"user-{i}") for i in range(20)]
+
+    async def scenario():
+        return await asyncio.gather(*(verify_token.averify_and_decode_supabase_jwt(t) for t in tokens))
+
+    claims = asyncio.run(scenario())
+
+    assert [c["sub"] for c in claims] == [f"user-{i}" for i in range(20)]
+    assert jwks_server["requests"] == 1
+
+
+def test_stale_keys_are_used_while_refreshing_in_background(jwks_server, signing_key, monkeypatch):
+    async def scenario():
+        await verify_token.prefetch_jwks()
+        # TTL이 지난 것처럼 만들면 기존 키로 바로 검증하고 갱신은 한 번만 백그라운드에서
+        monkeypatch.setattr(verify_token, "_JWKS_TS", time.time() - verify_token.JWKS_TTL_SECONDS - 1)
+        claims = await asyncio.gather(*(
+            verify_token.averify_and_decode_supabase_jwt(_token(signing_key, f"user-{i}")) for i in range(5)
+        ))
+        # 검증은 갱신이 끝나기 전에 이미 끝났고, 다섯 요청이 하나의 갱신 태스크를 공유
+        refresh = verify_token._JWKS_REFRESH_TASK
+        assert refresh is not None and not refresh.done()
+        await refresh
+        return claims
+
+    claims = asyncio.run(scenario())
+
+    assert len(claims) == 5
+    assert jwks_server["requests"] == 2
+
+
+def test_unknown_kid_is_refetched_at_most_once_per_interval(jwks_server, signing_key):
+    forged = jwt.encode(
+        {"sub": "x", "aud": "authenticated", "iss": verify_token.EXPECTED_ISS, "exp": int(time.time()) + 3600},
+        signing_key,
+        algorithm="ES256",
+        headers={"kid": "unknown"},
+    )
+
+    async def scenario():
+        await verify_token.prefetch_jwks()
+        for _ in range(3):
+            with pytest.raises(ValueError):
+                await verify_token.averify_and_decode_supabase_jwt(forged)
+
+    asyncio.run(scenario())
+
+    # 방금 받아온 키라 JWKS_MIN_REFRESH_INTERVAL_SECONDS 안에서는 다시 조회하지 않음
+    assert jwks_server["requests"] == 1
+
+
+def test_verified_claims_are_cached_by_token(jwks_server, signing_key):
+    token = _token(signing_key, "user-1")
+
+    async def scenario():
+        await verify_token.averify_and_decode_supabase_jwt(token)
+        await verify_token.averify_and_decode_supabase_jwt(token)
+
+    before = verify_token.claims_cache_stats()["hits"]
+    asyncio.run(scenario())
+
+    assert verify_token.claims_cache_stats()["hits"] == before + 1
@@ -0,0 +1,176 @@
+# token_budget.py
+from __future__ import annotations
+from collections import OrderedDict, deque
+from dataclasses import dataclass
+from typing import Optional, Dict, Any, Tuple
+import os
+import re
+
+
+# 예산 구분에 쓰는 길이 상한 (행/문장 수). 클라이언트가 보내는 length는 자유 문자열이므로
+# 숫자를 읽어 이 고정된 구간 중 하나로만 묶음 ("4행" → "~4", "보통 2-3문장" → "~4", 숫자가 없으면 "other")
+LENGTH_BUCKETS = (2, 4, 8, 12, 16, 20)
+
+
+def _length_class(length: str) -> str:
+    """길이 문자열의 가장 큰 숫자가 속한 고정 구간 (구분 수가 요청 문자열 종류만큼 늘지 않음)"""
+    numbers = [int(n) for n in re.findall(r"\d+", length or "")]
+    if not numbers:
+        return "other"
+    count = max(numbers)
+    for bucket in LENGTH_BUCKETS:
+        if count <= bucket:
+            return f"~{bucket}"
+    return f"{LENGTH_BUCKETS[-1]}+"
+
+
+@dataclass
+class _BudgetClass:
+    output_tokens: deque  # 잘리지 않은 응답의 출력 토큰 수 (reasoning 포함)
+    reasoning_tokens: deque
+    truncations: deque  # 최근 호출의 잘림 여부
+    widen: float = 1.0  # 잘림이 늘면 커지는 배수
+    calls: int = 0
+    truncated: int = 0
+    quiet_calls: int = 0  # 마지막 확대/축소 이후 잘림 없이 지난 호출 수
+    last_budget: Optional[int] = None
+
+
+# ======================
+# 길이별 출력 토큰 예산
+# ======================
+class TokenBudgeter:
+    """
+    (용도, 길이) 구분마다 실제 출력/reasoning 토큰 사용량을 기록하고 max_output_tokens / max_tokens를 정하는 예산기
+    - 예산 = 최근 출력 토큰의 percentile 백분위 × (1 + margin) × 확대 배수, floor 이상·기본값 × max_widen 이하
+    - 표본이 min_samples개 미만이면 호출한 쪽의 기본값(엔드포인트의 고정값)을 그대로 사용
+    - 최근 truncation_window번 중 잘린 비율이 truncation_threshold를 넘으면 확대 배수를 widen_factor배로 키우고,
+      잘림 없이 truncation_window번이 지나면 한 단계씩 되돌림
+    - 출력 토큰 수에는 reasoning 토큰이 포함됨 (Responses API / Chat Completions 모두 상한이 합계에 적용)
+    - 길이는 LENGTH_BUCKETS 구간으로 묶고, 구분은 최근에 쓴 max_classes개까지만 유지 (오래 안 쓴 구분부터 제거)
+    """
+
+    def __init__(
+        self,
+        percentile: float = 95.0,
+        margin: float = 0.25,
+        min_samples: int = 20,
+        window_size: int = 200,
+        floor: int = 256,
+        max_widen: float = 2.0,
+        widen_factor: float = 1.5,
+        truncation_threshold: float = 0.02,
+        truncation_window: int = 50,
+        max_classes: int = 256,
+    ):
+        self.percentile = percentile
+        self.margin = margin
+        self.min_samples = min_samples
+        self.window_size = window_size
+        self.floor = floor
+        self.max_widen = max_widen
+        self.widen_factor = widen_factor
+        self.truncation_threshold = truncation_threshold
+        self.truncation_window = truncation_window
+        self.max_classes = max_classes
+        self._classes: OrderedDict[Tuple[str, str], _BudgetClass] = OrderedDict()
+
+    @classmethod
+    def from_env(cls) -> "TokenBudgeter":
+        return cls(
+            percentile=float(os.getenv("TOKEN_BUDGET_PERCENTILE", "95")),
+            margin=float(os.getenv("TOKEN_BUDGET_MARGIN", "0.25")),
+            min_samples=int(os.getenv("TOKEN_BUDGET_MIN_SAMPLES", "20")),
+            window_size=int(os.getenv("TOKEN_BUDGET_WINDOW_SIZE", "200")),
+            floor=int(os.getenv("TOKEN_BUDGET_FLOOR", "256")),
+            max_widen=float(os.getenv("TOKEN_BUDGET_MAX_WIDEN", "2")),
+            widen_factor=float(os.getenv("TOKEN_BUDGET_WIDEN_FACTOR", "1.5")),
+            truncation_threshold=float(os.getenv("TOKEN_BUDGET_TRUNCATION_THRESHOLD", "0.02")),
+            truncation_window=int(os.getenv("TOKEN_BUDGET_TRUNCATION_WINDOW", "50")),
+            max_classes=int(os.getenv("TOKEN_BUDGET_MAX_CLASSES", "256")),
+        )
+
+    def budget(self, kind: str, length: str, default: int) -> int:
+        """이번 호출에 쓸 출력 토큰 상한 (default는 엔드포인트의 기존 고정값)"""
+        budget_class = self._class(kind, length)
+        ceiling = round(default * self.max_widen)
+        if len(budget_class.output_tokens) < self.min_samples:
+            budget = round(default * budget_class.widen)
+        else:
+            observed = self._percentile(budget_class.output_tokens, self.percentile)
+            budget = round(observed * (1 + self.margin) * budget_class.widen)
+        budget = min(ceiling, max(self.floor, budget))
+        budget_class.last_budget = budget
+        return budget
+
+    def record(
+        self,
+        kind: str,
+        length: str,
+        output_tokens: Optional[int],
+        reasoning_tokens: Optional[int],
+        truncated: bool,
+    ) -> None:
+        """호출 결과의 토큰 사용량과 잘림 여부를 기록 (사용량이 없는 응답은 잘림 여부만 반영)"""
+        budget_class = self._class(kind, length)
+        budget_class.calls += 1
+        budget_class.truncations.append(truncated)
+        if truncated:
+            # 잘린 응답의 토큰 수는 실제 필요량보다 작으므로 백분위 표본에서 제외
+            budget_class.truncated += 1
+        elif output_tokens is not None:
+            budget_class.output_tokens.append(output_tokens)
+            budget_class.reasoning_tokens.append(reasoning_tokens or 0)
+        self._adjust_widen(budget_class, truncated)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            f"{kind}:{length}": {
+                "calls": c.calls,
+                "truncated": c.truncated,
+                "samples": len(c.output_tokens),
+                "p50_output_tokens": self._percentile(c.output_tokens, 50) if c.output_tokens else None,
+                f"p{self.percentile:g}_output_tokens": (
+                    self._percentile(c.output_tokens, self.percentile) if c.output_tokens else None
+                ),
+                "p50_reasoning_tokens": self._percentile(c.reasoning_tokens, 50) if c.reasoning_tokens else None,
+                "widen": round(c.widen, 3),
+                "last_budget": c.last_budget,
+            }
+            for (kind, length), c in self._classes.items()
+        }
+
+    # ---------- 내부 ----------
+    def _class(self, kind: str, length: str) -> _BudgetClass:
+        key = (kind, _length_class(length))
+        budget_class = self._classes.get(key)
+        if budget_class is None:
+            budget_class = self._classes[key] = _BudgetClass(
+                output_tokens=deque(maxlen=self.window_size),
+                reasoning_tokens=deque(maxlen=self.window_size),
+                truncations=deque(maxlen=self.truncation_window),
+            )
+            while len(self._classes) > self.max_classes:
+                self._classes.popitem(last=False)
+        else:
+            self._classes.move_to_end(key)
+        return budget_class
+
+    def _adjust_widen(self, budget_class: _BudgetClass, truncated: bool) -> None:
+        recent = budget_class.truncations
+        if truncated and sum(recent) > self.truncation_threshold * self.truncation_window:
+            budget_class.widen = min(self.max_widen, budget_class.widen * self.widen_factor)
+            # 같은 잘림 기록으로 연달아 확대하지 않도록 관찰 구간을 새로 시작
+            recent.clear()
+            budget_class.quiet_calls = 0
+            return
+        budget_class.quiet_calls = 0 if truncated else budget_class.quiet_calls + 1
+        if budget_class.widen > 1.0 and budget_class.quiet_calls >= self.truncation_window:
+            budget_class.widen = max(1.0, budget_class.widen / self.widen_factor)
+            budget_class.quiet_calls = 0
+
+    @staticmethod
+    def _percentile(values, pct: float) -> int:
+        ordered = sorted(values)
+        index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+        return ordered[index]
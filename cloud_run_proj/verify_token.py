@@ -1,18 +1,37 @@
 from __future__ import annotations
+import asyncio
 import os
+import hashlib
+import threading
 import time
+from collections import OrderedDict
 import jwt
 import httpx
-import jwt
-from jwt import PyJWKClient
 
-SUPABASE_URL = "https://tnihnfuwhhtvbkmhwiut.supabase.co"
+# 로컬 벤치마크 등에서 대체 서버를 가리킬 수 있도록 환경변수 우선
+SUPABASE_URL = os.getenv("SUPABASE_URL", "https://tnihnfuwhhtvbkmhwiut.supabase.co").rstrip("/")
 JWKS_URL = f"{SUPABASE_URL}/auth/v1/.well-known/jwks.json"
 EXPECTED_ISS = f"{SUPABASE_URL}/auth/v1"
 
-# 선택: JWKS 캐시 (Supabase Edge가 10분 캐시하므로 과도 캐시는 금물)
-_JWKS_CACHE: dict | None = None
-_JWKS_TS = 0
+# 프로세스 전역 JWKS 캐시: kid -> 공개키 (Supabase Edge가 10분 캐시하므로 과도 캐시는 금물)
+JWKS_TTL_SECONDS = 600
+# 모르는 kid가 들어왔을 때 강제 재조회 사이의 최소 간격 (위조 kid로 인한 재조회 폭주 방지)
+JWKS_MIN_REFRESH_INTERVAL_SECONDS = 30
+
+_JWKS_CACHE: dict = {}
+_JWKS_TS = 0.0
+_JWKS_LOCK = threading.Lock()
+
+# 비동기 경로 전용: 공유 AsyncClient와 진행 중인 갱신 태스크 (single-flight)
+_ASYNC_HTTP_CLIENT: httpx.AsyncClient | None = None
+_JWKS_REFRESH_TASK: asyncio.Task | None = None
+
+# 검증 완료된 클레임 캐시: sha256(token) -> (exp, claims), 토큰의 exp까지만 유효
+CLAIMS_CACHE_MAX_SIZE = int(os.getenv("JWT_CLAIMS_CACHE_MAX_SIZE", "10000"))
+
+_CLAIMS_CACHE: OrderedDict[str, tuple[float, dict]] = OrderedDict()
+_CLAIMS_LOCK = threading.Lock()
+_CLAIMS_STATS = {"hits": 0, "misses": 0, "evictions": 0}
 
 def public_key_from_jwk(jwk: dict, fallback_alg: str | None = None):
    try:
@@ -43,60 +62,193 @@ def public_key_from_jwk(jwk: dict, fallback_alg: str | None = None):
        # If algorithm processing fails, let PyJWKClient handle it
        return None
 
-def _get_jwk_key_for(token: str):
+def _load_public_key(jwk: dict):
+   key = public_key_from_jwk(jwk)
+   if key is not None:
+       return key
+   # public_key_from_jwk가 처리하지 못한 키는 PyJWK로 로드
+   return jwt.PyJWK(jwk).key
+
+def _fetch_jwks() -> dict:
+   """JWKS 문서를 받아 kid -> 공개키 맵으로 변환"""
+   return _parse_jwks(httpx.get(JWKS_URL, timeout=10).json())
+
+def _parse_jwks(jwks: dict) -> dict:
+   keys = {}
+   for k in jwks.get("keys", []):
+       kid = k.get("kid")
+       if not kid:
+           continue
+       try:
+           keys[kid] = _load_public_key(k)
+       except Exception as e:
+           print(f"⚠️ JWKS 키 로드 실패 (kid={kid}): {e}")
+   return keys
+
+def _refresh_jwks(seen_ts: float) -> dict:
+   """single-flight 재조회: 동시에 들어온 요청 중 하나만 JWKS를 받아온다"""
    global _JWKS_CACHE, _JWKS_TS
+   with _JWKS_LOCK:
+       # 락을 기다리는 동안 다른 요청이 이미 갱신했다면 그 결과를 그대로 사용
+       if _JWKS_TS != seen_ts:
+           return _JWKS_CACHE
+       _JWKS_CACHE = _fetch_jwks()
+       _JWKS_TS = time.time()
+       return _JWKS_CACHE
+
+def _get_jwk_key_for(token: str):
    header = jwt.get_unverified_header(token)
    kid = header.get("kid")
-   now = time.time()
+   keys, fetched_at = _JWKS_CACHE, _JWKS_TS
    # 10분 이하로만 캐시(회전 시 안전)
-   if not _JWKS_CACHE or now - _JWKS_TS > 600:
-       _JWKS_CACHE = httpx.get(JWKS_URL, timeout=10).json()
-       _JWKS_TS = now
-   # kid 매칭되는 키 탐색
-   for k in _JWKS_CACHE.get("keys", []):
-       if k.get("kid") == kid:
-           key = public_key_from_jwk(k, fallback_alg=header.get("alg"))
-           if key is not None:
-               return key
-           # If public_key_from_jwk returns None, use PyJWKClient as fallback
-           try:
-               jwks_client = PyJWKClient(JWKS_URL, cache_keys=True)
-               signing_key = jwks_client.get_signing_key(kid)
-               return signing_key.key
-           except Exception:
-               continue
-               
+   if not keys or time.time() - fetched_at > JWKS_TTL_SECONDS:
+       keys = _refresh_jwks(fetched_at)
+       fetched_at = _JWKS_TS
+   key = keys.get(kid)
+   if key is not None:
+       return key
+
    # 혹시 회전 직후면 한 번 더 새로고침
-   _JWKS_CACHE = httpx.get(JWKS_URL, timeout=10).json()
-   _JWKS_TS = now
-   for k in _JWKS_CACHE.get("keys", []):
-       if k.get("kid") == kid:
-           key = public_key_from_jwk(k, fallback_alg=header.get("alg"))
-           if key is not None:
-               return key
-           # If public_key_from_jwk returns None, use PyJWKClient as fallback
-           try:
-               jwks_client = PyJWKClient(JWKS_URL, cache_keys=True)
-               signing_key = jwks_client.get_signing_key(kid)
-               return signing_key.key
-           except Exception:
-               continue
+   if time.time() - fetched_at >= JWKS_MIN_REFRESH_INTERVAL_SECONDS:
+       key = _refresh_jwks(fetched_at).get(kid)
+       if key is not None:
+           return key
+   raise ValueError("Signing key not found for kid")
+
+
+def _get_async_http_client() -> httpx.AsyncClient:
+   global _ASYNC_HTTP_CLIENT
+   if _ASYNC_HTTP_CLIENT is None or _ASYNC_HTTP_CLIENT.is_closed:
+       _ASYNC_HTTP_CLIENT = httpx.AsyncClient(timeout=10)
+   return _ASYNC_HTTP_CLIENT
+
+async def _afetch_and_store_jwks() -> dict:
+   global _JWKS_CACHE, _JWKS_TS
+   resp = await _get_async_http_client().get(JWKS_URL)
+   resp.raise_for_status()
+   _JWKS_CACHE = _parse_jwks(resp.json())
+   _JWKS_TS = time.time()
+   return _JWKS_CACHE
+
+def _start_jwks_refresh() -> asyncio.Task:
+   """진행 중인 갱신이 있으면 그 태스크를, 없으면 새 태스크를 반환 (single-flight)"""
+   global _JWKS_REFRESH_TASK
+   if _JWKS_REFRESH_TASK is None or _JWKS_REFRESH_TASK.done():
+       _JWKS_REFRESH_TASK = asyncio.create_task(_afetch_and_store_jwks())
+       _JWKS_REFRESH_TASK.add_done_callback(_log_jwks_refresh_failure)
+   return _JWKS_REFRESH_TASK
+
+def _log_jwks_refresh_failure(task: asyncio.Task) -> None:
+   if not task.cancelled() and task.exception() is not None:
+       print(f"⚠️ JWKS 백그라운드 갱신 실패 (기존 키 계속 사용): {task.exception()}")
+
+async def _aget_jwk_key_for(token: str):
+   header = jwt.get_unverified_header(token)
+   kid = header.get("kid")
+   if not _JWKS_CACHE:
+       # 캐시된 키가 전혀 없을 때만 갱신을 기다린다
+       await asyncio.shield(_start_jwks_refresh())
+   elif time.time() - _JWKS_TS > JWKS_TTL_SECONDS:
+       # stale-while-revalidate: 기존 키로 바로 검증하고 갱신은 백그라운드에서
+       _start_jwks_refresh()
+   key = _JWKS_CACHE.get(kid)
+   if key is not None:
+       return key
+
+   # 혹시 회전 직후면 한 번 더 새로고침 (새 키가 필요하므로 이 경우는 기다린다)
+   if time.time() - _JWKS_TS >= JWKS_MIN_REFRESH_INTERVAL_SECONDS:
+       await asyncio.shield(_start_jwks_refresh())
+       key = _JWKS_CACHE.get(kid)
+       if key is not None:
+           return key
    raise ValueError("Signing key not found for kid")
 
+async def prefetch_jwks() -> None:
+   """서버 기동 시 JWKS를 미리 받아 첫 요청이 블로킹되지 않도록 한다"""
+   await _start_jwks_refresh()
+
+async def aclose_jwks_client() -> None:
+   global _ASYNC_HTTP_CLIENT
+   if _JWKS_REFRESH_TASK is not None and not _JWKS_REFRESH_TASK.done():
+       _JWKS_REFRESH_TASK.cancel()
+   if _ASYNC_HTTP_CLIENT is not None:
+       await _ASYNC_HTTP_CLIENT.aclose()
+       _ASYNC_HTTP_CLIENT = None
+
+
+def _token_digest(token: str) -> str:
+   return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+def _get_cached_claims(digest: str) -> dict | None:
+   with _CLAIMS_LOCK:
+       entry = _CLAIMS_CACHE.get(digest)
+       if entry is None:
+           _CLAIMS_STATS["misses"] += 1
+           return None
+       exp, claims = entry
+       if exp <= time.time():
+           # 만료된 토큰은 캐시에서 제거하고 다시 검증하도록 미스 처리 (jwt.decode가 만료 에러를 낸다)
+           del _CLAIMS_CACHE[digest]
+           _CLAIMS_STATS["misses"] += 1
+           return None
+       _CLAIMS_CACHE.move_to_end(digest)
+       _CLAIMS_STATS["hits"] += 1
+       return dict(claims)
+
+def _store_claims(digest: str, claims: dict) -> None:
+   if CLAIMS_CACHE_MAX_SIZE <= 0:
+       return
+   with _CLAIMS_LOCK:
+       _CLAIMS_CACHE[digest] = (float(claims["exp"]), dict(claims))
+       _CLAIMS_CACHE.move_to_end(digest)
+       while len(_CLAIMS_CACHE) > CLAIMS_CACHE_MAX_SIZE:
+           _CLAIMS_CACHE.popitem(last=False)
+           _CLAIMS_STATS["evictions"] += 1
+
+def claims_cache_stats() -> dict:
+   """클레임 캐시 현황 (크기, 히트/미스 카운터)"""
+   with _CLAIMS_LOCK:
+       lookups = _CLAIMS_STATS["hits"] + _CLAIMS_STATS["misses"]
+       return {
+           "size": len(_CLAIMS_CACHE),
+           "max_size": CLAIMS_CACHE_MAX_SIZE,
+           **_CLAIMS_STATS,
+           "hit_rate": _CLAIMS_STATS["hits"] / lookups if lookups else 0.0,
+       }
+
 
 def verify_and_decode_supabase_jwt(token: str) -> dict:
-   # PyJWKClient를 사용하여 호환성 문제 해결
-   jwks_client = PyJWKClient(JWKS_URL, cache_keys=True)
-   signing_key = jwks_client.get_signing_key_from_jwt(token)
-   
+   digest = _token_digest(token)
+   cached = _get_cached_claims(digest)
+   if cached is not None:
+       return cached
+
+   claims = _decode_claims(token, _get_jwk_key_for(token))
+   _store_claims(digest, claims)
+   return claims
+
+
+async def averify_and_decode_supabase_jwt(token: str) -> dict:
+   """verify_and_decode_supabase_jwt의 비동기 버전 (이벤트 루프를 막지 않음)"""
+   digest = _token_digest(token)
+   cached = _get_cached_claims(digest)
+   if cached is not None:
+       return cached
+
+   claims = _decode_claims(token, await _aget_jwk_key_for(token))
+   _store_claims(digest, claims)
+   return claims
+
+
+def _decode_claims(token: str, signing_key) -> dict:
    claims = jwt.decode(
        token,
-       key=signing_key.key,
+       key=signing_key,
        algorithms=["ES256", "RS256", "EdDSA"],
        options={"require": ["exp", "iss", "sub"]},
        audience="authenticated",
    )
-   
+
    if claims.get("iss") != EXPECTED_ISS:
        raise jwt.InvalidIssuerError(f"Unexpected iss: {claims.get('iss')}")
    return claims